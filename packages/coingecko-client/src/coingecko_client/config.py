@@ -11,6 +11,12 @@ class InterfaceSettings(BaseSettings):
 class CoingeckoSettings(InterfaceSettings):
     api_key: str = Field(validation_alias="COINGECKO_API_KEY", default="")
     base_url: str = Field(validation_alias="COINGECKO_API_URL", default="")
+    token_index_path: str = Field(
+        validation_alias="COINGECKO_TOKEN_INDEX_PATH", default=""
+    )
+    # Demo plan: 30 calls/min
+    rate_limit: float = Field(validation_alias="COINGECKO_RATE_LIMIT", default=0.5)
+    rate_burst: int = Field(validation_alias="COINGECKO_RATE_BURST", default=5)
 
 
 class RedisSettings(InterfaceSettings):
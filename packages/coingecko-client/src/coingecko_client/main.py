@@ -1,31 +1,98 @@
+import asyncio
+import logging
+from collections.abc import AsyncIterator, Iterable
+from functools import partial
+
+import numpy as np
 import pandas as pd
 from aiohttp import ClientSession
 from fastapi import HTTPException
+from msgspec import json
 from pandas import DataFrame
+from shared_clients.aiohttp_ import RateLimiter, ResponseCache
 
 from coingecko_client.config import get_server_settings
+from coingecko_client.token_index import TokenIndexStore
 
 server = get_server_settings()
+logger = logging.getLogger(__name__)
+
+# /coins/list меняется редко, исторические цены — раз в несколько минут
+coingecko_cache = ResponseCache(
+    ttl=60,
+    ttls={"/coins/list": 60 * 60, "/market_chart": 5 * 60},
+)
+# индекс токенов общий для всех менеджеров, снапшот на диске для быстрого старта
+token_index_store = TokenIndexStore(
+    path=server.coingecko.token_index_path or None, max_age=60 * 60
+)
+# лимит тарифа CoinGecko, общий для всех менеджеров процесса
+coingecko_limiter = RateLimiter(
+    rate=server.coingecko.rate_limit, burst=server.coingecko.rate_burst
+)
+
+
+TOKEN_COLUMNS = ["id", "symbol", "name"]
 
 
 class CoinGeckoApiManager:
-    def __init__(self, api_key: str, session: ClientSession, base_url: str):
+    def __init__(
+        self,
+        api_key: str,
+        session: ClientSession,
+        base_url: str,
+        cache: ResponseCache | None = None,
+        token_index: TokenIndexStore | None = None,
+        limiter: RateLimiter | None = None,
+    ):
         self.api_key = api_key
         self.session = session
         self.base_url = base_url
+        self.cache = cache
+        self.token_index = token_index or TokenIndexStore()
+        self.limiter = limiter
 
     async def _send_request(
         self, endpoint: str, params: dict | None = None, method: str = "POST"
     ):
         headers = {"x-cg-demo-api-key": self.api_key}
+        url = f"{self.base_url}{endpoint}"
+        if method == "GET" and self.cache is not None:
+            # Токен лимита тратится только на реальный запрос в сеть
+            body = await self.cache.get(
+                self.session,
+                url,
+                params=params,
+                headers=headers,
+                acquire=partial(self._acquire, endpoint, method),
+            )
+            return json.decode(body)
+        slot = await self._acquire(endpoint, method)
         response = await self.session.request(
             method=method,
-            url=f"{self.base_url}{endpoint}",
+            url=url,
             headers=headers,
             params=params,
         )
+        if slot is not None:
+            slot.feedback(response.status, response.headers)
         return await response.json()
 
+    async def _acquire(self, endpoint: str, method: str):
+        if self.limiter is None:
+            return None
+        return await self.limiter.acquire(endpoint, method, api_key=self.api_key)
+
+    async def _fetch_market_chart(
+        self, token_id: str, days: int, vs_currency: str
+    ) -> DataFrame:
+        historical_data = await self._send_request(
+            method="GET",
+            endpoint=f"/coins/{token_id}/market_chart",
+            params={"vs_currency": vs_currency, "days": days},
+        )
+        return build_historical_prices(historical_data)
+
     async def get_historical_prices(
         self, token_name: str, days: int = 10, vs_currency: str = "usd"
     ) -> DataFrame:
@@ -35,42 +102,163 @@ class CoinGeckoApiManager:
                 detail="Did not find any historical data", status_code=400
             )
         token_id = token_df["id"].iloc[0]
-        endpoint = f"/coins/{token_id}/market_chart"
-        params = {"vs_currency": vs_currency, "days": days}
-        historical_data = await self._send_request(
-            method="GET", endpoint=endpoint, params=params
+        return await self._fetch_market_chart(token_id, days, vs_currency)
+
+    async def iter_historical_prices(
+        self,
+        token_names: Iterable[str],
+        days: int = 10,
+        vs_currency: str = "usd",
+        concurrency: int = 8,
+    ) -> AsyncIterator[tuple[str, DataFrame]]:
+        """Yield (token_name, prices) for many tokens as their charts arrive.
+
+        Names are resolved against the token index once; names that resolve to
+        the same coin share one request and unknown names are skipped. At most
+        concurrency market_chart requests run at a time (the limiter, if any,
+        paces them further). The first failed request is raised and cancels
+        the rest.
+        """
+        index = await self.token_index.get(self._fetch_coins_list)
+        names_by_id: dict[str, list[str]] = {}
+        for token_name in dict.fromkeys(token_names):
+            coin = index.resolve(token_name)
+            if coin is None:
+                logger.warning("Token %s not found on CoinGecko, skipping", token_name)
+                continue
+            names_by_id.setdefault(coin.id, []).append(token_name)
+
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def fetch(token_id: str) -> tuple[str, DataFrame]:
+            async with semaphore:
+                return token_id, await self._fetch_market_chart(
+                    token_id, days, vs_currency
+                )
+
+        tasks = [asyncio.ensure_future(fetch(token_id)) for token_id in names_by_id]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                token_id, prices_df = await next_done
+                for token_name in names_by_id[token_id]:
+                    yield token_name, prices_df
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def get_historical_prices_batch(
+        self,
+        token_names: Iterable[str],
+        days: int = 10,
+        vs_currency: str = "usd",
+        concurrency: int = 8,
+        long_format: bool = True,
+    ) -> DataFrame | dict[str, DataFrame]:
+        """Historical prices for many tokens in one call.
+
+        Returns one long frame with a leading "token" column, or with
+        long_format=False a dict of frames keyed by token name, in input order.
+        """
+        token_names = list(dict.fromkeys(token_names))
+        frames = {
+            token_name: prices_df
+            async for token_name, prices_df in self.iter_historical_prices(
+                token_names, days, vs_currency, concurrency
+            )
+        }
+        frames = {name: frames[name] for name in token_names if name in frames}
+        if not long_format:
+            return frames
+        if not frames:
+            return DataFrame(
+                columns=["token", "timestamp", *HISTORICAL_SERIES.values()]
+            )
+        return (
+            pd.concat(frames, names=["token", None])
+            .reset_index(level=0)
+            .reset_index(drop=True)
         )
-        return await prepare_historical_prices(data=historical_data)
+
+    async def _fetch_coins_list(self) -> list[dict]:
+        return await self._send_request(method="GET", endpoint="/coins/list")
 
     async def get_tokens(self, token_name: str | None = None) -> DataFrame:
-        endpoint = "/coins/list"
-        data = await self._send_request(method="GET", endpoint=endpoint)
-        df = DataFrame(data)
-        if token_name is not None:
-            token_name = token_name.lower()
-            df = df[(df == token_name).any(axis=1)]
-        return df
-
-
-async def prepare_historical_prices(data: dict[str, list]) -> DataFrame:
-    prices_df = DataFrame(data["prices"], columns=["timestamp", "price"])
-    market_caps_df = DataFrame(data["market_caps"], columns=["timestamp", "market_cap"])
-    total_volumes_df = DataFrame(
-        data["total_volumes"], columns=["timestamp", "total_volume"]
-    )
-    summary_df = prices_df.merge(market_caps_df, on="timestamp").merge(
-        total_volumes_df, on="timestamp"
+        index = await self.token_index.get(self._fetch_coins_list)
+        coins = index.coins if token_name is None else index.lookup(token_name)
+        return DataFrame(
+            [(c.id, c.symbol, c.name) for c in coins], columns=TOKEN_COLUMNS
+        )
+
+
+HISTORICAL_SERIES = {
+    "prices": "price",
+    "market_caps": "market_cap",
+    "total_volumes": "total_volume",
+}
+
+
+def _as_pairs(rows: list) -> np.ndarray:
+    pairs = np.asarray(rows, dtype=np.float64)
+    return pairs.reshape(-1, 2)
+
+
+async def prepare_historical_prices(
+    data: dict[str, list], formatted: bool = False
+) -> DataFrame:
+    """Coroutine form of build_historical_prices, kept for existing callers."""
+    return build_historical_prices(data, formatted=formatted)
+
+
+def build_historical_prices(
+    data: dict[str, list], formatted: bool = False
+) -> DataFrame:
+    """market_chart response as one frame with a row per timestamp.
+
+    CoinGecko returns the three series on the same timestamps, so the columns
+    are taken straight from the arrays; only misaligned series fall back to an
+    inner merge on timestamp. Values stay float64 unless formatted is set.
+    """
+    series = {column: _as_pairs(data[key]) for key, column in HISTORICAL_SERIES.items()}
+    timestamps = series["price"][:, 0]
+    if all(np.array_equal(pairs[:, 0], timestamps) for pairs in series.values()):
+        summary_df = DataFrame(
+            {column: pairs[:, 1] for column, pairs in series.items()}
+        )
+        summary_df.insert(0, "timestamp", timestamps)
+    else:
+        frames = [
+            DataFrame(pairs, columns=["timestamp", column])
+            for column, pairs in series.items()
+        ]
+        summary_df = (
+            frames[0].merge(frames[1], on="timestamp").merge(frames[2], on="timestamp")
+        )
+    summary_df["timestamp"] = pd.to_datetime(
+        summary_df["timestamp"].to_numpy(dtype=np.int64), unit="ms"
     )
-    summary_df.timestamp = pd.to_datetime(summary_df.timestamp, unit="ms")
-    summary_df.total_volume = summary_df.total_volume.apply(lambda x: f"{x:.0f}")
-    summary_df.market_cap = summary_df.market_cap.apply(lambda x: f"{x:.0f}")
+    if formatted:
+        return format_historical_prices(summary_df)
     return summary_df
 
 
+def format_historical_prices(summary_df: DataFrame) -> DataFrame:
+    """Copy of summary_df with market cap and volume as whole-number strings."""
+    formatted_df = summary_df.copy()
+    for column in ("market_cap", "total_volume"):
+        formatted_df[column] = np.char.mod(
+            "%.0f", formatted_df[column].to_numpy(dtype=np.float64)
+        )
+    return formatted_df
+
+
 async def get_coingecko_manager():
     async with ClientSession() as session:
         yield CoinGeckoApiManager(
             api_key=server.coingecko.api_key,
             session=session,
             base_url=server.coingecko.base_url,
+            cache=coingecko_cache,
+            token_index=token_index_store,
+            limiter=coingecko_limiter,
         )
@@ -0,0 +1,178 @@
+import asyncio
+import contextlib
+import logging
+import os
+import time
+from collections.abc import Awaitable, Callable
+from pathlib import Path
+from typing import Any
+
+import msgspec
+from msgspec import msgpack
+
+logger = logging.getLogger(__name__)
+
+
+class Coin(msgspec.Struct, gc=False):
+    id: str
+    symbol: str
+    name: str
+
+
+class _Snapshot(msgspec.Struct, array_like=True, gc=False):
+    # rows instead of Coin structs keep the file free of repeated field names
+    fetched_at: float
+    coins: list[tuple[str, str, str]]
+
+
+class TokenIndex:
+    """O(1) lookup of CoinGecko coins by id, symbol and lowercase name.
+
+    Symbols and names are not unique (dozens of coins call themselves
+    "eth"), so those keys map to lists in /coins/list order.
+    """
+
+    __slots__ = ("coins", "by_id", "by_symbol", "by_name", "fetched_at")
+
+    def __init__(self, coins: list[Coin], fetched_at: float | None = None) -> None:
+        self.coins = coins
+        self.fetched_at = time.time() if fetched_at is None else fetched_at
+        self.by_id: dict[str, Coin] = {}
+        self.by_symbol: dict[str, list[Coin]] = {}
+        self.by_name: dict[str, list[Coin]] = {}
+        for coin in coins:
+            self.by_id[coin.id.lower()] = coin
+            self.by_symbol.setdefault(coin.symbol.lower(), []).append(coin)
+            self.by_name.setdefault(coin.name.lower(), []).append(coin)
+
+    @classmethod
+    def from_raw(cls, data: list[dict[str, Any]]) -> "TokenIndex":
+        return cls(msgspec.convert(data, list[Coin]))
+
+    def lookup(self, query: str) -> list[Coin]:
+        """Every coin whose id, symbol or name equals query (id matches first)."""
+        query = query.lower()
+        matches: dict[str, Coin] = {}
+        coin = self.by_id.get(query)
+        if coin is not None:
+            matches[coin.id] = coin
+        for coin in self.by_symbol.get(query, ()):
+            matches.setdefault(coin.id, coin)
+        for coin in self.by_name.get(query, ()):
+            matches.setdefault(coin.id, coin)
+        return list(matches.values())
+
+    def resolve(self, query: str) -> Coin | None:
+        matches = self.lookup(query)
+        return matches[0] if matches else None
+
+    def __len__(self) -> int:
+        return len(self.coins)
+
+    def dump(self) -> bytes:
+        rows = [(c.id, c.symbol, c.name) for c in self.coins]
+        return msgpack.encode(_Snapshot(self.fetched_at, rows))
+
+    @classmethod
+    def load(cls, raw: bytes) -> "TokenIndex":
+        snapshot = msgpack.decode(raw, type=_Snapshot)
+        return cls([Coin(*row) for row in snapshot.coins], snapshot.fetched_at)
+
+
+class TokenIndexStore:
+    """Keeps the current TokenIndex, refreshes it and persists it to disk.
+
+    get() returns the index immediately once one exists. If it is older than
+    max_age a refresh starts in the background and the old index keeps
+    serving meanwhile. The first call after a restart loads the snapshot at
+    path (if set), so only a cold start without a snapshot waits for
+    /coins/list. start() additionally refreshes on a fixed schedule.
+    """
+
+    def __init__(self, path: str | os.PathLike | None = None, max_age: float = 3600.0):
+        self.path = Path(path) if path else None
+        self.max_age = max_age
+        self.index: TokenIndex | None = None
+        self._refreshing: asyncio.Task | None = None
+        self._scheduler: asyncio.Task | None = None
+        self._loading: asyncio.Task | None = None
+
+    async def get(self, fetch: Callable[[], Awaitable[list]]) -> TokenIndex:
+        if self.index is None:
+            # concurrent first callers share one snapshot read
+            if self._loading is None:
+                self._loading = asyncio.ensure_future(self._load())
+            await asyncio.shield(self._loading)
+        if self.index is None:
+            return await self.refresh(fetch)
+        if time.time() - self.index.fetched_at > self.max_age:
+            self._refresh_in_background(fetch)
+        return self.index
+
+    async def _load(self) -> None:
+        index = await asyncio.to_thread(self._read)
+        if self.index is None:
+            self.index = index
+
+    async def refresh(self, fetch: Callable[[], Awaitable[list]]) -> TokenIndex:
+        """Fetch /coins/list and swap in a new index (one refresh at a time)."""
+        if self._refreshing is None or self._refreshing.done():
+            self._refreshing = asyncio.ensure_future(self._refresh(fetch))
+        return await asyncio.shield(self._refreshing)
+
+    async def _refresh(self, fetch: Callable[[], Awaitable[list]]) -> TokenIndex:
+        index = TokenIndex.from_raw(await fetch())
+        self.index = index
+        if self.path is not None:
+            await asyncio.to_thread(self._write, index.dump())
+        return index
+
+    def _refresh_in_background(self, fetch: Callable[[], Awaitable[list]]) -> None:
+        if self._refreshing is not None and not self._refreshing.done():
+            return
+        self._refreshing = asyncio.ensure_future(self._refresh(fetch))
+        self._refreshing.add_done_callback(self._log_refresh_error)
+
+    @staticmethod
+    def _log_refresh_error(task: asyncio.Task) -> None:
+        if not task.cancelled() and task.exception() is not None:
+            logger.error("Token index refresh failed", exc_info=task.exception())
+
+    def start(
+        self, fetch: Callable[[], Awaitable[list]], interval: float | None = None
+    ) -> asyncio.Task:
+        """Refresh every interval seconds (default: max_age) until stop()."""
+
+        async def schedule() -> None:
+            while True:
+                try:
+                    await self.refresh(fetch)
+                except Exception:
+                    logger.exception("Token index refresh failed")
+                await asyncio.sleep(interval or self.max_age)
+
+        if self._scheduler is None or self._scheduler.done():
+            self._scheduler = asyncio.ensure_future(schedule())
+        return self._scheduler
+
+    async def stop(self) -> None:
+        for task in (self._scheduler, self._refreshing):
+            if task is not None and not task.done():
+                task.cancel()
+                with contextlib.suppress(asyncio.CancelledError):
+                    await task
+        self._scheduler = None
+
+    def _read(self) -> TokenIndex | None:
+        if self.path is None:
+            return None
+        try:
+            return TokenIndex.load(self.path.read_bytes())
+        except (FileNotFoundError, msgspec.DecodeError, msgspec.ValidationError):
+            return None
+
+    def _write(self, raw: bytes) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(".tmp")
+        tmp.write_bytes(raw)
+        os.replace(tmp, self.path)
@@ -2,6 +2,7 @@ import pytest
 from unittest.mock import AsyncMock, patch, MagicMock
 from coingecko_client.main import (
     CoinGeckoApiManager,
+    build_historical_prices,
     prepare_historical_prices,
     get_coingecko_manager
 )
@@ -130,6 +131,50 @@ def test_prepare_historical_prices():
     assert result["total_volume"][0] == "20000000000"
 
 
+@pytest.mark.asyncio
+async def test_prepare_historical_prices_formatted():
+    test_data = {
+        "prices": [[1672531200000, 16500.5], [1672617600000, 16600.3]],
+        "market_caps": [[1672531200000, 300000000000], [1672617600000, 310000000000]],
+        "total_volumes": [[1672531200000, 20000000000], [1672617600000, 21000000000]]
+    }
+
+    result = await prepare_historical_prices(test_data, formatted=True)
+
+    assert result["timestamp"][0] == pd.Timestamp(1672531200, unit="s")
+    assert result["market_cap"][0] == "300000000000"
+    assert result["total_volume"][0] == "20000000000"
+
+
+def test_build_historical_prices_keeps_numeric_dtypes():
+    test_data = {
+        "prices": [[1672531200000, 16500.5], [1672617600000, 16600.3]],
+        "market_caps": [[1672531200000, 300000000000], [1672617600000, 310000000000]],
+        "total_volumes": [[1672531200000, 20000000000], [1672617600000, 21000000000]]
+    }
+
+    result = build_historical_prices(test_data)
+
+    assert list(result.columns) == ["timestamp", "price", "market_cap", "total_volume"]
+    assert str(result["timestamp"].dtype) == "datetime64[ns]"
+    assert result["market_cap"].dtype == "float64"
+    assert result["total_volume"][1] == 21000000000
+
+
+def test_build_historical_prices_misaligned_series():
+    test_data = {
+        "prices": [[1672531200000, 16500.5], [1672617600000, 16600.3]],
+        "market_caps": [[1672617600000, 310000000000]],
+        "total_volumes": [[1672531200000, 20000000000], [1672617600000, 21000000000]]
+    }
+
+    result = build_historical_prices(test_data)
+
+    assert len(result) == 1
+    assert result["price"][0] == 16600.3
+    assert result["market_cap"][0] == 310000000000
+
+
 @pytest.mark.asyncio
 async def test_get_coingecko_manager():
     with patch('coingecko_client.main.ClientSession', new_callable=MagicMock) as mock_session, \
@@ -143,3 +188,275 @@ async def test_get_coingecko_manager():
         assert isinstance(manager, CoinGeckoApiManager)
         assert manager.api_key == "test_key"
         assert manager.base_url == "https://test.url"
+
+
+@pytest.mark.asyncio
+async def test_get_tokens_uses_response_cache():
+    from shared_clients.aiohttp_ import ResponseCache
+
+    session = MagicMock()
+    response = MagicMock(status=200, headers={})
+    response.read = AsyncMock(
+        return_value=b'[{"id": "bitcoin", "symbol": "btc", "name": "Bitcoin"}]'
+    )
+    session.get.return_value.__aenter__.return_value = response
+    manager = CoinGeckoApiManager(
+        api_key="test_api_key",
+        session=session,
+        base_url="https://api.coingecko.com/api/v3",
+        cache=ResponseCache(ttls={"/coins/list": 3600}),
+    )
+
+    first = await manager.get_tokens("btc")
+    second = await manager.get_tokens("bitcoin")
+
+    assert first.iloc[0]["id"] == second.iloc[0]["id"] == "bitcoin"
+    session.get.assert_called_once_with(
+        "https://api.coingecko.com/api/v3/coins/list",
+        params=None,
+        headers={"x-cg-demo-api-key": "test_api_key"},
+    )
+
+
+@pytest.mark.asyncio
+async def test_rate_limit_token_spent_only_on_network_fetch():
+    import asyncio
+
+    from shared_clients.aiohttp_ import ResponseCache
+
+    class Backend:
+        def __init__(self):
+            self.data = {}
+
+        async def get(self, key):
+            return self.data.get(key)
+
+        async def set(self, key, value, ttl):
+            self.data[key] = value
+
+    async def read():
+        await asyncio.sleep(0.01)
+        return b'{"prices": []}'
+
+    session = MagicMock()
+    response = MagicMock(status=200, headers={})
+    response.read = read
+    session.get.return_value.__aenter__.return_value = response
+    limiter = MagicMock()
+    limiter.acquire = AsyncMock(return_value=None)
+    backend = Backend()
+    manager = CoinGeckoApiManager(
+        api_key="test_api_key",
+        session=session,
+        base_url="https://api.coingecko.com/api/v3",
+        cache=ResponseCache(backend=backend),
+        limiter=limiter,
+    )
+
+    # joined in-flight calls share one request and one token
+    await asyncio.gather(*(manager._send_request("/ping", method="GET") for _ in range(3)))
+    assert limiter.acquire.await_count == 1
+
+    # a hit in the shared tier costs no token either
+    manager.cache.invalidate()
+    await manager._send_request("/ping", method="GET")
+    assert limiter.acquire.await_count == 1
+    assert session.get.call_count == 1
+
+
+@pytest.mark.asyncio
+async def test_get_tokens_uses_token_index(coingecko_manager):
+    test_data = [
+        {"id": "ethereum", "symbol": "eth", "name": "Ethereum"},
+        {"id": "ethereum-wormhole", "symbol": "eth", "name": "Ethereum (Wormhole)"},
+        {"id": "bitcoin", "symbol": "btc", "name": "Bitcoin"},
+    ]
+    with patch.object(coingecko_manager, "_send_request", new_callable=AsyncMock) as mock_request:
+        mock_request.return_value = test_data
+        eth = await coingecko_manager.get_tokens("ETH")
+        bitcoin = await coingecko_manager.get_tokens("Bitcoin")
+        missing = await coingecko_manager.get_tokens("unknown")
+
+        assert list(eth["id"]) == ["ethereum", "ethereum-wormhole"]
+        assert list(bitcoin["id"]) == ["bitcoin"]
+        assert missing.empty
+        mock_request.assert_called_once_with(method="GET", endpoint="/coins/list")
+
+
+def test_token_index_lookup_prefers_id():
+    from coingecko_client.token_index import Coin, TokenIndex
+
+    index = TokenIndex([
+        Coin("wrapped-usdc", "usdc", "Wrapped USDC"),
+        Coin("usdc", "usdc-old", "USDC"),
+    ])
+
+    assert [c.id for c in index.lookup("usdc")] == ["usdc", "wrapped-usdc"]
+    assert index.resolve("Wrapped USDC").id == "wrapped-usdc"
+    assert index.resolve("nope") is None
+
+
+@pytest.mark.asyncio
+async def test_token_index_store_warm_start(tmp_path):
+    from coingecko_client.token_index import TokenIndexStore
+
+    path = tmp_path / "coins.msgpack"
+    fetch = AsyncMock(return_value=[{"id": "bitcoin", "symbol": "btc", "name": "Bitcoin"}])
+    await TokenIndexStore(path=path).get(fetch)
+
+    restarted = TokenIndexStore(path=path)
+    index = await restarted.get(AsyncMock(side_effect=AssertionError("no fetch")))
+
+    assert index.resolve("btc").id == "bitcoin"
+    fetch.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_token_index_store_concurrent_cold_start_reads_snapshot_once(tmp_path):
+    import asyncio
+
+    from coingecko_client.token_index import Coin, TokenIndex, TokenIndexStore
+
+    path = tmp_path / "coins.msgpack"
+    path.write_bytes(TokenIndex([Coin("bitcoin", "btc", "Bitcoin")]).dump())
+    store = TokenIndexStore(path=path)
+    fetch = AsyncMock(side_effect=AssertionError("no fetch"))
+
+    with patch.object(store, "_read", wraps=store._read) as read:
+        first, second = await asyncio.gather(store.get(fetch), store.get(fetch))
+
+    assert first is second
+    read.assert_called_once()
+    fetch.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_token_index_store_refreshes_stale_index_in_background(tmp_path):
+    import asyncio
+
+    from coingecko_client.token_index import Coin, TokenIndex, TokenIndexStore
+
+    store = TokenIndexStore(max_age=60)
+    store.index = TokenIndex([Coin("bitcoin", "btc", "Bitcoin")], fetched_at=0)
+    fetch = AsyncMock(return_value=[{"id": "ethereum", "symbol": "eth", "name": "Ethereum"}])
+
+    stale = await store.get(fetch)
+    assert stale.resolve("btc") is not None
+    await asyncio.sleep(0)
+    await store._refreshing
+
+    assert store.index.resolve("eth").id == "ethereum"
+    fetch.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_token_index_store_logs_failed_background_refresh(caplog):
+    import asyncio
+
+    from coingecko_client.token_index import Coin, TokenIndex, TokenIndexStore
+
+    store = TokenIndexStore(max_age=60)
+    store.index = TokenIndex([Coin("bitcoin", "btc", "Bitcoin")], fetched_at=0)
+
+    await store.get(AsyncMock(side_effect=RuntimeError("boom")))
+    with pytest.raises(RuntimeError):
+        await store._refreshing
+    await asyncio.sleep(0)
+
+    assert "Token index refresh failed" in caplog.text
+    assert store.index.resolve("btc") is not None
+
+
+@pytest.mark.asyncio
+async def test_get_historical_prices_batch(coingecko_manager):
+    import asyncio
+
+    coins = [
+        {"id": "bitcoin", "symbol": "btc", "name": "Bitcoin"},
+        {"id": "ethereum", "symbol": "eth", "name": "Ethereum"},
+    ]
+    running = 0
+    max_running = 0
+
+    async def send_request(endpoint, params=None, method="POST"):
+        nonlocal running, max_running
+        if endpoint == "/coins/list":
+            return coins
+        running += 1
+        max_running = max(max_running, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+        price = 100.0 if "bitcoin" in endpoint else 10.0
+        return {
+            "prices": [[1672531200000, price]],
+            "market_caps": [[1672531200000, 1000]],
+            "total_volumes": [[1672531200000, 10]],
+        }
+
+    with patch.object(coingecko_manager, "_send_request", side_effect=send_request) as mock_request:
+        result = await coingecko_manager.get_historical_prices_batch(
+            ["eth", "btc", "ethereum", "unknown"], concurrency=1
+        )
+        frames = await coingecko_manager.get_historical_prices_batch(
+            ["btc"], long_format=False
+        )
+
+    assert list(result["token"]) == ["eth", "btc", "ethereum"]
+    assert list(result["price"]) == [10.0, 100.0, 10.0]
+    assert list(frames) == ["btc"]
+    assert max_running == 1
+    # /coins/list once, one market_chart per distinct coin, then btc again
+    assert mock_request.call_count == 4
+
+
+@pytest.mark.asyncio
+async def test_iter_historical_prices_streams_results(coingecko_manager):
+    coins = [{"id": "bitcoin", "symbol": "btc", "name": "Bitcoin"}]
+    chart = {
+        "prices": [[1672531200000, 1.0]],
+        "market_caps": [[1672531200000, 1.0]],
+        "total_volumes": [[1672531200000, 1.0]],
+    }
+
+    with patch.object(coingecko_manager, "_send_request", new_callable=AsyncMock) as mock_request:
+        mock_request.side_effect = [coins, chart]
+        received = [
+            (name, len(df))
+            async for name, df in coingecko_manager.iter_historical_prices(["btc"])
+        ]
+
+    assert received == [("btc", 1)]
+
+
+@pytest.mark.asyncio
+async def test_iter_historical_prices_waits_for_cancelled_fetches(coingecko_manager):
+    import asyncio
+
+    coins = [
+        {"id": "bitcoin", "symbol": "btc", "name": "Bitcoin"},
+        {"id": "ethereum", "symbol": "eth", "name": "Ethereum"},
+    ]
+    running = 0
+
+    async def send_request(endpoint, params=None, method="POST"):
+        nonlocal running
+        if endpoint == "/coins/list":
+            return coins
+        running += 1
+        try:
+            await asyncio.sleep(0 if "bitcoin" in endpoint else 1)
+        finally:
+            running -= 1
+        return {
+            "prices": [[1672531200000, 1.0]],
+            "market_caps": [[1672531200000, 1.0]],
+            "total_volumes": [[1672531200000, 1.0]],
+        }
+
+    with patch.object(coingecko_manager, "_send_request", side_effect=send_request):
+        prices = coingecko_manager.iter_historical_prices(["btc", "eth"])
+        name, _ = await anext(prices)
+        await prices.aclose()
+
+    assert name == "btc"
+    assert running == 0
@@ -0,0 +1,65 @@
+from msgspec import Struct
+
+
+class DTO(Struct, gc=False):
+    pass
+
+
+class Token(DTO):
+    address: str
+    name: str | None = None
+    symbol: str | None = None
+
+
+class Txns(DTO):
+    buys: int | None = None
+    sells: int | None = None
+
+
+class Liquidity(DTO):
+    usd: float | None = None
+    base: float | None = None
+    quote: float | None = None
+
+
+class Pair(DTO):
+    chainId: str
+    pairAddress: str
+    baseToken: Token
+    quoteToken: Token
+    dexId: str | None = None
+    url: str | None = None
+    priceNative: str | None = None
+    priceUsd: str | None = None
+    # keyed by window: m5, h1, h6, h24
+    txns: dict[str, Txns] | None = None
+    volume: dict[str, float | None] | None = None
+    priceChange: dict[str, float | None] | None = None
+    liquidity: Liquidity | None = None
+    fdv: float | None = None
+    marketCap: float | None = None
+    pairCreatedAt: int | None = None
+
+
+class PairsResponse(DTO):
+    """GET /latest/dex/pairs/{chainId}/{pairIds}"""
+
+    schemaVersion: str | None = None
+    pairs: list[Pair] | None = None
+
+
+class Link(DTO):
+    url: str
+    type: str | None = None
+    label: str | None = None
+
+
+class TokenProfile(DTO):
+    """An item of GET /token-profiles/latest/v1"""
+
+    chainId: str
+    tokenAddress: str
+    url: str | None = None
+    icon: str | None = None
+    description: str | None = None
+    links: list[Link] | None = None
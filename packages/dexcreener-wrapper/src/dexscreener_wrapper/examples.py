@@ -1,21 +1,19 @@
 import asyncio
-import json
+
+from msgspec import json
 
 from dexscreener_wrapper.main import DexScreenerAPI
 
 
 async def main():
-    api = DexScreenerAPI()
-    try:
+    async with DexScreenerAPI() as api:
         # data = await api.get_latest_token_profiles()
         #
 
         data = await api.get_token_data_by_address(
             "solana", "6xzcGi7rMd12UPD5PJSMnkTgquBZFYhhMz9D5iHgzB1w"
         )
-        print(json.dumps(data, indent=4, ensure_ascii=False))
-    finally:
-        await api.close()
+        print(json.format(json.encode(data), indent=4).decode())
 
 
 asyncio.run(main())
@@ -1,86 +1,202 @@
 import asyncio
 import time
-from collections import defaultdict
+from collections import defaultdict, deque
+from collections.abc import Iterable
 from typing import Any
 
 import aiohttp
+from msgspec import json
+from shared_clients.aiohttp_ import ResponseCache
+
+from dexscreener_wrapper import dto
 
 
 class DexScreenerAPI:
     BASE_URL = "https://api.dexscreener.com/"
 
-    # Limit the number of requests to the API
+    # Limit the number of requests to the API: "METHOD /path prefix" -> (max, window)
     RATE_LIMITS = {
         "GET /token-profiles/latest/v1": (60, 60),  # 60  requests per minute
+        "GET /token-boosts": (60, 60),
+        "GET /orders/v1": (60, 60),
         "GET /latest/dex/pairs": (300, 60),  # 300 requests per minute
+        "GET /latest/dex/search": (300, 60),
+        "GET /token-pairs/v1": (300, 60),
+        "GET /tokens/v1": (300, 60),
     }
-
-    def __init__(self):
-        self.session = aiohttp.ClientSession()
-        self.request_timestamps = defaultdict(list)
+    # Max comma-separated addresses per /tokens/v1 and /latest/dex/pairs call
+    MAX_ADDRESSES = 30
+
+    def __init__(
+        self,
+        cache: ResponseCache | None = None,
+        session: aiohttp.ClientSession | None = None,
+    ):
+        self._session = session
+        self._own_session = session is None
+        self.request_timestamps: defaultdict[str, deque[float]] = defaultdict(deque)
+        self.cache = cache
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        # Создаём сессию при первом запросе, уже внутри event loop
+        if self._session is None:
+            self._session = aiohttp.ClientSession()
+            self._own_session = True
+        return self._session
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb) -> None:
+        await self.close()
+
+    def _limit_key(self, endpoint: str) -> str | None:
+        """The RATE_LIMITS key covering endpoint (longest matching prefix)."""
+        if endpoint in self.RATE_LIMITS:
+            return endpoint
+        best = None
+        for key in self.RATE_LIMITS:
+            prefix = key.partition(" ")[2]
+            if endpoint.startswith(prefix) and (best is None or len(key) > len(best)):
+                best = key
+        return best
 
     async def _check_rate_limit(self, endpoint: str):
         """Check if we can send a request to this endpoint.
         If the rate limit is exceeded, sleep for a while.
 
+        Sliding window: every request reserves a timestamp in the deque of its
+        RATE_LIMITS key. When the window is full the request takes the slot
+        freed by the oldest entry and sleeps until then, so concurrent callers
+        queue up in order instead of all waking at once.
+
         param endpoint: The endpoint to check the rate limit for
         """
-        if endpoint not in self.RATE_LIMITS:
+        key = self._limit_key(endpoint)
+        if key is None:
             return  # Если лимит не задан, проверку не делаем
 
-        max_requests, time_window = self.RATE_LIMITS[endpoint]
+        max_requests, time_window = self.RATE_LIMITS[key]
+        window = self.request_timestamps[key]
         now = time.time()
 
         # Delete old timestamps
-        self.request_timestamps[endpoint] = [
-            t for t in self.request_timestamps[endpoint] if now - t < time_window
-        ]
+        while window and now - window[0] >= time_window:
+            window.popleft()
 
-        if len(self.request_timestamps[endpoint]) >= max_requests:
-            sleep_time = time_window - (now - self.request_timestamps[endpoint][0])
+        at = now
+        if len(window) >= max_requests:
+            at = max(now, window.popleft() + time_window)
+        window.append(at)
+
+        if at > now:
             print(
-                f"Rate limit exceeded for {endpoint}. Sleeping for {sleep_time:.2f} seconds..."
+                f"Rate limit exceeded for {key}. Sleeping for {at - now:.2f} seconds..."
             )
-            await asyncio.sleep(sleep_time)
-
-        self.request_timestamps[endpoint].append(time.time())
+            await asyncio.sleep(at - now)
 
     async def _request(
-        self, endpoint: str, params: dict[str, Any] = None
-    ) -> dict[str, Any]:
-        """Make a request to the API.
+        self, endpoint: str, params: dict[str, Any] = None, type: Any = Any
+    ) -> Any:
+        """Make a request to the API and decode the body into type.
 
         param endpoint: The endpoint to request
         param params: Optional query parameters
+        param type: The dto schema of the response
         """
+        url = f"{self.BASE_URL.rstrip('/')}{endpoint}"
+        if self.cache is not None:
+            # Свежий ответ из кэша не расходует лимит запросов
+            body = self.cache.peek(url, params)
+            if body is None:
+                await self._check_rate_limit(endpoint)
+                body = await self.cache.get(self.session, url, params=params)
+            return json.decode(body, type=type)
+
         await self._check_rate_limit(endpoint)
 
-        async with self.session.get(
-            f"{self.BASE_URL}{endpoint}", params=params
-        ) as response:
+        async with self.session.get(url, params=params) as response:
             if response.status != 200:
                 raise Exception(f"Error {response.status}: {await response.text()}")
-            return await response.json()
+            return json.decode(await response.read(), type=type)
 
-    async def get_latest_token_profiles(self) -> dict[str, Any]:
+    async def get_latest_token_profiles(self) -> list[dto.TokenProfile]:
         """Get the latest token profiles (rate-limit 60 requests per minute)."""
-        return await self._request("/token-profiles/latest/v1")
+        return await self._request(
+            "/token-profiles/latest/v1", type=list[dto.TokenProfile]
+        )
 
-    async def get_pairs_data_by_pool_address(self, chain: str, pair_address: str):
+    async def get_pairs_data_by_pool_address(
+        self, chain: str, pair_address: str
+    ) -> dto.PairsResponse:
         """Get one or multiple pairs by chain and pair address (rate-limit 300 requests per minute).
 
         param chain: The chain to get the pairs from(solana,ether)
         param pair_address: The address of the pair(6xzcGi7rMd12UPD5PJSMnkTgquBZFYhhMz9D5iHgzB1w)
         """
-        return await self._request(f"/latest/dex/pairs/{chain}/{pair_address}")
+        return await self._request(
+            f"/latest/dex/pairs/{chain}/{pair_address}", type=dto.PairsResponse
+        )
 
-    async def get_token_data_by_address(self, chain: str, token_address: str):
+    async def get_token_data_by_address(
+        self, chain: str, token_address: str
+    ) -> list[dto.Pair]:
         """Get one or multiple pairs by token address (rate-limit 300 requests per minute)
         param chain: The chain to get the pairs from(solana,ether)
         param token_address: The address of the token(6xzcGi7rMd12UPD5PJSMnkTgquBZFYhhMz9D5iHgzB1w).
         """
-        return await self._request(f"/tokens/v1/{chain}/{token_address}")
+        return await self._request(
+            f"/tokens/v1/{chain}/{token_address}", type=list[dto.Pair]
+        )
+
+    async def _batched(
+        self, endpoint: str, addresses: Iterable[str], type: Any
+    ) -> list[dto.Pair]:
+        addresses = list(dict.fromkeys(addresses))
+        chunks = [
+            addresses[i : i + self.MAX_ADDRESSES]
+            for i in range(0, len(addresses), self.MAX_ADDRESSES)
+        ]
+        responses = await asyncio.gather(
+            *(
+                self._request(f"{endpoint}/{','.join(chunk)}", type=type)
+                for chunk in chunks
+            )
+        )
+        pairs = []
+        for response in responses:
+            if isinstance(response, dto.PairsResponse):
+                response = response.pairs
+            pairs.extend(response or ())
+        return pairs
+
+    async def get_pairs_data_by_pool_addresses(
+        self, chain: str, pair_addresses: Iterable[str]
+    ) -> list[dto.Pair]:
+        """Get many pairs by chain and pair address, up to 30 per request.
+
+        param chain: The chain to get the pairs from(solana,ether)
+        param pair_addresses: The addresses of the pairs
+        """
+        return await self._batched(
+            f"/latest/dex/pairs/{chain}", pair_addresses, dto.PairsResponse
+        )
+
+    async def get_tokens_data_by_addresses(
+        self, chain: str, token_addresses: Iterable[str]
+    ) -> list[dto.Pair]:
+        """Get the pairs of many tokens by address, up to 30 per request.
+
+        param chain: The chain to get the pairs from(solana,ether)
+        param token_addresses: The addresses of the tokens
+        """
+        return await self._batched(
+            f"/tokens/v1/{chain}", token_addresses, list[dto.Pair]
+        )
 
     async def close(self):
         """Close the aiohttp session."""
-        await self.session.close()
+        if self._session is not None and self._own_session:
+            await self._session.close()
+        self._session = None
@@ -1,11 +1,14 @@
 import pytest
 from unittest.mock import AsyncMock, patch, MagicMock
 from aiohttp import ClientResponse, ClientSession
-from collections import defaultdict
+from collections import defaultdict, deque
+from dexscreener_wrapper import dto
 from dexscreener_wrapper.main import DexScreenerAPI
 import time
 import asyncio
 
+from msgspec import json
+
 
 @pytest.fixture
 def mock_session():
@@ -15,14 +18,14 @@ def mock_session():
 @pytest.fixture
 def dex_screener(mock_session):
     with patch('aiohttp.ClientSession', return_value=mock_session):
-        return DexScreenerAPI()
+        yield DexScreenerAPI()
 
 
 @pytest.fixture
 def mock_response():
     response = MagicMock(spec=ClientResponse)
     response.status = 200
-    response.json = AsyncMock(return_value={"data": "test"})
+    response.read = AsyncMock(return_value=b'{"data": "test"}')
     return response
 
 
@@ -36,7 +39,7 @@ async def test_check_rate_limit_no_limit(dex_screener):
 @pytest.mark.asyncio
 async def test_check_rate_limit_within_limit(dex_screener):
     endpoint = "GET /token-profiles/latest/v1"
-    dex_screener.request_timestamps[endpoint] = [time.time() - 30] * 50  # 50 запросов за 30 сек
+    dex_screener.request_timestamps[endpoint] = deque([time.time() - 30] * 50)  # 50 запросов за 30 сек
     await dex_screener._check_rate_limit(endpoint)
     assert len(dex_screener.request_timestamps[endpoint]) == 51
 
@@ -44,7 +47,7 @@ async def test_check_rate_limit_within_limit(dex_screener):
 @pytest.mark.asyncio
 async def test_check_rate_limit_exceeded(dex_screener, capsys):
     endpoint = "GET /token-profiles/latest/v1"
-    dex_screener.request_timestamps[endpoint] = [time.time() - 30] * 60  # 60 запросов за 30 сек
+    dex_screener.request_timestamps[endpoint] = deque([time.time() - 30] * 60)  # 60 запросов за 30 сек
 
     with patch('asyncio.sleep', new_callable=AsyncMock) as mock_sleep:
         await dex_screener._check_rate_limit(endpoint)
@@ -87,7 +90,9 @@ async def test_get_latest_token_profiles(dex_screener):
         mock_request.return_value = {"profiles": []}
         result = await dex_screener.get_latest_token_profiles()
         assert result == {"profiles": []}
-        mock_request.assert_awaited_once_with("/token-profiles/latest/v1")
+        mock_request.assert_awaited_once_with(
+            "/token-profiles/latest/v1", type=list[dto.TokenProfile]
+        )
 
 
 @pytest.mark.asyncio
@@ -96,7 +101,9 @@ async def test_get_pairs_data_by_pool_address(dex_screener):
         mock_request.return_value = {"pair": "data"}
         result = await dex_screener.get_pairs_data_by_pool_address("solana", "address123")
         assert result == {"pair": "data"}
-        mock_request.assert_awaited_once_with("/latest/dex/pairs/solana/address123")
+        mock_request.assert_awaited_once_with(
+            "/latest/dex/pairs/solana/address123", type=dto.PairsResponse
+        )
 
 
 @pytest.mark.asyncio
@@ -105,11 +112,14 @@ async def test_get_token_data_by_address(dex_screener):
         mock_request.return_value = {"token": "data"}
         result = await dex_screener.get_token_data_by_address("ether", "token123")
         assert result == {"token": "data"}
-        mock_request.assert_awaited_once_with("/tokens/v1/ether/token123")
+        mock_request.assert_awaited_once_with(
+            "/tokens/v1/ether/token123", type=list[dto.Pair]
+        )
 
 
 @pytest.mark.asyncio
 async def test_close(dex_screener, mock_session):
+    assert dex_screener.session is mock_session
     await dex_screener.close()
     mock_session.close.assert_awaited_once()
 
@@ -117,7 +127,12 @@ async def test_close(dex_screener, mock_session):
 def test_rate_limits_defined():
     assert DexScreenerAPI.RATE_LIMITS == {
         "GET /token-profiles/latest/v1": (60, 60),
+        "GET /token-boosts": (60, 60),
+        "GET /orders/v1": (60, 60),
         "GET /latest/dex/pairs": (300, 60),
+        "GET /latest/dex/search": (300, 60),
+        "GET /token-pairs/v1": (300, 60),
+        "GET /tokens/v1": (300, 60),
     }
 
 
@@ -125,8 +140,120 @@ def test_rate_limits_defined():
 async def test_rate_limit_cleanup(dex_screener):
     endpoint = "GET /token-profiles/latest/v1"
     now = time.time()
-    dex_screener.request_timestamps[endpoint] = [now - 120, now - 30, now - 10]
+    dex_screener.request_timestamps[endpoint] = deque([now - 120, now - 30, now - 10])
 
     await dex_screener._check_rate_limit(endpoint)
 
     assert len(dex_screener.request_timestamps[endpoint]) == 3  # 1 удалился, 1 добавился
+
+
+@pytest.mark.asyncio
+async def test_rate_limit_matches_real_endpoints(dex_screener):
+    await dex_screener._check_rate_limit("/latest/dex/pairs/solana/address123")
+    await dex_screener._check_rate_limit("/tokens/v1/solana/token123")
+
+    assert len(dex_screener.request_timestamps["GET /latest/dex/pairs"]) == 1
+    assert len(dex_screener.request_timestamps["GET /tokens/v1"]) == 1
+
+
+@pytest.mark.asyncio
+async def test_rate_limit_queues_concurrent_requests(dex_screener):
+    endpoint = "GET /token-profiles/latest/v1"
+    now = time.time()
+    dex_screener.request_timestamps[endpoint] = deque([now - 50, now - 40] + [now - 30] * 58)
+
+    with patch("asyncio.sleep", new_callable=AsyncMock) as mock_sleep:
+        await dex_screener._check_rate_limit(endpoint)
+        await dex_screener._check_rate_limit(endpoint)
+
+    first, second = (call.args[0] for call in mock_sleep.await_args_list)
+    assert 9 < first < 10.5
+    assert 19 < second < 20.5
+    assert len(dex_screener.request_timestamps[endpoint]) == 60
+
+
+@pytest.mark.asyncio
+async def test_session_is_created_lazily_and_closed_on_exit(mock_session):
+    with patch("aiohttp.ClientSession", return_value=mock_session) as session_cls:
+        async with DexScreenerAPI() as api:
+            session_cls.assert_not_called()
+            assert api.session is mock_session
+        session_cls.assert_called_once()
+    mock_session.close.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_get_pairs_data_by_pool_addresses_batches(dex_screener):
+    addresses = [f"pair{i}" for i in range(35)]
+
+    async def request(endpoint, params=None, type=None):
+        return dto.PairsResponse(pairs=[
+            {"pairAddress": a} for a in endpoint.rsplit("/", 1)[1].split(",")
+        ])
+
+    with patch.object(dex_screener, "_request", side_effect=request) as mock_request:
+        pairs = await dex_screener.get_pairs_data_by_pool_addresses("solana", addresses + ["pair0"])
+
+    assert [p["pairAddress"] for p in pairs] == addresses
+    assert mock_request.await_count == 2
+    mock_request.assert_any_await(
+        "/latest/dex/pairs/solana/" + ",".join(addresses[30:]), type=dto.PairsResponse
+    )
+
+
+@pytest.mark.asyncio
+async def test_get_tokens_data_by_addresses(dex_screener):
+    with patch.object(dex_screener, "_request", new_callable=AsyncMock) as mock_request:
+        mock_request.return_value = [{"pairAddress": "p1"}, {"pairAddress": "p2"}]
+        pairs = await dex_screener.get_tokens_data_by_addresses("solana", ["t1", "t2"])
+
+    assert len(pairs) == 2
+    mock_request.assert_awaited_once_with("/tokens/v1/solana/t1,t2", type=list[dto.Pair])
+
+
+PAIR = {
+    "chainId": "solana",
+    "dexId": "raydium",
+    "pairAddress": "pair1",
+    "labels": ["CLMM"],
+    "baseToken": {"address": "Tok1", "name": "Token", "symbol": "TOK"},
+    "quoteToken": {"address": "So11111111111111111111111111111111111111112", "symbol": "SOL"},
+    "priceUsd": "0.5",
+    "txns": {"h24": {"buys": 10, "sells": 4}},
+    "volume": {"h24": 1234.5},
+    "liquidity": {"usd": 1000, "base": 2000, "quote": 5},
+    "info": {"imageUrl": "https://example.com/i.png", "websites": []},
+}
+
+
+@pytest.mark.asyncio
+async def test_request_decodes_into_schema(dex_screener, mock_session, mock_response):
+    mock_response.read = AsyncMock(return_value=json.encode([PAIR]))
+    mock_session.get.return_value.__aenter__.return_value = mock_response
+
+    pairs = await dex_screener.get_token_data_by_address("solana", "Tok1")
+
+    assert pairs == [dto.Pair(
+        chainId="solana",
+        dexId="raydium",
+        pairAddress="pair1",
+        baseToken=dto.Token(address="Tok1", name="Token", symbol="TOK"),
+        quoteToken=dto.Token(address="So11111111111111111111111111111111111111112", symbol="SOL"),
+        priceUsd="0.5",
+        txns={"h24": dto.Txns(buys=10, sells=4)},
+        volume={"h24": 1234.5},
+        liquidity=dto.Liquidity(usd=1000.0, base=2000.0, quote=5.0),
+    )]
+
+
+@pytest.mark.asyncio
+async def test_request_decodes_null_sections(dex_screener, mock_session, mock_response):
+    pair = {**PAIR, "txns": None, "volume": {"h24": None}, "priceChange": None, "liquidity": None}
+    mock_response.read = AsyncMock(return_value=json.encode([pair]))
+    mock_session.get.return_value.__aenter__.return_value = mock_response
+
+    pairs = await dex_screener.get_token_data_by_address("solana", "Tok1")
+
+    assert pairs[0].txns is None
+    assert pairs[0].volume == {"h24": None}
+    assert pairs[0].priceChange is None
@@ -1,31 +1,99 @@
+import asyncio
+from collections import deque
+from collections.abc import AsyncIterator, Mapping
 from typing import Any
 
-import aiohttp
-from aiolimiter import AsyncLimiter
+from aiohttp import ClientResponseError
+from aiohttp.client import _RequestOptions
+from msgspec import json
+from multidict import CIMultiDict
+from shared_clients.aiohttp_ import (
+    AiohttpAPI,
+    AiohttpSession,
+    RateLimiter,
+    ResponseCache,
+)
+from shared_clients.exceptions import APIError
 
 
-class DextoolsAPIWrapper:
+class DextoolsAPIError(APIError, Exception):
+    """An HTTP failure; an APIError that ``except Exception`` also catches."""
+
+
+class DextoolsSession(AiohttpSession):
+    __slots__ = ("__headers",)
+
+    def __init__(
+        self,
+        base_url: str,
+        headers: Mapping[str, str],
+        shared: str = "dextools",
+        limiter: RateLimiter | None = None,
+    ) -> None:
+        # Сессия берётся из session_registry при первом запросе, пул соединений
+        # к Dextools общий для всех клиентов процесса
+        super().__init__(None, base_url, shared, limiter)
+        self.__headers = dict(headers)
+        self._limiter_key = self.__headers.get("X-API-Key")
+
+    def _handle_kwargs(self, **kwargs) -> _RequestOptions:
+        headers = CIMultiDict[str](self.__headers)
+        headers.update(kwargs.get("headers") or {})
+        kwargs["headers"] = headers
+        return kwargs
+
+
+class DextoolsAPIWrapper(AiohttpAPI[DextoolsSession]):
+    # Requests per second allowed by each plan
+    PLAN_RATE_LIMITS = {
+        "free": 1,
+        "trial": 1,
+        "standard": 2,
+        "advanced": 4,
+        "pro": 10,
+        "partner": 20,
+    }
+
     def __init__(
         self,
         api_key: str,
         plan: str,
         useragent: str = "API-Wrapper/0.3",
-        requests_per_second: int = 1,
+        requests_per_second: int | None = None,
+        cache: ResponseCache | None = None,
+        shared: str = "dextools",
     ):
+        """requests_per_second defaults to the limit of the plan."""
         self._headers = None
         self.url = None
         self._api_key = api_key
         self._useragent = useragent
         self.plan = plan
-        self._limiter = AsyncLimiter(
-            requests_per_second, 1
-        )  # Limit requests per second
+        self.cache = cache
+        self._requests_per_second = requests_per_second
+        self._limiter = None
 
         self.set_plan(plan)
-        self._session = aiohttp.ClientSession()
+        self._headers = {
+            "X-API-Key": self._api_key,
+            "Accept": "application/json",
+            "User-Agent": self._useragent,
+        }
+        rate = self.requests_per_second
+        self._limiter = RateLimiter(rate=rate, burst=rate)  # Limit requests per second
+        # Сессия и лимитер создаются один раз; URL плана подставляется в _request,
+        # так что смена плана их не трогает
+        super().__init__(DextoolsSession("", self._headers, shared, self._limiter))
+
+    @property
+    def requests_per_second(self) -> int:
+        return self._requests_per_second or self.PLAN_RATE_LIMITS[self.plan]
 
     def set_plan(self, plan):
         """The method sets the plan for the API.
+
+        On a live client the session is kept and the limiter is retuned to
+        the plan's rate in place.
         param plan: str.
         """
         plan = plan.lower()
@@ -39,43 +107,35 @@ class DextoolsAPIWrapper:
         else:
             raise ValueError("Plan not found")
 
-        self._headers = {
-            "X-API-Key": self._api_key,
-            "Accept": "application/json",
-            "User-Agent": self._useragent,
-        }
+        if self._limiter is not None:
+            # тот же лимитер: запросы в полёте и накопленные токены сохраняются
+            rate = self.requests_per_second
+            self._limiter.set_rate(rate, rate)
         print(f"Plan URL: {self.url}")
         print(f"Set up plan: {plan}")
 
-    async def __aenter__(self):
-        """The method is called when entering the context manager."""
-        return self
-
-    async def __aexit__(self, exc_type, exc_val, exc_tb):
-        """The method is called when exiting the context manager."""
-        await self.close()
-
     async def close(self):
-        """The method closes the session."""
-        await self._session.close()
+        """Releases the session (the shared pool stays open for other clients)."""
+        await self.__aexit__(None, None, None)
 
     async def _request(self, endpoint: str, params: dict[str, Any] | None = None):
         """The method sends a request to the API.
         param endpoint: str
         param params: Optional[Dict[str, Any]].
+
+        Errors surface as DextoolsAPIError.
         """
-        async with self._limiter:  # Limit requests
-            url = f"{self.url}{endpoint}"
-            async with self._session.get(
-                url, headers=self._headers, params=params
-            ) as response:
-                if response.status == 403:
-                    response.raise_for_status()
-                    raise Exception(
-                        "Access denied (403). Check your API key or request limits."
-                    )
-                response.raise_for_status()
-                return await response.json()
+        params = {k: v for k, v in (params or {}).items() if v is not None} or None
+        url = f"{self.url}{endpoint}"
+        try:
+            if self.cache is not None:
+                body = await self.cache.get(self._session, url, params=params)
+                return json.decode(body)
+            return await self._session.fetch("GET", url, params=params)
+        except APIError as e:
+            raise DextoolsAPIError(e.status, e.message, **e.kwargs) from e
+        except ClientResponseError as e:
+            raise DextoolsAPIError(e.status, e.message) from e
 
     async def get_blockchain(self, chain: str):
         """Retrieve information about a specific blockchain.
@@ -137,3 +197,63 @@ class DextoolsAPIWrapper:
 
         params = {k: v for k, v in params.items() if v is not None}
         return await self._request(f"/pool/{chain}", params=params)
+
+    async def iter_pools(
+        self,
+        chain,
+        from_,
+        to,
+        order="asc",
+        sort="creationTime",
+        pageSize=None,
+        concurrency: int | None = None,
+    ) -> AsyncIterator[dict[str, Any]]:
+        """Yield every pool created between from_ and to, page by page.
+
+        The first page tells how many pages there are; the rest are fetched
+        in parallel, at most concurrency at a time (by default as many as the
+        plan allows per second), and yielded in page order as they arrive.
+
+        param concurrency: Optional[int]
+        """
+        first = await self.get_pools(
+            chain, from_, to, order=order, sort=sort, page=0, pageSize=pageSize
+        )
+        data = first.get("data") or {}
+        for pool in data.get("results") or ():
+            yield pool
+        total_pages = data.get("totalPages") or 1
+
+        window = max(1, concurrency or self.requests_per_second)
+        pending: deque[asyncio.Future] = deque()
+        next_page = 1
+
+        def schedule() -> None:
+            nonlocal next_page
+            while next_page < total_pages and len(pending) < window:
+                pending.append(
+                    asyncio.ensure_future(
+                        self.get_pools(
+                            chain,
+                            from_,
+                            to,
+                            order=order,
+                            sort=sort,
+                            page=next_page,
+                            pageSize=pageSize,
+                        )
+                    )
+                )
+                next_page += 1
+
+        schedule()
+        try:
+            while pending:
+                response = await pending.popleft()
+                schedule()
+                for pool in (response.get("data") or {}).get("results") or ():
+                    yield pool
+        finally:
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
@@ -1,41 +1,34 @@
 import pytest
-from unittest.mock import AsyncMock, patch, MagicMock
-from aiohttp import ClientResponse, ClientSession
-from aiolimiter import AsyncLimiter
+import pytest_asyncio
+from unittest.mock import AsyncMock, patch
+from aioresponses import aioresponses
+from yarl import URL
 from dextools_wrapper.main import DextoolsAPIWrapper
+from shared_clients.aiohttp_ import RateLimiter, session_registry
+from shared_clients.exceptions import APIError
 
 
-
-@pytest.fixture
-def mock_session():
-    return MagicMock(spec=ClientSession)
-
-
-@pytest.fixture
-def mock_limiter():
-    return MagicMock(spec=AsyncLimiter)
-
-
-@pytest.fixture
-def dextools_wrapper(mock_session, mock_limiter):
-    with patch('aiohttp.ClientSession', return_value=mock_session), \
-            patch('aiolimiter.AsyncLimiter', return_value=mock_limiter):
-        return DextoolsAPIWrapper(
-            api_key="test_api_key",
-            plan="standard",
-            useragent="test-agent",
-            requests_per_second=5
-        )
+@pytest_asyncio.fixture
+async def dextools_wrapper():
+    wrapper = DextoolsAPIWrapper(
+        api_key="test_api_key",
+        plan="standard",
+        useragent="test-agent",
+        requests_per_second=5
+    )
+    yield wrapper
+    await wrapper.close()
+    await session_registry.close()
 
 
 @pytest.mark.asyncio
-async def test_init(dextools_wrapper, mock_session, mock_limiter):
+async def test_init(dextools_wrapper):
     assert dextools_wrapper._api_key == "test_api_key"
     assert dextools_wrapper._useragent == "test-agent"
     assert dextools_wrapper.plan == "standard"
     assert dextools_wrapper.url == "https://public-api.dextools.io/standard/v2"
-    mock_session.assert_called_once()
-    mock_limiter.assert_called_once_with(5, 1)
+    assert isinstance(dextools_wrapper._limiter, RateLimiter)
+    assert dextools_wrapper._limiter.rate == 5
 
 
 @pytest.mark.parametrize("plan,expected_url", [
@@ -58,67 +51,74 @@ def test_set_plan_success(dextools_wrapper, plan, expected_url):
 
 
 def test_set_plan_invalid():
-    with patch('aiohttp.ClientSession'), patch('aiolimiter.AsyncLimiter'):
-        wrapper = DextoolsAPIWrapper(api_key="test", plan="standard")
-        with pytest.raises(ValueError, match="Plan not found"):
-            wrapper.set_plan("invalid_plan")
+    wrapper = DextoolsAPIWrapper(api_key="test", plan="standard")
+    with pytest.raises(ValueError, match="Plan not found"):
+        wrapper.set_plan("invalid_plan")
 
 
 @pytest.mark.asyncio
 async def test_context_manager():
-    mock_session = MagicMock(spec=ClientSession)
-    with patch('aiohttp.ClientSession', return_value=mock_session), \
-            patch('aiolimiter.AsyncLimiter'):
-        async with DextoolsAPIWrapper("test", "standard") as wrapper:
-            assert isinstance(wrapper, DextoolsAPIWrapper)
-        mock_session.close.assert_awaited_once()
+    async with DextoolsAPIWrapper("test", "standard") as wrapper:
+        assert isinstance(wrapper, DextoolsAPIWrapper)
+        session = session_registry.get_session("dextools")
+    # общий пул не закрывается вместе с клиентом
+    assert not session.closed
+    await session_registry.close()
 
 
 @pytest.mark.asyncio
-async def test_close(dextools_wrapper, mock_session):
+async def test_close(dextools_wrapper):
     await dextools_wrapper.close()
-    mock_session.close.assert_awaited_once()
+    with aioresponses() as mocked:
+        mocked.get("https://public-api.dextools.io/standard/v2/test", payload={})
+        assert await dextools_wrapper._request("/test") == {}
 
 
 @pytest.mark.asyncio
-async def test_request_success(dextools_wrapper, mock_session, mock_limiter):
-    mock_response = MagicMock(spec=ClientResponse)
-    mock_response.status = 200
-    mock_response.json = AsyncMock(return_value={"data": "test"})
-    mock_session.get.return_value.__aenter__.return_value = mock_response
-
-    result = await dextools_wrapper._request("/test", {"param": "value"})
+async def test_request_success(dextools_wrapper):
+    url = "https://public-api.dextools.io/standard/v2/test"
+    with aioresponses() as mocked:
+        mocked.get(f"{url}?param=value", payload={"data": "test"})
+        result = await dextools_wrapper._request("/test", {"param": "value", "page": None})
 
     assert result == {"data": "test"}
-    mock_limiter.acquire.assert_awaited_once()
-    mock_session.get.assert_called_once_with(
-        "https://public-api.dextools.io/standard/v2/test",
-        headers=dextools_wrapper._headers,
-        params={"param": "value"}
-    )
+    request = mocked.requests[("GET", URL(f"{url}?param=value"))][0]
+    assert request.kwargs["headers"]["X-API-Key"] == "test_api_key"
+    assert request.kwargs["headers"]["User-Agent"] == "test-agent"
 
 
 @pytest.mark.asyncio
-async def test_request_rate_limited(dextools_wrapper, mock_limiter):
-    mock_limiter.acquire.side_effect = [None, None]
-    mock_response = MagicMock(spec=ClientResponse)
-    mock_response.status = 200
-    mock_response.json = AsyncMock(return_value={})
-    with patch.object(dextools_wrapper, '_session') as mock_session:
-        mock_session.get.return_value.__aenter__.return_value = mock_response
+async def test_request_rate_limited(dextools_wrapper):
+    with aioresponses() as mocked, \
+            patch.object(dextools_wrapper._limiter, "_acquire", new_callable=AsyncMock) as mock_acquire:
+        mocked.get("https://public-api.dextools.io/standard/v2/test", payload={})
         await dextools_wrapper._request("/test")
-        mock_limiter.acquire.assert_awaited()
+        mock_acquire.assert_awaited_once()
 
 
 @pytest.mark.asyncio
-async def test_request_403_error(dextools_wrapper, mock_session):
-    mock_response = MagicMock(spec=ClientResponse)
-    mock_response.status = 403
-    mock_response.text = AsyncMock(return_value="Forbidden")
-    mock_session.get.return_value.__aenter__.return_value = mock_response
+async def test_request_403_error(dextools_wrapper):
+    with aioresponses() as mocked:
+        mocked.get("https://public-api.dextools.io/standard/v2/test", status=403, body="Forbidden")
+
+        with pytest.raises(APIError) as exc_info:
+            await dextools_wrapper._request("/test")
+
+    assert exc_info.value.status == 403
+    assert isinstance(exc_info.value, Exception)
 
-    with pytest.raises(Exception, match="Access denied"):
-        await dextools_wrapper._request("/test")
+
+@pytest.mark.asyncio
+async def test_set_plan_keeps_session_and_limiter(dextools_wrapper):
+    session, limiter = dextools_wrapper._session, dextools_wrapper._limiter
+    dextools_wrapper.set_plan("pro")
+
+    assert dextools_wrapper._session is session
+    assert dextools_wrapper._limiter is limiter
+    assert limiter.rate == 5
+    with aioresponses() as mocked:
+        mocked.get("https://public-api.dextools.io/pro/v2/test", payload={"ok": 1})
+        assert await dextools_wrapper._request("/test") == {"ok": 1}
 
 
 @pytest.mark.asyncio
@@ -181,3 +181,79 @@ async def test_get_pools(dextools_wrapper):
                 "pageSize": 10
             }
         )
+
+
+@pytest.mark.parametrize(("plan", "expected_rate"), [("free", 1), ("standard", 2), ("pro", 10), ("partner", 20)])
+def test_requests_per_second_follows_plan(plan, expected_rate):
+    wrapper = DextoolsAPIWrapper(api_key="test", plan=plan)
+    assert wrapper.requests_per_second == expected_rate
+    assert wrapper._limiter.rate == expected_rate
+    wrapper.set_plan("advanced")
+    assert wrapper._limiter.rate == 4
+    assert DextoolsAPIWrapper(api_key="test", plan=plan, requests_per_second=3).requests_per_second == 3
+
+
+@pytest.mark.asyncio
+async def test_iter_pools_fetches_remaining_pages_in_parallel(dextools_wrapper):
+    import asyncio
+
+    in_flight = 0
+    max_in_flight = 0
+
+    async def request(endpoint, params=None):
+        nonlocal in_flight, max_in_flight
+        in_flight += 1
+        max_in_flight = max(max_in_flight, in_flight)
+        await asyncio.sleep(0.01 if params["page"] % 2 else 0.02)
+        in_flight -= 1
+        page = params["page"]
+        return {
+            "statusCode": 200,
+            "data": {
+                "page": page,
+                "totalPages": 5,
+                "results": [{"address": f"pool-{page}-{i}"} for i in range(2)],
+            },
+        }
+
+    with patch.object(dextools_wrapper, "_request", side_effect=request) as mock_request:
+        pools = [
+            pool["address"]
+            async for pool in dextools_wrapper.iter_pools("solana", "2023-01-01", "2023-01-02", concurrency=3)
+        ]
+
+    assert pools == [f"pool-{page}-{i}" for page in range(5) for i in range(2)]
+    assert mock_request.await_count == 5
+    assert max_in_flight == 3
+    mock_request.assert_any_await(
+        "/pool/solana",
+        params={"from": "2023-01-01", "to": "2023-01-02", "order": "asc", "sort": "creationTime", "page": 0},
+    )
+
+
+@pytest.mark.asyncio
+async def test_iter_pools_waits_for_cancelled_pages(dextools_wrapper):
+    import asyncio
+
+    in_flight = 0
+
+    async def request(endpoint, params=None):
+        nonlocal in_flight
+        in_flight += 1
+        try:
+            await asyncio.sleep(0 if params["page"] < 2 else 1)
+        finally:
+            in_flight -= 1
+        return {
+            "statusCode": 200,
+            "data": {"page": params["page"], "totalPages": 5, "results": [{"address": "pool"}]},
+        }
+
+    with patch.object(dextools_wrapper, "_request", side_effect=request):
+        pools = dextools_wrapper.iter_pools("solana", "2023-01-01", "2023-01-02", concurrency=3)
+        await anext(pools)
+        # the second page arrives while the later ones are still in flight
+        assert (await anext(pools))["address"] == "pool"
+        await pools.aclose()
+
+    assert in_flight == 0
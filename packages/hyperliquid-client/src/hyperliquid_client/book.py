@@ -0,0 +1,293 @@
+import asyncio
+import contextlib
+import json
+import logging
+from collections.abc import Iterable
+from typing import NamedTuple
+
+import numpy as np
+import pandas as pd
+from aiohttp import ClientError, ClientSession, WSMsgType
+
+logger = logging.getLogger(__name__)
+
+_EMPTY = np.empty((0, 2), dtype=np.float64)
+
+
+def parse_levels(side: list[dict]) -> np.ndarray:
+    """One side of an l2Book response as an (n, 2) float64 array of px, sz."""
+    if not side:
+        return _EMPTY
+    return np.array([(level["px"], level["sz"]) for level in side], dtype=np.float64)
+
+
+class Liquidity(NamedTuple):
+    coin: str
+    bids: float
+    asks: float
+    sum_liquidity: float
+    mid: float | None
+    # bps -> (bid size, ask size) within bps of mid
+    depth: dict[float, tuple[float, float]]
+    bid_levels: int
+    ask_levels: int
+
+    def to_frame(self) -> pd.DataFrame:
+        """The type/sz frame get_pool_liquidity has always returned.
+
+        A side without levels has no row, as with the old groupby.
+        """
+        types, sizes = [], []
+        if self.ask_levels:
+            types.append("asks")
+            sizes.append(self.asks)
+        if self.bid_levels:
+            types.append("bids")
+            sizes.append(self.bids)
+        types.append("sum_liquidity")
+        sizes.append(self.sum_liquidity)
+        return pd.DataFrame({"type": types, "sz": sizes})
+
+
+def aggregate(
+    coin: str, bids: np.ndarray, asks: np.ndarray, depth_bps: Iterable[float] = ()
+) -> Liquidity:
+    """Liquidity totals of a book in O(levels), without pandas."""
+    bid_total = float(bids[:, 1].sum())
+    ask_total = float(asks[:, 1].sum())
+    mid = None
+    depth = {}
+    if len(bids) and len(asks):
+        mid = (float(bids[:, 0].max()) + float(asks[:, 0].min())) / 2
+        for bps in depth_bps:
+            band = mid * bps / 10_000
+            depth[bps] = (
+                float(bids[bids[:, 0] >= mid - band, 1].sum()),
+                float(asks[asks[:, 0] <= mid + band, 1].sum()),
+            )
+    return Liquidity(
+        coin,
+        bid_total,
+        ask_total,
+        bid_total + ask_total,
+        mid,
+        depth,
+        len(bids),
+        len(asks),
+    )
+
+
+def _stack(sides: list[np.ndarray]) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    counts = np.fromiter((len(side) for side in sides), dtype=np.intp, count=len(sides))
+    levels = np.concatenate(sides) if counts.sum() else _EMPTY
+    return levels, np.repeat(np.arange(len(sides)), counts), counts
+
+
+def aggregate_many(
+    books: dict[str, tuple[np.ndarray, np.ndarray]],
+    depth_bps: Iterable[float] = (),
+) -> dict[str, Liquidity]:
+    """aggregate() for many coins at once: one pass over all their levels."""
+    coins = list(books)
+    n = len(coins)
+    bids, bid_idx, bid_counts = _stack([books[c][0] for c in coins])
+    asks, ask_idx, ask_counts = _stack([books[c][1] for c in coins])
+    bid_totals = np.bincount(bid_idx, weights=bids[:, 1], minlength=n)
+    ask_totals = np.bincount(ask_idx, weights=asks[:, 1], minlength=n)
+
+    best_bid = np.full(n, -np.inf)
+    np.maximum.at(best_bid, bid_idx, bids[:, 0])
+    best_ask = np.full(n, np.inf)
+    np.minimum.at(best_ask, ask_idx, asks[:, 0])
+    has_mid = (bid_counts > 0) & (ask_counts > 0)
+    mids = np.full(n, np.nan)
+    mids[has_mid] = (best_bid[has_mid] + best_ask[has_mid]) / 2
+
+    depths: list[dict[float, tuple[float, float]]] = [{} for _ in coins]
+    for bps in depth_bps:
+        bands = mids * bps / 10_000
+        in_bid = bids[:, 0] >= (mids - bands)[bid_idx]
+        in_ask = asks[:, 0] <= (mids + bands)[ask_idx]
+        bid_depth = np.bincount(bid_idx, weights=bids[:, 1] * in_bid, minlength=n)
+        ask_depth = np.bincount(ask_idx, weights=asks[:, 1] * in_ask, minlength=n)
+        for i in np.flatnonzero(has_mid):
+            depths[i][bps] = (float(bid_depth[i]), float(ask_depth[i]))
+
+    return {
+        coin: Liquidity(
+            coin,
+            float(bid_totals[i]),
+            float(ask_totals[i]),
+            float(bid_totals[i] + ask_totals[i]),
+            float(mids[i]) if has_mid[i] else None,
+            depths[i],
+            int(bid_counts[i]),
+            int(ask_counts[i]),
+        )
+        for i, coin in enumerate(coins)
+    }
+
+
+class OrderBook:
+    """Latest L2 snapshot of one coin, kept as px/sz arrays per side."""
+
+    __slots__ = ("coin", "bids", "asks", "time")
+
+    def __init__(self, coin: str) -> None:
+        self.coin = coin
+        self.bids = _EMPTY
+        self.asks = _EMPTY
+        self.time: int | None = None
+
+    def update(self, levels: list[list[dict]], time: int | None = None) -> None:
+        self.bids = parse_levels(levels[0])
+        self.asks = parse_levels(levels[1])
+        self.time = time
+
+    def liquidity(self, depth_bps: Iterable[float] = ()) -> Liquidity:
+        return aggregate(self.coin, self.bids, self.asks, depth_bps)
+
+
+class L2BookStream:
+    """Order books for a set of coins kept current over one WebSocket.
+
+    Every subscribed coin gets an OrderBook that is replaced in place by each
+    l2Book push, so reads cost no request. The connection is opened by the
+    first subscribe() (or start()), re-subscribes everything after a
+    reconnect with exponential backoff, and sends the application-level ping
+    HyperLiquid expects to keep idle connections open. While disconnected,
+    get_book() waits for the next snapshot instead of serving a stale one.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        coins: Iterable[str] = (),
+        session: ClientSession | None = None,
+        reconnect_delay: float = 1.0,
+        max_reconnect_delay: float = 30.0,
+        ping_interval: float = 50.0,
+    ):
+        self.url = url
+        self.books: dict[str, OrderBook] = {}
+        self.reconnect_delay = reconnect_delay
+        self.max_reconnect_delay = max_reconnect_delay
+        self.ping_interval = ping_interval
+        self._coins: set[str] = set(coins)
+        self._ready: dict[str, asyncio.Event] = {}
+        self._session = session
+        self._own_session = session is None
+        self._ws = None
+        self._task: asyncio.Task | None = None
+
+    async def __aenter__(self):
+        self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb) -> None:
+        await self.stop()
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+        if self._own_session and self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def subscribe(self, coin: str) -> None:
+        if coin not in self._coins:
+            self._coins.add(coin)
+            if self._ws is not None and not self._ws.closed:
+                await self._send(self._ws, "subscribe", coin)
+        self.start()
+
+    async def unsubscribe(self, coin: str) -> None:
+        if coin in self._coins:
+            self._coins.discard(coin)
+            self.books.pop(coin, None)
+            self._ready.pop(coin, None)
+            if self._ws is not None and not self._ws.closed:
+                await self._send(self._ws, "unsubscribe", coin)
+
+    async def get_book(self, coin: str, timeout: float = 10.0) -> OrderBook:
+        """The current book for coin, subscribing and waiting for it if needed."""
+        await self.subscribe(coin)
+        await asyncio.wait_for(self._event(coin).wait(), timeout)
+        return self.books[coin]
+
+    def _event(self, coin: str) -> asyncio.Event:
+        event = self._ready.get(coin)
+        if event is None:
+            event = self._ready[coin] = asyncio.Event()
+        return event
+
+    @staticmethod
+    async def _send(ws, method: str, coin: str) -> None:
+        await ws.send_json(
+            {"method": method, "subscription": {"type": "l2Book", "coin": coin}}
+        )
+
+    async def _run(self) -> None:
+        if self._session is None:
+            self._session = ClientSession()
+        delay = self.reconnect_delay
+        while True:
+            try:
+                async with self._session.ws_connect(self.url) as ws:
+                    self._ws = ws
+                    delay = self.reconnect_delay
+                    for coin in list(self._coins):
+                        await self._send(ws, "subscribe", coin)
+                    await self._listen(ws)
+            except Exception:
+                # Any failure, including a malformed frame, only costs a
+                # reconnect: the resubscription brings fresh snapshots
+                logger.exception("HyperLiquid websocket error, reconnecting")
+            finally:
+                self._ws = None
+                for event in self._ready.values():
+                    event.clear()
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, self.max_reconnect_delay)
+
+    async def _listen(self, ws) -> None:
+        pinger = asyncio.create_task(self._ping(ws))
+        try:
+            async for msg in ws:
+                if msg.type == WSMsgType.TEXT:
+                    self._handle(json.loads(msg.data))
+                elif msg.type in (WSMsgType.CLOSED, WSMsgType.ERROR):
+                    break
+        finally:
+            pinger.cancel()
+
+    async def _ping(self, ws) -> None:
+        while not ws.closed:
+            await asyncio.sleep(self.ping_interval)
+            if ws.closed:
+                return
+            try:
+                await ws.send_json({"method": "ping"})
+            except (ClientError, ConnectionError, RuntimeError):
+                # the socket closed under us; _run reconnects
+                return
+
+    def _handle(self, message: dict) -> None:
+        if message.get("channel") != "l2Book":
+            return
+        data = message["data"]
+        coin = data["coin"]
+        if coin not in self._coins:
+            return
+        book = self.books.get(coin)
+        if book is None:
+            book = self.books[coin] = OrderBook(coin)
+        book.update(data["levels"], data.get("time"))
+        self._event(coin).set()
@@ -21,6 +21,7 @@ class RedisSettings(InterfaceSettings):
 
 class HyperLiquidSettings(InterfaceSettings):
     base_url: str = Field(validation_alias="HYPERLIQUD_API_URL", default="")
+    ws_url: str = Field(validation_alias="HYPERLIQUID_WS_URL", default="")
 
 
 class ServerSettings(InterfaceSettings):
@@ -1,16 +1,38 @@
+import asyncio
+from collections.abc import Iterable
+
+import numpy as np
 import pandas as pd
 from aiohttp import ClientSession
 from fastapi import HTTPException
 
+from hyperliquid_client.book import (
+    L2BookStream,
+    Liquidity,
+    aggregate,
+    aggregate_many,
+    parse_levels,
+)
 from hyperliquid_client.config import get_server_settings
 
 server = get_server_settings()
 
+# одна WS-подписка на процесс; без HYPERLIQUID_WS_URL работаем через REST
+hyperliquid_stream = (
+    L2BookStream(server.hyperliquid.ws_url) if server.hyperliquid.ws_url else None
+)
+
 
 class HyperLiquidManager:
-    def __init__(self, session: ClientSession, base_url: str):
+    def __init__(
+        self,
+        session: ClientSession,
+        base_url: str,
+        stream: L2BookStream | None = None,
+    ):
         self.session = session
         self.base_url = base_url
+        self.stream = stream
         self.headers = {"Content-Type": "application/json"}
 
     async def _send_request(
@@ -29,25 +51,44 @@ class HyperLiquidManager:
             )
         return await response.json()
 
-    async def get_pool_liquidity(self, coin: str) -> pd.DataFrame:
+    async def _fetch_levels(self, coin: str) -> tuple[np.ndarray, np.ndarray]:
+        if self.stream is not None:
+            book = await self.stream.get_book(coin)
+            return book.bids, book.asks
         body = {"type": "l2Book", "coin": coin}
         data = await self._send_request(body=body, headers=self._make_headers())
         levels = data["levels"]
-        bids_df = pd.DataFrame(levels[0])
-        bids_df["type"] = "bids"
-        asks_df = pd.DataFrame(levels[1])
-        asks_df["type"] = "asks"
-        merged_df = pd.concat([bids_df, asks_df])
-        merged_df["sz"] = pd.to_numeric(merged_df["sz"])
-        merged_df = merged_df.groupby(by=["type"]).sum().reset_index()
-        merged_df = pd.concat(
-            [
-                merged_df,
-                pd.DataFrame([{"type": "sum_liquidity", "sz": merged_df["sz"].sum()}]),
-            ],
-            ignore_index=True,
-        )
-        return merged_df.loc[:, ["type", "sz"]]
+        return parse_levels(levels[0]), parse_levels(levels[1])
+
+    async def get_liquidity(
+        self, coin: str, depth_bps: Iterable[float] = ()
+    ) -> Liquidity:
+        bids, asks = await self._fetch_levels(coin)
+        return aggregate(coin, bids, asks, depth_bps)
+
+    async def get_liquidities(
+        self,
+        coins: Iterable[str],
+        depth_bps: Iterable[float] = (),
+        concurrency: int = 10,
+    ) -> dict[str, Liquidity]:
+        """get_liquidity() for many coins.
+
+        Books are fetched concurrently and aggregated in one vectorized pass.
+        """
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def fetch(coin: str) -> tuple[np.ndarray, np.ndarray]:
+            async with semaphore:
+                return await self._fetch_levels(coin)
+
+        coins = list(dict.fromkeys(coins))
+        levels = await asyncio.gather(*(fetch(coin) for coin in coins))
+        return aggregate_many(dict(zip(coins, levels, strict=True)), depth_bps)
+
+    async def get_pool_liquidity(self, coin: str) -> pd.DataFrame:
+        liquidity = await self.get_liquidity(coin)
+        return liquidity.to_frame()
 
     def _make_headers(self, headers: dict = None) -> dict:
         if headers is None:
@@ -59,4 +100,8 @@ class HyperLiquidManager:
 
 async def get_hyperliquid_manager():
     async with ClientSession() as session:
-        yield HyperLiquidManager(base_url=server.hyperliquid.base_url, session=session)
+        yield HyperLiquidManager(
+            base_url=server.hyperliquid.base_url,
+            session=session,
+            stream=hyperliquid_stream,
+        )
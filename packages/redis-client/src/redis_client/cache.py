@@ -0,0 +1,111 @@
+import itertools
+import threading
+import time
+from collections import OrderedDict
+from typing import Any
+
+MISSING = object()
+
+
+class LocalCache:
+    """Thread-safe in-process LRU cache with per-entry TTL.
+
+    Entries are evicted when the cache grows past max_size (least recently used
+    first) or when their TTL expires. A ttl of None keeps entries until they
+    are evicted or invalidated explicitly.
+
+    A value loaded from the source after begin(key) is stored with
+    set(key, value, token=...) only if the key was not invalidated in the
+    meantime, so a write racing the load cannot be overwritten by stale data.
+    """
+
+    def __init__(self, max_size: int = 1024, ttl: float | None = 60.0) -> None:
+        if max_size <= 0:
+            raise ValueError("max_size must be positive")
+        self.max_size = max_size
+        self.ttl = ttl
+        self._data: OrderedDict[Any, tuple[Any, float | None]] = OrderedDict()
+        # key -> token of the load in flight; invalidate() drops it
+        self._pending: dict[Any, int] = {}
+        self._tokens = itertools.count()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Any, default: Any = MISSING) -> Any:
+        """Return the cached value, or default (MISSING) if absent or expired."""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                value, expires_at = entry
+                if expires_at is None or expires_at > time.monotonic():
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+            self.misses += 1
+            return default
+
+    def begin(self, key: Any) -> int:
+        """Start loading key from the source; returns the token for set()."""
+        with self._lock:
+            token = self._pending[key] = next(self._tokens)
+            return token
+
+    def cancel(self, key: Any, token: int) -> None:
+        """Forget a load started with begin() that will not call set()."""
+        with self._lock:
+            if self._pending.get(key) == token:
+                del self._pending[key]
+
+    def set(
+        self,
+        key: Any,
+        value: Any,
+        ttl: float | None = MISSING,
+        token: int | None = None,
+    ) -> bool:
+        """Store a value; ttl overrides the cache-wide TTL for this entry.
+
+        With a token from begin() the value is dropped if key was invalidated
+        (or loaded again) since. Returns whether the value was stored.
+        """
+        ttl = self.ttl if ttl is MISSING else ttl
+        expires_at = time.monotonic() + ttl if ttl is not None else None
+        with self._lock:
+            if token is not None:
+                if self._pending.get(key) != token:
+                    return False
+                del self._pending[key]
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+                self.evictions += 1
+            return True
+
+    def invalidate(self, key: Any) -> bool:
+        """Drop a single entry. Returns True if it was cached."""
+        with self._lock:
+            self._pending.pop(key, None)
+            return self._data.pop(key, None) is not None
+
+    def clear(self) -> None:
+        """Drop every entry but keep the counters."""
+        with self._lock:
+            self._pending.clear()
+            self._data.clear()
+
+    def stats(self) -> dict[str, int]:
+        """Hit/miss/eviction counters and the current size."""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "size": len(self._data),
+            }
+
+    def __len__(self) -> int:
+        return len(self._data)
@@ -4,9 +4,12 @@ from pydantic_settings import BaseSettings
 
 
 class Settings(BaseSettings):
-    REDIS_HOST: str = 'localhost'
+    REDIS_HOST: str = "localhost"
     REDIS_PORT: int = 6379
     REDIS_DB: int = 1
+    REDIS_MAX_CONNECTIONS: int = 50
+    # сколько секунд ждать свободного соединения, когда все заняты
+    REDIS_POOL_TIMEOUT: int = 20
 
 
 @lru_cache
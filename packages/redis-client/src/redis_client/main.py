@@ -1,16 +1,22 @@
 import asyncio
+import fnmatch
 import inspect
+import itertools
 import json
+import re
 import threading
 import time
+import weakref
 from dataclasses import asdict, dataclass
 from datetime import datetime
-from functools import wraps
+from functools import lru_cache, wraps
 from random import randint, random
 from typing import Any
 
 import redis
+import redis.asyncio
 
+from redis_client.cache import MISSING, LocalCache
 from redis_client.config import get_settings
 
 settings = get_settings()
@@ -38,6 +44,45 @@ FUNCTION_VARIABLES = {
     "create_marketing_comment": {"tweet_text", "relevant_knowledge", "question_prompt"},
 }
 
+ACCOUNT_ACTION_TYPES = (
+    "last_create_post_time",
+    "last_gorilla_marketing_time",
+    "last_likes_time",
+    "last_comment_agix_time",
+    "last_answer_my_comment_time",
+    "last_answer_comment_time",
+)
+
+_FSTRING_VAR_RE = re.compile(r"{([^{}:]+)(?::[^{}]+)?}")
+
+
+def _check_prompt_variables(function_name: str, variables: frozenset[str]) -> None:
+    allowed_vars = FUNCTION_VARIABLES.get(function_name, set())
+    if not variables.issubset(allowed_vars):
+        invalid_vars = variables - allowed_vars
+        raise ValueError(
+            f"Промпт для {function_name} содержит недопустимые переменные: {invalid_vars}. "
+            f"Разрешенные переменные: {allowed_vars}"
+        )
+
+
+@dataclass(frozen=True)
+class CompiledPrompt:
+    """A prompt template parsed and validated once per prompt version."""
+
+    function_name: str
+    template: str
+    variables: frozenset[str]
+
+    @classmethod
+    def compile(cls, function_name: str, template: str) -> "CompiledPrompt":
+        variables = frozenset(_FSTRING_VAR_RE.findall(template))
+        _check_prompt_variables(function_name, variables)
+        return cls(function_name, template, variables)
+
+    def format(self, values: dict[str, Any]) -> str:
+        return self.template.format_map(values)
+
 
 class RedisDB:
     """A class for interacting with a Redis database.
@@ -61,6 +106,9 @@ class RedisDB:
             port=REDIS_PORT,
             db=REDIS_DB,  # 0 - main, 1 - test
         )
+        self._cache: LocalCache | None = None
+        self._cache_key_re: re.Pattern | None = None
+        self._cache_listener: threading.Thread | None = None
 
         if self.wait_for_redis(timeout=100):
             print("Redis connected")
@@ -75,6 +123,108 @@ class RedisDB:
         }
         self.set("function_variables", function_vars_dict, log=False)
 
+    def enable_cache(
+        self,
+        patterns: tuple[str, ...] = ("function_variables", "twitter_data:*"),
+        max_size: int = 1024,
+        ttl: float | None = 60.0,
+        configure_notifications: bool = True,
+    ) -> LocalCache:
+        """Serve get() for keys matching patterns from a process-local cache.
+
+        Entries are invalidated by Redis keyspace notifications, so a write from
+        any process evicts the key here as well. The TTL bounds staleness if a
+        notification is lost. Requires notify-keyspace-events to include "K"
+        and "A"; with configure_notifications they are added to the current
+        server setting via CONFIG SET, keeping the flags already enabled.
+        """
+        self.disable_cache()
+        if configure_notifications:
+            try:
+                self._enable_keyspace_notifications()
+            except redis.exceptions.ResponseError as e:
+                print(f"Could not enable keyspace notifications: {e}")
+
+        self._cache = LocalCache(max_size=max_size, ttl=ttl)
+        self._cache_key_re = re.compile(
+            "|".join(fnmatch.translate(pattern) for pattern in patterns)
+        )
+        db = settings.REDIS_DB or 0
+        pubsub = self.r.pubsub(ignore_subscribe_messages=True)
+        pubsub.psubscribe(
+            **{
+                f"__keyspace@{db}__:{pattern}": self._on_keyspace_event
+                for pattern in patterns
+            }
+        )
+        self._cache_listener = pubsub.run_in_thread(
+            sleep_time=1.0,
+            daemon=True,
+            exception_handler=self._on_cache_listener_error,
+        )
+        return self._cache
+
+    def _enable_keyspace_notifications(self) -> None:
+        # Настройка общая для сервера: дописываем флаги, а не перезаписываем
+        current = self.r.config_get("notify-keyspace-events")
+        flags = current.get("notify-keyspace-events") or ""
+        if isinstance(flags, bytes):
+            flags = flags.decode("utf-8")
+        missing = "".join(flag for flag in "KA" if flag not in flags)
+        if missing:
+            self.r.config_set("notify-keyspace-events", flags + missing)
+
+    def disable_cache(self) -> None:
+        """Stop the invalidation listener and drop the local cache."""
+        if self._cache_listener is not None:
+            self._cache_listener.stop()
+            self._cache_listener = None
+        self._cache = None
+        self._cache_key_re = None
+
+    def cache_stats(self) -> dict[str, int]:
+        """Hit/miss counters of the local cache (empty if it is disabled)."""
+        return self._cache.stats() if self._cache is not None else {}
+
+    def _on_keyspace_event(self, message: dict) -> None:
+        cache = self._cache
+        if cache is None:  # disable_cache() raced a callback in flight
+            return
+        channel = message["channel"]
+        if isinstance(channel, bytes):
+            channel = channel.decode("utf-8")
+        cache.invalidate(channel.split("__:", 1)[1])
+
+    def _on_cache_listener_error(self, exc, pubsub, thread) -> None:
+        # Notifications sent while disconnected are lost, so nothing cached can
+        # be trusted anymore. PubSub resubscribes on the next get_message().
+        print(f"Cache invalidation listener error: {exc}")
+        if self._cache is not None:
+            self._cache.clear()
+        time.sleep(1)
+
+    def _invalidate_cached(self, *keys: str) -> None:
+        if self._cache is not None:
+            for key in keys:
+                self._cache.invalidate(key)
+
+    def _get_raw(self, key: str) -> bytes | None:
+        cache = self._cache
+        if cache is None or not self._cache_key_re.match(key):
+            return self.r.get(key)
+        v = cache.get(key)
+        if v is MISSING:
+            # An invalidation arriving during the GET cancels the token, so
+            # the value read before the write is not cached
+            token = cache.begin(key)
+            try:
+                v = self.r.get(key)
+            except BaseException:
+                cache.cancel(key, token)
+                raise
+            cache.set(key, v, token=token)
+        return v
+
     def add_to_set(self, key: str, value: str) -> None:
         """Add a value to a Redis set at the given key."""
         self.r.sadd(key, value)
@@ -113,8 +263,9 @@ class RedisDB:
         """Get the value for the given key. The stored data is expected to be JSON.
 
         If the key does not exist and a default is provided, return that default.
+        Served from the local cache when enable_cache() covers the key.
         """
-        v = self.r.get(key)
+        v = self._get_raw(key)
         if not v and default is not self._NO_DEFAULT:
             return default
         if v is None:
@@ -134,6 +285,7 @@ class RedisDB:
         """
         if log:
             print(f"Set {key} to {value}")
+        self._invalidate_cached(key)
         if value is None:
             self.r.delete(key)
         else:
@@ -146,6 +298,7 @@ class RedisDB:
         """
         if log:
             print(f"Set EXPIRY {key} to {value}, expiry: {ex}")
+        self._invalidate_cached(key)
         if value is None:
             print(f"Set EXPIRY value is None, deleting {key}")
             self.r.delete(key)
@@ -162,8 +315,47 @@ class RedisDB:
         """Delete the given key."""
         if log:
             print(f"Delete {key}")
+        self._invalidate_cached(key)
         self.r.delete(key)
 
+    def get_many(self, keys: list[str], default: Any = None) -> list[Any]:
+        """Get the JSON values of many keys in one MGET round-trip.
+
+        The result is aligned with keys; missing keys map to default.
+        """
+        if not keys:
+            return []
+        return [json.loads(v) if v is not None else default for v in self.r.mget(keys)]
+
+    def set_many(
+        self, mapping: dict[str, Any], ex: int | None = None, log: bool = True
+    ) -> None:
+        """Set many keys in one pipelined round-trip, optionally with an expiry.
+
+        Keys whose value is None are deleted, as in set().
+        """
+        if not mapping:
+            return
+        if log:
+            print(f"Set {len(mapping)} keys: {list(mapping)}")
+        self._invalidate_cached(*mapping)
+        pipe = self.r.pipeline(transaction=False)
+        for key, value in mapping.items():
+            if value is None:
+                pipe.delete(key)
+            else:
+                pipe.set(key, json.dumps(value), ex=ex)
+        pipe.execute()
+
+    def delete_many(self, keys: list[str], log: bool = True) -> None:
+        """Delete many keys with a single DEL."""
+        if not keys:
+            return
+        if log:
+            print(f"Delete {keys}")
+        self._invalidate_cached(*keys)
+        self.r.delete(*keys)
+
     def get_keys_by_pattern(self, pattern: str) -> list[str]:
         """Retrieve a list of keys matching the given pattern using SCAN."""
         result = []
@@ -268,28 +460,32 @@ class RedisDB:
         """Проверяем активен ли аккаунт."""
         return bool(self.r.exists(f"twitter_data:{username}"))
 
+    def load_account_state(
+        self,
+        usernames: list[str],
+        action_types: tuple[str, ...] | list[str] = ACCOUNT_ACTION_TYPES,
+    ) -> dict[str, dict[str, float]]:
+        """Load last action times for many accounts with a single MGET.
+
+        Returns {username: {action_type: timestamp}}, missing values are 0.
+        """
+        keys = [f"{a}:{u}" for u in usernames for a in action_types]
+        values = iter(self.get_many(keys))
+        return {
+            username: {a: float(next(values) or 0) for a in action_types}
+            for username in usernames
+        }
+
     def remove_account(self, username: str):
         """Удаляем все данные аккаунта."""
-        # Удаляем основные данные аккаунта
-        self.delete(f"twitter_data:{username}")
-
-        # Удаляем все временные метки
-        for action_type in [
-            "last_create_post_time",
-            "last_gorilla_marketing_time",
-            "last_likes_time",
-            "last_comment_agix_time",
-            "last_answer_my_comment_time",
-            "last_answer_comment_time",
-        ]:
-            self.delete(f"{action_type}:{username}")
-
-        # Удаляем историю постов
-        self.delete(f"posted_tweets:{username}")
-
-        # Удаляем историю ответов
-        self.delete(f"gorilla_marketing_answered:{username}")
-
+        self.delete_many(
+            [
+                f"twitter_data:{username}",
+                *(f"{a}:{username}" for a in ACCOUNT_ACTION_TYPES),
+                f"posted_tweets:{username}",
+                f"gorilla_marketing_answered:{username}",
+            ]
+        )
         print(f"Account {username} removed from Redis")
 
     def get_function_variables(self) -> dict[str, list[str]]:
@@ -314,11 +510,372 @@ def get_redis_db(*args, **kwargs) -> RedisDB:
     return RedisDB(*args, **kwargs)
 
 
+_async_pools: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, redis.asyncio.ConnectionPool]" = weakref.WeakKeyDictionary()
+_async_pools_lock = threading.Lock()
+
+
+def get_async_connection_pool() -> redis.asyncio.ConnectionPool:
+    """Return the asyncio connection pool of the running event loop.
+
+    Connections are bound to the loop that opened them, so every loop gets its
+    own pool, created on first use and dropped together with the loop. Within
+    a loop every AsyncRedisDB created without an explicit pool shares it, so
+    the number of sockets is bounded by REDIS_MAX_CONNECTIONS no matter how
+    many agents are running. Commands beyond that wait up to
+    REDIS_POOL_TIMEOUT seconds for a free connection instead of failing.
+    """
+    loop = asyncio.get_running_loop()
+    with _async_pools_lock:
+        pool = _async_pools.get(loop)
+        if pool is None:
+            pool = _async_pools[loop] = redis.asyncio.BlockingConnectionPool(
+                host=settings.REDIS_HOST or "localhost",
+                port=settings.REDIS_PORT or 6379,
+                db=settings.REDIS_DB or 0,
+                max_connections=settings.REDIS_MAX_CONNECTIONS,
+                timeout=settings.REDIS_POOL_TIMEOUT,
+            )
+    return pool
+
+
+class AsyncRedisDB:
+    """Non-blocking counterpart of RedisDB built on redis.asyncio.
+
+    Exposes the same API as RedisDB, but every method that talks to Redis is a
+    coroutine. Connections come from a shared ConnectionPool, so creating many
+    instances is cheap. RedisDB stays the synchronous interface for code that
+    is not running inside an event loop.
+
+    Use get_async_redis_db() to obtain an instance that has already checked the
+    connection, the same way RedisDB() does on construction.
+    """
+
+    _NO_DEFAULT = object()
+
+    def __init__(
+        self,
+        connection_pool: redis.asyncio.ConnectionPool | None = None,
+    ) -> None:
+        """Bind the client to the given pool, or to the shared pool of the loop."""
+        self._r = None
+        if connection_pool is not None:
+            self._r = redis.asyncio.Redis(connection_pool=connection_pool)
+        self._clients: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+
+    @property
+    def r(self) -> redis.asyncio.Redis:
+        if self._r is not None:
+            return self._r
+        pool = get_async_connection_pool()
+        client = self._clients.get(pool)
+        if client is None:
+            client = self._clients[pool] = redis.asyncio.Redis(connection_pool=pool)
+        return client
+
+    @r.setter
+    def r(self, value: redis.asyncio.Redis) -> None:
+        self._r = value
+
+    async def connect(self, timeout: int = 100) -> None:
+        """Wait for Redis and store the function variables, like RedisDB.__init__."""
+        if await self.wait_for_redis(timeout=timeout):
+            print("Redis connected")
+        else:
+            print("Failed to connect to Redis after the timeout.")
+            raise ConnectionError("Failed to connect to Redis.")
+        await self._save_function_variables_on_startup()
+
+    async def close(self) -> None:
+        """Release this client; the shared pool itself stays open."""
+        await self.r.aclose()
+
+    async def __aenter__(self) -> "AsyncRedisDB":
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb) -> None:
+        await self.close()
+
+    async def _save_function_variables_on_startup(self):
+        function_vars_dict = {
+            key: list(value) for key, value in FUNCTION_VARIABLES.items()
+        }
+        await self.set("function_variables", function_vars_dict, log=False)
+
+    async def add_to_set(self, key: str, value: str) -> None:
+        """Add a value to a Redis set at the given key."""
+        await self.r.sadd(key, value)
+
+    async def get_set(self, key: str) -> list[str]:
+        """Retrieve all members of a Redis set as a list of strings."""
+        return [item.decode("utf-8") for item in await self.r.smembers(key)]
+
+    async def wait_for_redis(self, timeout: int) -> bool:
+        """Wait for Redis to become available within the given timeout in seconds.
+
+        Returns True if successful, otherwise False.
+        """
+        start_time = time.time()
+        while time.time() - start_time < timeout:
+            try:
+                await self.r.set("__temp_test_key__", "value")
+                await self.r.delete("__temp_test_key__")
+                return True
+            except redis.exceptions.BusyLoadingError:
+                print("Redis is still loading. Waiting...")
+                await asyncio.sleep(1)
+            except redis.exceptions.ConnectionError as e:
+                repr(e)
+                await asyncio.sleep(1)
+            except Exception as e:
+                repr(e)
+                if "Temporary failure in name resolution" in str(e):
+                    print("Temporary failure in name resolution. Waiting...")
+                    await asyncio.sleep(1)
+                else:
+                    return False
+        return False
+
+    async def get(self, key: str, default: Any = _NO_DEFAULT) -> Any:
+        """Get the value for the given key. The stored data is expected to be JSON.
+
+        If the key does not exist and a default is provided, return that default.
+        """
+        v = await self.r.get(key)
+        if not v and default is not self._NO_DEFAULT:
+            return default
+        if v is None:
+            return None
+        return json.loads(v)
+
+    async def set(
+        self, key: str, value: Any, log: bool = True, keep_ttl: bool = False
+    ) -> None:
+        """Set the value for the given key, serializing the value to JSON.
+
+        If value is None, the key will be deleted.
+
+        Args:
+            keep_ttl (bool): If True, the current TTL is preserved.
+
+        """
+        if log:
+            print(f"Set {key} to {value}")
+        if value is None:
+            await self.r.delete(key)
+        else:
+            await self.r.set(key, json.dumps(value), keepttl=keep_ttl)
+
+    async def setex(self, key: str, value: Any, ex: int, log: bool = True) -> None:
+        """Set the value for the given key with an expiration time (in seconds).
+
+        If value is None, the key will be deleted.
+        """
+        if log:
+            print(f"Set EXPIRY {key} to {value}, expiry: {ex}")
+        if value is None:
+            print(f"Set EXPIRY value is None, deleting {key}")
+            await self.r.delete(key)
+        else:
+            await self.r.setex(key, ex, json.dumps(value))
+
+    async def set_default(self, key: str, value: Any) -> None:
+        """Set a default value if the key does not exist or is empty."""
+        existing_value = await self.get(key)
+        if (existing_value is None or existing_value == "") and value:
+            await self.set(key, value)
+
+    async def delete(self, key: str, log: bool = True) -> None:
+        """Delete the given key."""
+        if log:
+            print(f"Delete {key}")
+        await self.r.delete(key)
+
+    async def get_many(self, keys: list[str], default: Any = None) -> list[Any]:
+        """Get the JSON values of many keys in one MGET round-trip.
+
+        The result is aligned with keys; missing keys map to default.
+        """
+        if not keys:
+            return []
+        return [
+            json.loads(v) if v is not None else default for v in await self.r.mget(keys)
+        ]
+
+    async def set_many(
+        self, mapping: dict[str, Any], ex: int | None = None, log: bool = True
+    ) -> None:
+        """Set many keys in one pipelined round-trip, optionally with an expiry.
+
+        Keys whose value is None are deleted, as in set().
+        """
+        if not mapping:
+            return
+        if log:
+            print(f"Set {len(mapping)} keys: {list(mapping)}")
+        pipe = self.r.pipeline(transaction=False)
+        for key, value in mapping.items():
+            if value is None:
+                pipe.delete(key)
+            else:
+                pipe.set(key, json.dumps(value), ex=ex)
+        await pipe.execute()
+
+    async def delete_many(self, keys: list[str], log: bool = True) -> None:
+        """Delete many keys with a single DEL."""
+        if not keys:
+            return
+        if log:
+            print(f"Delete {keys}")
+        await self.r.delete(*keys)
+
+    async def get_keys_by_pattern(self, pattern: str) -> list[str]:
+        """Retrieve a list of keys matching the given pattern using SCAN."""
+        return [key.decode("utf-8") async for key in self.r.scan_iter(pattern)]
+
+    async def get_keys_by_pattern_blocking(self, pattern: str) -> list[str]:
+        """Retrieve a list of keys matching the pattern using KEYS command.
+
+        Note: This is a blocking operation and not recommended for large databases.
+        """
+        return [key.decode("utf-8") for key in await self.r.keys(pattern)]
+
+    async def parse_list(self, key: str) -> list[str]:
+        """Retrieve the value by key as a list.
+
+        If the value is already a list, return it as is.
+        If it's a string, split by comma.
+        If it's None or empty, return an empty list.
+        """
+        chat_ids = await self.get(key)
+        if isinstance(chat_ids, list):
+            return chat_ids
+        if chat_ids is None:
+            return []
+        if isinstance(chat_ids, str):
+            if chat_ids in ["-", ""]:
+                return []
+            return chat_ids.split(",")
+        raise ValueError(f"Unknown type of chat_ids: {type(chat_ids)} {chat_ids=}")
+
+    async def get_twitter_data_keys(self):
+        return [k.decode() async for k in self.r.scan_iter(match="twitter_data:*")]
+
+    async def add_to_sorted_set(self, key: str, score: int, value: str):
+        await self.r.zadd(key, {value: score})
+
+    async def get_sorted_set(self, key: str, start: int = 0, end: int = -1):
+        return [item.decode("utf-8") for item in await self.r.zrange(key, start, end)]
+
+    async def add_user_post(self, username: str, post: Post):
+        post_json = json.dumps(asdict(post))
+        await self.add_to_sorted_set(
+            f"posted_tweets:{username}", post.timestamp, post_json
+        )
+
+    async def get_user_posts(self, username: str) -> list[Post]:
+        posts = await self.get_sorted_set(f"posted_tweets:{username}")
+        return [Post(**json.loads(post)) for post in posts]
+
+    async def get_user_posts_by_create_time(
+        self, username: str, second_ago: int = 3 * 60 * 60
+    ) -> list[Post]:
+        """Newest in the end of list."""
+        current_timestamp = int(time.time())
+        min_score = current_timestamp - second_ago
+        posts = await self.r.zrangebyscore(
+            f"posted_tweets:{username}", min_score, current_timestamp
+        )
+        return [Post(**json.loads(post)) for post in posts]
+
+    async def add_send_partnership(self, username: str, partner_user_id: str):
+        await self.add_to_sorted_set(
+            f"send_partnership:{username}", int(time.time()), partner_user_id
+        )
+
+    async def get_send_partnership(self, username: str) -> list[str]:
+        return await self.get_sorted_set(f"send_partnership:{username}")
+
+    async def get_active_twitter_accounts(self) -> list[str]:
+        """Получаем все активные твиттер аккаунты."""
+        keys = await self.get_keys_by_pattern("twitter_data:*")
+        return [key.split(":")[1] for key in keys]
+
+    async def get_account_last_action_time(
+        self, username: str, action_type: str
+    ) -> float:
+        """Получаем время последнего действия для аккаунта."""
+        key = f"{action_type}:{username}"
+        return float(await self.get(key) or 0)
+
+    async def update_account_last_action_time(
+        self, username: str, action_type: str, timestamp: float
+    ):
+        """Обновляем время последнего действия для аккаунта."""
+        key = f"{action_type}:{username}"
+        await self.set(key, timestamp)
+
+    async def is_account_active(self, username: str) -> bool:
+        """Проверяем активен ли аккаунт."""
+        return bool(await self.r.exists(f"twitter_data:{username}"))
+
+    async def load_account_state(
+        self,
+        usernames: list[str],
+        action_types: tuple[str, ...] | list[str] = ACCOUNT_ACTION_TYPES,
+    ) -> dict[str, dict[str, float]]:
+        """Load last action times for many accounts with a single MGET.
+
+        Returns {username: {action_type: timestamp}}, missing values are 0.
+        """
+        keys = [f"{a}:{u}" for u in usernames for a in action_types]
+        values = iter(await self.get_many(keys))
+        return {
+            username: {a: float(next(values) or 0) for a in action_types}
+            for username in usernames
+        }
+
+    async def remove_account(self, username: str):
+        """Удаляем все данные аккаунта."""
+        await self.delete_many(
+            [
+                f"twitter_data:{username}",
+                *(f"{a}:{username}" for a in ACCOUNT_ACTION_TYPES),
+                f"posted_tweets:{username}",
+                f"gorilla_marketing_answered:{username}",
+            ]
+        )
+        print(f"Account {username} removed from Redis")
+
+    async def get_function_variables(self) -> dict[str, list[str]]:
+        function_vars_dict = {
+            key: list(value) for key, value in FUNCTION_VARIABLES.items()
+        }
+        await self.set("function_variables", function_vars_dict)
+        return function_vars_dict
+
+    async def save_tweet_link(self, function_name: str, tweet_id: str) -> None:
+        """Сохраняет ссылку на твит для конкретной функции."""
+        key = f"created_tweet:{function_name}"
+        link = f"https://twitter.com/i/web/status/{tweet_id}"
+        await self.r.rpush(key, link)
+
+
+async def get_async_redis_db(*args, **kwargs) -> AsyncRedisDB:
+    db = AsyncRedisDB(*args, **kwargs)
+    await db.connect()
+    return db
+
+
 class PromptManager:
     _instance: "PromptManager | None" = None
     _lock = threading.Lock()
     _initialized: bool
 
+    # How long the subscriber blocks waiting for a message before re-checking
+    # whether it should stop, and how long it waits before reconnecting.
+    SUBSCRIBER_TIMEOUT = 1.0
+    RECONNECT_DELAY = 1.0
+
     def __new__(cls, redis_db: RedisDB):
         with cls._lock:
             if cls._instance is None:
@@ -332,37 +889,60 @@ class PromptManager:
 
         self.redis = redis_db
         self.prompt_cache = {}
+        self.compiled_prompts: dict[tuple[str, int], CompiledPrompt] = {}
+        self._prompt_versions: dict[str, int] = {}
         self._subscriber_thread = None
-        self._running = True
+        self._stop_event = threading.Event()
         self._start_subscriber_thread()
         self._initialized = True
 
     def _start_subscriber_thread(self):
-        """Запускает Redis подписчика в отдельном потоке."""
+        """Запускает Redis подписчика в отдельном потоке.
 
-        def subscriber_worker():
-            pubsub = self.redis.r.pubsub()
-            pubsub.subscribe("prompt_updates")
+        The worker blocks in get_message() until an update arrives, so prompts
+        are invalidated as soon as they are published. After a connection loss
+        it resubscribes and drops the whole cache, since updates published in
+        the meantime were missed.
+        """
 
-            while self._running:
+        def subscriber_worker():
+            pubsub = None
+            while not self._stop_event.is_set():
                 try:
-                    message = pubsub.get_message()
+                    if pubsub is None:
+                        pubsub = self.redis.r.pubsub(ignore_subscribe_messages=True)
+                        pubsub.subscribe("prompt_updates")
+                        self.prompt_cache.clear()
+                        self.compiled_prompts.clear()
+                    message = pubsub.get_message(timeout=self.SUBSCRIBER_TIMEOUT)
                     if message and message["type"] == "message":
-                        prompt_key = message["data"].decode("utf-8")
-                        if prompt_key in self.prompt_cache:
-                            del self.prompt_cache[prompt_key]
-                            print(f"Промпт обновлен: {prompt_key}")
+                        self._on_prompt_update(message["data"].decode("utf-8"))
+                except redis.exceptions.ConnectionError as e:
+                    print(f"Подписчик потерял соединение с Redis: {e}")
+                    if pubsub is not None:
+                        pubsub.close()
+                        pubsub = None
+                    self._stop_event.wait(self.RECONNECT_DELAY)
                 except Exception as e:
                     print(f"Ошибка в subscriber_worker: {e}")
-                time.sleep(0.1)
+                    self._stop_event.wait(self.RECONNECT_DELAY)
 
-            pubsub.close()
+            if pubsub is not None:
+                pubsub.close()
 
         self._subscriber_thread = threading.Thread(
             target=subscriber_worker, daemon=True
         )
         self._subscriber_thread.start()
 
+    def stop(self, timeout: float | None = None) -> None:
+        """Stop the subscriber thread and wait for it to exit."""
+        self._stop_event.set()
+        if self._subscriber_thread and self._subscriber_thread.is_alive():
+            if timeout is None:
+                timeout = self.SUBSCRIBER_TIMEOUT + 1.0
+            self._subscriber_thread.join(timeout=timeout)
+
     def get_prompt(self, function_name: str) -> str:
         """Получает актуальный промпт для функции из Redis."""
         # Добавляем префикс к ключу
@@ -374,55 +954,132 @@ class PromptManager:
                 prompt = DEFAULT_PROMPTS.get(function_name, "")
                 if prompt:
                     # Проверяем, что в промпте используются только разрешенные переменные
-                    variables = self._extract_fstring_vars(prompt)
-                    allowed_vars = FUNCTION_VARIABLES.get(function_name, set())
-                    if not variables.issubset(allowed_vars):
-                        invalid_vars = variables - allowed_vars
-                        raise ValueError(
-                            f"Промпт для {function_name} содержит недопустимые переменные: {invalid_vars}. "
-                            f"Разрешенные переменные: {allowed_vars}"
-                        )
+                    _check_prompt_variables(
+                        function_name, frozenset(self._extract_fstring_vars(prompt))
+                    )
                     self.redis.set(redis_key, prompt)
                 else:
                     raise ValueError(f"Промпт для функции {function_name} не найден")
             self.prompt_cache[redis_key] = prompt
         return self.prompt_cache[redis_key]
 
+    def get_compiled_prompt(self, function_name: str) -> CompiledPrompt:
+        """Return the parsed and validated prompt for the current prompt version.
+
+        Compiled prompts are keyed by (function_name, version); the version is
+        bumped whenever an update for the prompt arrives on prompt_updates.
+        """
+        key = (function_name, self._prompt_versions.get(function_name, 0))
+        compiled = self.compiled_prompts.get(key)
+        if compiled is None:
+            compiled = CompiledPrompt.compile(
+                function_name, self.get_prompt(function_name)
+            )
+            self.compiled_prompts[key] = compiled
+        return compiled
+
+    def _on_prompt_update(self, prompt_key: str) -> None:
+        # Шаблон выбрасываем до смены версии: читатель, увидевший новую версию,
+        # не должен скомпилировать под ней старый шаблон из prompt_cache
+        updated = self.prompt_cache.pop(prompt_key, None) is not None
+        self._invalidate_compiled(prompt_key.removeprefix("prompt:"))
+        if updated:
+            print(f"Промпт обновлен: {prompt_key}")
+
+    def _invalidate_compiled(self, function_name: str) -> None:
+        version = self._prompt_versions.get(function_name, 0)
+        self._prompt_versions[function_name] = version + 1
+        self.compiled_prompts.pop((function_name, version), None)
+
     @staticmethod
     def _extract_fstring_vars(template: str) -> set[str]:
         """Extract variable names from f-string."""
-        import re
-
-        pattern = r"{([^{}:]+)(?::[^{}]+)?}"
-        return set(re.findall(pattern, template))
+        return set(_FSTRING_VAR_RE.findall(template))
 
     def __del__(self):
-        self._running = False
-        if self._subscriber_thread and self._subscriber_thread.is_alive():
-            self._subscriber_thread.join(timeout=1.0)
+        if getattr(self, "_stop_event", None) is not None:
+            self.stop(timeout=1.0)
+
+
+_prompt_manager_lock = threading.Lock()
+
+
+def get_prompt_manager() -> PromptManager:
+    """Return the process-wide PromptManager, connecting to Redis on first use."""
+    manager = PromptManager._instance
+    if manager is None or not manager._initialized:
+        # Без блокировки два потока могли бы оба создать RedisDB и подписчика
+        with _prompt_manager_lock:
+            manager = PromptManager._instance
+            if manager is None or not manager._initialized:
+                manager = PromptManager(get_redis_db())
+    return manager
+
+
+class KnowledgeCache:
+    """TTL/LRU memo for knowledge_base.search_knowledge results.
+
+    Results are keyed by (knowledge base, query, k). Knowledge bases are told
+    apart by object identity; call invalidate() after re-indexing one so the
+    next lookup goes to the vector store again.
+    """
+
+    def __init__(self, max_size: int = 256, ttl: float | None = 300.0) -> None:
+        self._cache = LocalCache(max_size=max_size, ttl=ttl)
+        self._tokens: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+        self._counter = itertools.count()
+
+    def _token(self, knowledge_base: Any) -> int:
+        # A per-object token instead of id(): ids are reused after garbage
+        # collection and a new knowledge base must not see stale results.
+        try:
+            token = self._tokens.get(knowledge_base)
+            if token is None:
+                token = self._tokens[knowledge_base] = next(self._counter)
+            return token
+        except TypeError:
+            return id(knowledge_base)
+
+    async def search(self, knowledge_base: Any, query: str, k: int) -> Any:
+        key = (self._token(knowledge_base), query, k)
+        result = self._cache.get(key)
+        if result is MISSING:
+            result = await knowledge_base.search_knowledge(query=query, k=k)
+            self._cache.set(key, result)
+        return result
+
+    def invalidate(self, knowledge_base: Any = None) -> None:
+        """Forget cached results for one knowledge base, or for all of them."""
+        if knowledge_base is None:
+            self._cache.clear()
+            return
+        try:
+            # Old entries become unreachable and age out of the LRU.
+            self._tokens[knowledge_base] = next(self._counter)
+        except TypeError:
+            self._cache.clear()
+
+    def stats(self) -> dict[str, int]:
+        return self._cache.stats()
+
+
+knowledge_cache = KnowledgeCache()
 
 
 def use_dynamic_prompt(function_name: str):
     """Декоратор для использования динамических промптов из Redis."""
 
     def decorator(func):
+        sig = inspect.signature(func)
+
         @wraps(func)
         async def wrapper(*args, **kwargs):
-            prompt_manager = PromptManager(get_redis_db())
-            template = prompt_manager.get_prompt(function_name)
-
-            # Проверяем разрешенные переменные
-            variables = prompt_manager._extract_fstring_vars(template)
-            allowed_vars = FUNCTION_VARIABLES.get(function_name, set())
-            if not variables.issubset(allowed_vars):
-                invalid_vars = variables - allowed_vars
-                raise ValueError(
-                    f"Промпт для {function_name} содержит недопустимые переменные: {invalid_vars}. "
-                    f"Разрешенные переменные: {allowed_vars}"
-                )
+            # Шаблон разбирается и проверяется один раз на версию промпта
+            compiled = get_prompt_manager().get_compiled_prompt(function_name)
+            template = compiled.template
+            variables = compiled.variables
 
             # Получаем значения параметров функции
-            sig = inspect.signature(func)
             bound_args = sig.bind(*args, **kwargs)
             bound_args.apply_defaults()
             format_dict = dict(bound_args.arguments)
@@ -442,14 +1099,13 @@ def use_dynamic_prompt(function_name: str):
                 knowledge_base = bound_args.arguments.get("knowledge_base")
                 query = "What is the project about?"
                 if knowledge_base and query:
-                    relevant_knowledge = await knowledge_base.search_knowledge(
-                        query=query,
-                        k=2,
+                    relevant_knowledge = await knowledge_cache.search(
+                        knowledge_base, query=query, k=2
                     )
                     format_dict["relevant_knowledge"] = relevant_knowledge
 
             try:
-                formatted_prompt = template.format(**format_dict)
+                formatted_prompt = compiled.format(format_dict)
                 kwargs["prompt"] = formatted_prompt
                 return await func(*args, **kwargs)
             except KeyError as e:
@@ -664,9 +1320,6 @@ Respond with one word - True or False.""",
 }
 
 
-prompt_manager = PromptManager(get_redis_db)
-
-
 async def ensure_delay_between_posts(username: str, delay: int = None):
     past_date = datetime(2023, 1, 1, 12, 0)
     past_timestamp = int(past_date.timestamp())
@@ -712,3 +1365,11 @@ def decode_redis(src):
     if isinstance(src, bytes):
         return src.decode()
     raise Exception("type not handled: " + type(src))
+
+
+def __getattr__(name: str) -> Any:
+    # prompt_manager used to be created on import; it is now built on first
+    # access so importing the module does not connect to Redis
+    if name == "prompt_manager":
+        return get_prompt_manager()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
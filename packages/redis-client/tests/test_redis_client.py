@@ -1,9 +1,29 @@
 import pytest
 from unittest.mock import MagicMock, patch, call, AsyncMock
+import asyncio
+import inspect
 import json
 import time
+from concurrent.futures import ThreadPoolExecutor
 import redis
-from redis_client.main import RedisDB, Post, PromptManager, use_dynamic_prompt, ensure_delay_between_posts, decode_redis
+import redis.asyncio
+from dataclasses import asdict
+from redis_client.cache import MISSING, LocalCache
+from redis_client.main import (
+    FUNCTION_VARIABLES,
+    AsyncRedisDB,
+    CompiledPrompt,
+    KnowledgeCache,
+    Post,
+    PromptManager,
+    RedisDB,
+    decode_redis,
+    ensure_delay_between_posts,
+    get_async_connection_pool,
+    get_async_redis_db,
+    get_prompt_manager,
+    use_dynamic_prompt,
+)
 
 
 @pytest.fixture
@@ -137,18 +157,53 @@ def test_get_active_twitter_accounts(redis_db, mock_redis):
 
 def test_remove_account(redis_db, mock_redis):
     redis_db.remove_account("user")
-    calls = [
-        call("twitter_data:user"),
-        call("last_create_post_time:user"),
-        call("last_gorilla_marketing_time:user"),
-        call("last_likes_time:user"),
-        call("last_comment_agix_time:user"),
-        call("last_answer_my_comment_time:user"),
-        call("last_answer_comment_time:user"),
-        call("posted_tweets:user"),
-        call("gorilla_marketing_answered:user")
-    ]
-    mock_redis.delete.assert_has_calls(calls, any_order=True)
+    mock_redis.delete.assert_called_once_with(
+        "twitter_data:user",
+        "last_create_post_time:user",
+        "last_gorilla_marketing_time:user",
+        "last_likes_time:user",
+        "last_comment_agix_time:user",
+        "last_answer_my_comment_time:user",
+        "last_answer_comment_time:user",
+        "posted_tweets:user",
+        "gorilla_marketing_answered:user",
+    )
+
+
+def test_get_many(redis_db, mock_redis):
+    mock_redis.mget.return_value = [b'{"a": 1}', None, b'"x"']
+    assert redis_db.get_many(["k1", "k2", "k3"], default=0) == [{"a": 1}, 0, "x"]
+    mock_redis.mget.assert_called_once_with(["k1", "k2", "k3"])
+    assert redis_db.get_many([]) == []
+
+
+def test_set_many(redis_db, mock_redis):
+    pipe = mock_redis.pipeline.return_value
+    redis_db.set_many({"k1": {"a": 1}, "k2": None}, ex=60)
+    mock_redis.pipeline.assert_called_once_with(transaction=False)
+    pipe.set.assert_called_once_with("k1", json.dumps({"a": 1}), ex=60)
+    pipe.delete.assert_called_once_with("k2")
+    pipe.execute.assert_called_once()
+
+
+def test_delete_many(redis_db, mock_redis):
+    redis_db.delete_many(["k1", "k2"])
+    mock_redis.delete.assert_called_once_with("k1", "k2")
+    mock_redis.reset_mock()
+    redis_db.delete_many([])
+    mock_redis.delete.assert_not_called()
+
+
+def test_load_account_state(redis_db, mock_redis):
+    mock_redis.mget.return_value = [b"10.5", None, None, b"3"]
+    state = redis_db.load_account_state(["u1", "u2"], ["likes", "posts"])
+    assert state == {
+        "u1": {"likes": 10.5, "posts": 0.0},
+        "u2": {"likes": 0.0, "posts": 3.0},
+    }
+    mock_redis.mget.assert_called_once_with(
+        ["likes:u1", "posts:u1", "likes:u2", "posts:u2"]
+    )
 
 
 def test_add_send_partnership(redis_db, mock_redis):
@@ -188,9 +243,14 @@ def test_save_tweet_link(redis_db, mock_redis):
 
 
 @pytest.fixture
-def prompt_manager(redis_db):
+def prompt_manager(redis_db, mock_redis):
+    mock_redis.pubsub.return_value.get_message.side_effect = lambda timeout: time.sleep(0.01)
+    PromptManager._instance = None
     with patch('redis_client.main.get_redis_db', return_value=redis_db):
-        return PromptManager(redis_db)
+        manager = PromptManager(redis_db)
+    yield manager
+    manager.stop()
+    PromptManager._instance = None
 
 
 def test_prompt_manager_singleton(prompt_manager, redis_db):
@@ -217,6 +277,84 @@ def test_extract_fstring_vars(prompt_manager):
     assert prompt_manager._extract_fstring_vars(template) == {"name", "project"}
 
 
+def _wait_for(condition, timeout=2.0):
+    deadline = time.time() + timeout
+    while not condition() and time.time() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+
+def test_prompt_subscriber_invalidates_on_message(prompt_manager, mock_redis):
+    pubsub = mock_redis.pubsub.return_value
+    assert _wait_for(lambda: pubsub.get_message.called)
+    prompt_manager.prompt_cache["prompt:create_tweet"] = "cached"
+    messages = iter([{"type": "message", "data": b"prompt:create_tweet"}])
+    pubsub.get_message.side_effect = lambda timeout: next(messages, None) or time.sleep(0.01)
+
+    assert _wait_for(lambda: "prompt:create_tweet" not in prompt_manager.prompt_cache)
+    pubsub.subscribe.assert_called_once_with("prompt_updates")
+    pubsub.get_message.assert_called_with(timeout=PromptManager.SUBSCRIBER_TIMEOUT)
+
+
+def test_prompt_subscriber_reconnects(prompt_manager, mock_redis):
+    pubsub = mock_redis.pubsub.return_value
+    assert _wait_for(lambda: pubsub.get_message.called)
+    prompt_manager.RECONNECT_DELAY = 0
+    errors = iter([redis.exceptions.ConnectionError()])
+
+    def get_message(timeout):
+        error = next(errors, None)
+        if error:
+            raise error
+        time.sleep(0.01)
+
+    pubsub.get_message.side_effect = get_message
+    assert _wait_for(lambda: mock_redis.pubsub.call_count == 2)
+    pubsub.close.assert_called_once()
+
+
+def test_prompt_manager_stop(prompt_manager, mock_redis):
+    prompt_manager.stop()
+    assert not prompt_manager._subscriber_thread.is_alive()
+    mock_redis.pubsub.return_value.close.assert_called()
+
+
+def test_get_prompt_manager_reuses_instance(prompt_manager):
+    with patch("redis_client.main.get_redis_db") as mock_get_redis_db:
+        assert get_prompt_manager() is prompt_manager
+        mock_get_redis_db.assert_not_called()
+
+
+def test_prompt_manager_module_attribute_is_lazy(redis_db, mock_redis):
+    mock_redis.pubsub.return_value.get_message.side_effect = lambda timeout: time.sleep(0.01)
+    PromptManager._instance = None
+    with patch("redis_client.main.get_redis_db", return_value=redis_db) as mock_get_redis_db:
+        from redis_client.main import prompt_manager
+
+        assert prompt_manager is get_prompt_manager()
+        mock_get_redis_db.assert_called_once()
+    prompt_manager.stop()
+    PromptManager._instance = None
+
+
+def test_get_prompt_manager_builds_one_manager_across_threads(redis_db, mock_redis):
+    mock_redis.pubsub.return_value.get_message.side_effect = lambda timeout: time.sleep(0.01)
+    PromptManager._instance = None
+
+    def slow_redis_db():
+        time.sleep(0.05)
+        return redis_db
+
+    with patch("redis_client.main.get_redis_db", side_effect=slow_redis_db) as mock_get_redis_db:
+        with ThreadPoolExecutor(4) as pool:
+            managers = list(pool.map(lambda _: get_prompt_manager(), range(4)))
+
+    assert all(manager is managers[0] for manager in managers)
+    mock_get_redis_db.assert_called_once()
+    managers[0].stop()
+    PromptManager._instance = None
+
+
 @pytest.mark.asyncio
 async def test_ensure_delay_between_posts_no_wait(redis_db, mock_redis):
     mock_redis.zrangebyscore.return_value = []
@@ -328,3 +466,343 @@ def test_wait_for_redis_failure(redis_db, mock_redis):
 def test_wait_for_redis_busy_loading(redis_db, mock_redis):
     mock_redis.set.side_effect = redis.exceptions.BusyLoadingError()
     assert redis_db.wait_for_redis(1) is False
+
+
+@pytest.fixture
+def mock_async_redis():
+    return AsyncMock()
+
+
+@pytest.fixture
+def async_redis_db(mock_async_redis):
+    db = AsyncRedisDB(connection_pool=MagicMock())
+    db.r = mock_async_redis
+    return db
+
+
+@pytest.mark.asyncio
+async def test_async_connection_pool_is_shared():
+    pool = get_async_connection_pool()
+    assert get_async_connection_pool() is pool
+    assert AsyncRedisDB().r.connection_pool is pool
+    assert AsyncRedisDB().r.connection_pool is pool
+
+
+def test_async_connection_pool_per_event_loop():
+    async def pool():
+        return get_async_connection_pool()
+
+    first = asyncio.run(pool())
+    second = asyncio.run(pool())
+    assert first is not second
+
+
+def test_async_connection_pool_waits_for_free_connection():
+    async def run():
+        pool = get_async_connection_pool()
+        in_use = peak = 0
+
+        async def command():
+            nonlocal in_use, peak
+            connection = await pool.get_connection()
+            in_use += 1
+            peak = max(peak, in_use)
+            await asyncio.sleep(0.01)
+            in_use -= 1
+            await pool.release(connection)
+
+        with patch.object(pool, "ensure_connection", AsyncMock()):
+            await asyncio.gather(*(command() for _ in range(6)))
+        return peak
+
+    with patch("redis_client.main.settings") as mock_settings:
+        mock_settings.REDIS_MAX_CONNECTIONS = 2
+        mock_settings.REDIS_POOL_TIMEOUT = 5
+        assert asyncio.run(run()) == 2
+
+
+@pytest.mark.asyncio
+async def test_async_get(async_redis_db, mock_async_redis):
+    mock_async_redis.get.return_value = b'{"key": "value"}'
+    assert await async_redis_db.get("test_key") == {"key": "value"}
+
+    mock_async_redis.get.return_value = None
+    assert await async_redis_db.get("nonexistent", "default") == "default"
+
+
+@pytest.mark.asyncio
+async def test_async_set_and_setex(async_redis_db, mock_async_redis):
+    await async_redis_db.set("test_key", {"key": "value"})
+    mock_async_redis.set.assert_awaited_once_with(
+        "test_key", json.dumps({"key": "value"}), keepttl=False
+    )
+    await async_redis_db.setex("test_key", {"key": "value"}, 60)
+    mock_async_redis.setex.assert_awaited_once_with(
+        "test_key", 60, json.dumps({"key": "value"})
+    )
+    await async_redis_db.set("test_key", None)
+    mock_async_redis.delete.assert_awaited_once_with("test_key")
+
+
+@pytest.mark.asyncio
+async def test_async_user_posts(async_redis_db, mock_async_redis):
+    post = Post(id="1", text="test", sender_username="user", timestamp=123)
+    await async_redis_db.add_user_post("user", post)
+    mock_async_redis.zadd.assert_awaited_once_with(
+        "posted_tweets:user", {json.dumps(asdict(post)): 123}
+    )
+
+    mock_async_redis.zrangebyscore.return_value = [json.dumps(asdict(post)).encode()]
+    assert await async_redis_db.get_user_posts_by_create_time("user", 3600) == [post]
+
+    mock_async_redis.zrange.return_value = [json.dumps(asdict(post)).encode()]
+    assert await async_redis_db.get_user_posts("user") == [post]
+
+
+@pytest.mark.asyncio
+async def test_async_get_active_twitter_accounts(async_redis_db, mock_async_redis):
+    async def scan_iter(pattern):
+        for key in (b"twitter_data:user1", b"twitter_data:user2"):
+            yield key
+
+    mock_async_redis.scan_iter = scan_iter
+    assert await async_redis_db.get_active_twitter_accounts() == ["user1", "user2"]
+
+
+@pytest.mark.asyncio
+async def test_async_wait_for_redis_failure(async_redis_db, mock_async_redis):
+    mock_async_redis.set.side_effect = redis.exceptions.ConnectionError()
+    with patch("asyncio.sleep", new_callable=AsyncMock):
+        with patch("redis_client.main.time.time", side_effect=[0, 0, 2]):
+            assert await async_redis_db.wait_for_redis(1) is False
+
+
+@pytest.mark.asyncio
+async def test_get_async_redis_db_connects(mock_async_redis):
+    with patch("redis_client.main.redis.asyncio.Redis", return_value=mock_async_redis):
+        db = await get_async_redis_db(connection_pool=MagicMock())
+    assert db.r is mock_async_redis
+    mock_async_redis.set.assert_any_await(
+        "function_variables", json.dumps({k: list(v) for k, v in FUNCTION_VARIABLES.items()}), keepttl=False
+    )
+
+
+@pytest.mark.asyncio
+async def test_async_bulk_operations(async_redis_db, mock_async_redis):
+    mock_async_redis.mget.return_value = [b"1", None]
+    assert await async_redis_db.load_account_state(["u1"], ["likes", "posts"]) == {
+        "u1": {"likes": 1.0, "posts": 0.0}
+    }
+
+    pipe = MagicMock()
+    pipe.execute = AsyncMock()
+    mock_async_redis.pipeline = MagicMock(return_value=pipe)
+    await async_redis_db.set_many({"k1": 1})
+    pipe.set.assert_called_once_with("k1", "1", ex=None)
+    pipe.execute.assert_awaited_once()
+
+    await async_redis_db.remove_account("user")
+    assert mock_async_redis.delete.await_count == 1
+
+
+def test_local_cache_lru_eviction_and_counters():
+    cache = LocalCache(max_size=2, ttl=None)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+    assert cache.get("b") is MISSING
+    assert cache.get("a") == 1
+    assert cache.stats() == {"hits": 2, "misses": 1, "evictions": 1, "size": 2}
+
+
+def test_local_cache_ttl_expiry():
+    cache = LocalCache(ttl=10)
+    with patch("redis_client.cache.time.monotonic", return_value=100):
+        cache.set("a", None)
+        assert cache.get("a") is None
+    with patch("redis_client.cache.time.monotonic", return_value=111):
+        assert cache.get("a") is MISSING
+    assert len(cache) == 0
+
+
+def test_local_cache_drops_load_invalidated_in_flight():
+    cache = LocalCache(ttl=None)
+    token = cache.begin("a")
+    cache.invalidate("a")
+    assert cache.set("a", "stale", token=token) is False
+    assert cache.get("a") is MISSING
+
+    token = cache.begin("a")
+    assert cache.set("a", "fresh", token=token) is True
+    assert cache.get("a") == "fresh"
+
+
+def test_enable_cache_keeps_existing_notification_flags(redis_db, mock_redis):
+    mock_redis.config_get.return_value = {"notify-keyspace-events": "Ex"}
+    redis_db.enable_cache()
+    mock_redis.config_set.assert_called_once_with("notify-keyspace-events", "ExKA")
+
+    mock_redis.config_set.reset_mock()
+    mock_redis.config_get.return_value = {"notify-keyspace-events": "AKE"}
+    redis_db.enable_cache()
+    mock_redis.config_set.assert_not_called()
+    redis_db.disable_cache()
+
+
+def test_get_does_not_cache_value_invalidated_during_read(redis_db, mock_redis):
+    mock_redis.config_get.return_value = {"notify-keyspace-events": ""}
+    redis_db.enable_cache()
+
+    def get(key):
+        # запись из другого процесса приходит, пока GET ещё выполняется
+        redis_db._on_keyspace_event(
+            {"channel": b"__keyspace@0__:function_variables", "data": b"set"}
+        )
+        return b"1"
+
+    mock_redis.get.side_effect = get
+    redis_db.get("function_variables")
+    redis_db.get("function_variables")
+    assert mock_redis.get.call_count == 2
+
+    redis_db.disable_cache()
+    redis_db._on_keyspace_event(
+        {"channel": b"__keyspace@0__:function_variables", "data": b"set"}
+    )
+
+
+def test_enable_cache_serves_repeated_gets_locally(redis_db, mock_redis):
+    mock_redis.config_get.return_value = {"notify-keyspace-events": ""}
+    redis_db.enable_cache(patterns=("function_variables", "twitter_data:*"))
+    mock_redis.config_set.assert_called_once_with("notify-keyspace-events", "KA")
+    mock_redis.pubsub.return_value.psubscribe.assert_called_once()
+
+    mock_redis.get.return_value = b'{"key": "value"}'
+    assert redis_db.get("twitter_data:user") == {"key": "value"}
+    assert redis_db.get("twitter_data:user") == {"key": "value"}
+    assert redis_db.get("other") == {"key": "value"}
+    assert mock_redis.get.call_count == 2
+    assert redis_db.cache_stats()["hits"] == 1
+
+
+def test_cache_invalidation(redis_db, mock_redis):
+    redis_db.enable_cache()
+    mock_redis.get.return_value = b"1"
+    redis_db.get("function_variables")
+
+    redis_db._on_keyspace_event(
+        {"channel": b"__keyspace@0__:function_variables", "data": b"set"}
+    )
+    redis_db.get("function_variables")
+    assert mock_redis.get.call_count == 2
+
+    redis_db.set("function_variables", 2)
+    redis_db.get("function_variables")
+    assert mock_redis.get.call_count == 3
+
+    listener = redis_db._cache_listener
+    redis_db.disable_cache()
+    listener.stop.assert_called_once()
+    assert redis_db.cache_stats() == {}
+
+
+def test_compiled_prompt_validates_variables():
+    compiled = CompiledPrompt.compile("check_answer_is_needed", "Check {twitter_comment}")
+    assert compiled.variables == {"twitter_comment"}
+    assert compiled.format({"twitter_comment": "hi"}) == "Check hi"
+    with pytest.raises(ValueError, match="недопустимые переменные"):
+        CompiledPrompt.compile("check_answer_is_needed", "Check {unknown}")
+
+
+def test_get_compiled_prompt_is_cached_per_version(prompt_manager):
+    prompt_manager.prompt_cache["prompt:check_answer_is_needed"] = "v1 {twitter_comment}"
+    compiled = prompt_manager.get_compiled_prompt("check_answer_is_needed")
+    assert prompt_manager.get_compiled_prompt("check_answer_is_needed") is compiled
+
+    prompt_manager._invalidate_compiled("check_answer_is_needed")
+    prompt_manager.prompt_cache["prompt:check_answer_is_needed"] = "v2 {twitter_comment}"
+    recompiled = prompt_manager.get_compiled_prompt("check_answer_is_needed")
+    assert recompiled.template == "v2 {twitter_comment}"
+    assert list(prompt_manager.compiled_prompts) == [("check_answer_is_needed", 1)]
+
+
+def test_prompt_update_never_compiles_stale_template_under_new_version(
+    prompt_manager, mock_redis
+):
+    name = "check_answer_is_needed"
+    prompt_manager.prompt_cache[f"prompt:{name}"] = "v1 {twitter_comment}"
+    prompt_manager.get_compiled_prompt(name)
+    mock_redis.get.return_value = json.dumps("v2 {twitter_comment}")
+
+    # a reader runs between every step of the update
+    class InterleavedCache(dict):
+        def pop(self, *args):
+            value = super().pop(*args)
+            prompt_manager.get_compiled_prompt(name)
+            return value
+
+    invalidate = prompt_manager._invalidate_compiled
+
+    def interleaved_invalidate(function_name):
+        invalidate(function_name)
+        prompt_manager.get_compiled_prompt(name)
+
+    prompt_manager.prompt_cache = InterleavedCache(prompt_manager.prompt_cache)
+    with patch.object(prompt_manager, "_invalidate_compiled", interleaved_invalidate):
+        prompt_manager._on_prompt_update(f"prompt:{name}")
+
+    assert prompt_manager.get_compiled_prompt(name).template == "v2 {twitter_comment}"
+
+
+@pytest.mark.asyncio
+async def test_use_dynamic_prompt_formats_compiled_template(prompt_manager):
+    prompt_manager.prompt_cache["prompt:check_answer_is_needed"] = "Check {twitter_comment}"
+
+    with patch("redis_client.main.inspect.signature", wraps=inspect.signature) as mock_sig:
+        @use_dynamic_prompt("check_answer_is_needed")
+        async def check(twitter_comment: str, prompt: str = ""):
+            return prompt
+
+        assert await check("hello") == "Check hello"
+        assert await check("again") == "Check again"
+        assert mock_sig.call_count == 1
+
+
+@pytest.mark.asyncio
+async def test_knowledge_cache_memoizes_and_invalidates():
+    cache = KnowledgeCache()
+    kb, other_kb = MagicMock(), MagicMock()
+    kb.search_knowledge = AsyncMock(return_value="knowledge")
+    other_kb.search_knowledge = AsyncMock(return_value="other")
+
+    assert await cache.search(kb, "query", 2) == "knowledge"
+    assert await cache.search(kb, "query", 2) == "knowledge"
+    assert await cache.search(other_kb, "query", 2) == "other"
+    kb.search_knowledge.assert_awaited_once_with(query="query", k=2)
+
+    cache.invalidate(kb)
+    await cache.search(kb, "query", 2)
+    await cache.search(other_kb, "query", 2)
+    assert kb.search_knowledge.await_count == 2
+    assert other_kb.search_knowledge.await_count == 1
+
+    cache.invalidate()
+    await cache.search(other_kb, "query", 2)
+    assert other_kb.search_knowledge.await_count == 2
+
+
+@pytest.mark.asyncio
+async def test_use_dynamic_prompt_uses_shared_knowledge_cache(prompt_manager):
+    prompt_manager.prompt_cache["prompt:check_tweet_for_marketing"] = "{tweet_text} {relevant_knowledge}"
+    kb = MagicMock()
+    kb.search_knowledge = AsyncMock(return_value="facts")
+
+    @use_dynamic_prompt("check_tweet_for_marketing")
+    async def check(tweet_text: str, knowledge_base, prompt: str = ""):
+        return prompt
+
+    with patch("redis_client.main.knowledge_cache", KnowledgeCache()):
+        assert await check("tweet", kb) == "tweet facts"
+        assert await check("tweet", kb) == "tweet facts"
+    kb.search_knowledge.assert_awaited_once()
@@ -0,0 +1,63 @@
+from msgspec import Struct
+
+
+class DTO(Struct, gc=False):
+    pass
+
+
+class TokenInfo(DTO):
+    mintAuthority: str | None = None
+    freezeAuthority: str | None = None
+    supply: int | None = None
+    decimals: int | None = None
+
+
+class TokenMeta(DTO):
+    name: str | None = None
+    symbol: str | None = None
+    mutable: bool | None = None
+    updateAuthority: str | None = None
+
+
+class Holder(DTO):
+    address: str
+    owner: str | None = None
+    pct: float | None = None
+    uiAmount: float | None = None
+    insider: bool | None = None
+
+
+class Risk(DTO):
+    name: str
+    level: str | None = None
+    score: int | None = None
+    value: str | None = None
+    description: str | None = None
+
+
+class MarketLP(DTO):
+    lpLockedPct: float | None = None
+    lpLockedUSD: float | None = None
+
+
+class Market(DTO):
+    pubkey: str
+    marketType: str | None = None
+    lp: MarketLP | None = None
+
+
+class TokenReport(DTO):
+    """GET /tokens/{mint}/report"""
+
+    mint: str
+    creator: str | None = None
+    token: TokenInfo | None = None
+    tokenMeta: TokenMeta | None = None
+    score: int | None = None
+    score_normalised: int | None = None
+    rugged: bool | None = None
+    risks: list[Risk] | None = None
+    topHolders: list[Holder] | None = None
+    markets: list[Market] | None = None
+    totalMarketLiquidity: float | None = None
+    totalLPProviders: int | None = None
@@ -1,18 +1,14 @@
-import json
+from msgspec import json
 
 from rugcheck_wrapper.main import RugCheckAPI
 
 
 async def main():
-    api = RugCheckAPI()
-
-    try:
+    async with RugCheckAPI() as api:
         data = await api.get_token_report(
             "5fGA1os23NNWzhGYLhrWAEnwKDgUX2RSUNmgJACcY5hb"
         )  # Пример адреса токена
-        print(json.dumps(data, indent=4))
-    finally:
-        await api.close()
+        print(json.format(json.encode(data), indent=4))
 
 
 if __name__ == "__main__":
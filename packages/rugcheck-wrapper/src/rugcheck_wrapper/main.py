@@ -1,26 +1,100 @@
-from typing import Any
+import asyncio
+from collections.abc import Iterable
+from typing import Any, ClassVar
 
-import aiohttp
+from aiohttp import ClientResponseError
+from msgspec import json
+from shared_clients.aiohttp_ import (
+    INTERACTIVE,
+    AiohttpAPI,
+    AiohttpSession,
+    RateLimiter,
+    ResponseCache,
+    SingleFlight,
+)
+from shared_clients.exceptions import APIError
 
+from rugcheck_wrapper import dto
 
-class RugCheckAPI:
-    BASE_URL = "https://api.rugcheck.xyz/v1"
 
-    def __init__(self):
-        self.session = aiohttp.ClientSession()
+class RugCheckAPIError(APIError, Exception):
+    """An HTTP failure; an APIError that ``except Exception`` also catches."""
 
-    async def _request(self, endpoint: str) -> dict[str, Any]:
-        """Completes a request to the API."""
-        async with self.session.get(f"{self.BASE_URL}{endpoint}") as response:
-            if response.status != 200:
-                raise Exception(f"Error {response.status}: {await response.text()}")
-            return await response.json()
 
-    async def get_token_report(self, token_address: str) -> dict[str, Any]:
+class RugCheckSession(AiohttpSession):
+    BASE_URL: ClassVar[str] = "https://api.rugcheck.xyz/v1"
+
+    def __init__(
+        self,
+        shared: str = "rugcheck",
+        limiter: RateLimiter | None = None,
+        priority: int = INTERACTIVE,
+        agent: str = "default",
+        single_flight: SingleFlight | None = None,
+    ) -> None:
+        # Сессия берётся из session_registry при первом запросе и живёт дальше,
+        # так что пул соединений к api.rugcheck.xyz переиспользуется
+        super().__init__(
+            None, self.BASE_URL, shared, limiter, priority, agent, single_flight
+        )
+
+
+class RugCheckAPI(AiohttpAPI[RugCheckSession]):
+    BASE_URL = RugCheckSession.BASE_URL
+
+    def __init__(
+        self,
+        session: RugCheckSession | None = None,
+        cache: ResponseCache | None = None,
+    ):
+        super().__init__(session or RugCheckSession())
+        self.cache = cache
+
+    async def _request(self, endpoint: str, type: Any = Any) -> Any:
+        """Completes a request to the API and decodes the body into type.
+
+        Errors surface as RugCheckAPIError. With a cache, responses are served
+        from it while fresh.
+        """
+        try:
+            if self.cache is not None:
+                url = f"{self.BASE_URL}{endpoint}"
+                return json.decode(await self.cache.get(self._session, url), type=type)
+            return await self._session.fetch("GET", endpoint, type=type)
+        except APIError as e:
+            raise RugCheckAPIError(e.status, e.message, **e.kwargs) from e
+        except ClientResponseError as e:
+            raise RugCheckAPIError(e.status, e.message) from e
+
+    async def get_token_report(self, token_address: str) -> dto.TokenReport:
         """Generate a detailed report for given token mint."""
         endpoint = f"/tokens/{token_address}/report"
-        return await self._request(endpoint)
+        return await self._request(endpoint, type=dto.TokenReport)
+
+    async def get_token_reports(
+        self,
+        token_addresses: Iterable[str],
+        concurrency: int = 8,
+        return_exceptions: bool = False,
+    ) -> dict[str, dto.TokenReport | Exception]:
+        """Reports for many mints, at most concurrency requests at a time.
+
+        With return_exceptions a failed mint maps to its exception instead of
+        failing the whole batch.
+        """
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def report(token_address: str) -> dto.TokenReport:
+            async with semaphore:
+                return await self.get_token_report(token_address)
+
+        token_addresses = list(dict.fromkeys(token_addresses))
+        results = await asyncio.gather(
+            *(report(address) for address in token_addresses),
+            return_exceptions=return_exceptions,
+        )
+        return dict(zip(token_addresses, results, strict=True))
 
     async def close(self):
-        """Closes the session."""
-        await self.session.close()
+        """Releases the session (a shared one stays open for other clients)."""
+        await self.__aexit__(None, None, None)
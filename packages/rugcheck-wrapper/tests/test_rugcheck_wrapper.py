@@ -1,31 +1,34 @@
 import pytest
-import aiohttp
-from unittest.mock import AsyncMock, patch, MagicMock
+from yarl import URL
+from unittest.mock import patch
 
 import pytest_asyncio
+from aioresponses import aioresponses
 
+from rugcheck_wrapper import dto
+from rugcheck_wrapper.dto import TokenReport
 from rugcheck_wrapper.main import RugCheckAPI
+from shared_clients.aiohttp_ import session_registry
+from shared_clients.exceptions import APIError
 
-
-@pytest.fixture
-def mock_aiohttp():
-    with patch("aiohttp.ClientSession") as mock_session:
-        yield mock_session
+REPORT_URL = "https://api.rugcheck.xyz/v1/tokens/0x123/report"
 
 
 @pytest_asyncio.fixture
-async def rugcheck_api(mock_aiohttp):
+async def rugcheck_api():
     api = RugCheckAPI()
     yield api
     await api.close()
+    await session_registry.close()
 
 
 @pytest.mark.asyncio
-async def test_init_creates_session(mock_aiohttp):
-    """Тест: инициализация создает клиентскую сессию"""
-    api = RugCheckAPI()
-    assert mock_aiohttp.called
-    await api.close()
+async def test_init_does_not_create_session():
+    """Тест: сессия создаётся лениво, при первом запросе"""
+    with patch("aiohttp.ClientSession") as mock_session:
+        api = RugCheckAPI()
+        assert not mock_session.called
+        await api.close()
 
 
 @pytest.mark.asyncio
@@ -35,28 +38,65 @@ async def test_base_url_class_attribute():
 
 
 @pytest.mark.asyncio
-async def test_get_token_report_success(rugcheck_api, mock_aiohttp):
+async def test_get_token_report_success(rugcheck_api):
     """Тест: успешный запрос отчета по токену"""
     mock_response = {
-        "token": "0x123",
+        "mint": "0x123",
         "score": 85,
-        "is_rug": False,
+        "rugged": False,
         "details": {"audit": True}
     }
 
-    mock_resp = MagicMock()
-    mock_resp.status = 200
-    mock_resp.json = AsyncMock(return_value=mock_response)
+    with aioresponses() as mocked:
+        mocked.get(REPORT_URL, payload=mock_response)
+        result = await rugcheck_api.get_token_report("0x123")
 
-    mock_session = mock_aiohttp.return_value
-    mock_session.get.return_value.__aenter__.return_value = mock_resp
+    assert result == TokenReport(mint="0x123", score=85, rugged=False)
+    assert len(mocked.requests) == 1
 
-    result = await rugcheck_api.get_token_report("0x123")
 
-    assert result == mock_response
-    mock_session.get.assert_called_once_with(
-        "https://api.rugcheck.xyz/v1/tokens/0x123/report"
-    )
+@pytest.mark.asyncio
+async def test_get_token_report_nested_schema(rugcheck_api):
+    """Тест: вложенные части отчёта декодируются, лишние поля пропускаются"""
+    mock_response = {
+        "mint": "0x123",
+        "tokenMeta": {"name": "Token", "symbol": "TOK", "uri": "https://x"},
+        "risks": [{"name": "Low liquidity", "level": "warn", "score": 400}],
+        "topHolders": [{"address": "h1", "pct": 12.5, "insider": True}],
+        "markets": [{"pubkey": "m1", "marketType": "raydium", "lp": {"lpLockedPct": 99.0, "holders": []}}],
+        "fileMeta": {"image": "https://x"},
+    }
+
+    with aioresponses() as mocked:
+        mocked.get(REPORT_URL, payload=mock_response)
+        result = await rugcheck_api.get_token_report("0x123")
+
+    assert result.tokenMeta == dto.TokenMeta(name="Token", symbol="TOK")
+    assert result.risks == [dto.Risk(name="Low liquidity", level="warn", score=400)]
+    assert result.topHolders == [dto.Holder(address="h1", pct=12.5, insider=True)]
+    assert result.markets[0].lp == dto.MarketLP(lpLockedPct=99.0)
+    assert not hasattr(result, "fileMeta")
+
+
+@pytest.mark.asyncio
+async def test_get_token_report_null_sections(rugcheck_api):
+    """Тест: null вместо вложенных частей отчёта не ломает декодирование"""
+    mock_response = {
+        "mint": "0x123",
+        "token": None,
+        "tokenMeta": None,
+        "rugged": None,
+        "risks": None,
+        "topHolders": None,
+        "markets": None,
+    }
+
+    with aioresponses() as mocked:
+        mocked.get(REPORT_URL, payload=mock_response)
+        result = await rugcheck_api.get_token_report("0x123")
+
+    assert result == TokenReport(mint="0x123")
+    assert result.topHolders is None
 
 
 @pytest.mark.asyncio
@@ -66,49 +106,74 @@ async def test_get_token_report_success(rugcheck_api, mock_aiohttp):
     (500, "Internal Server Error"),
     (503, "Service Unavailable")
 ])
-async def test_get_token_report_errors(status_code, error_msg, rugcheck_api, mock_aiohttp):
+async def test_get_token_report_errors(status_code, error_msg, rugcheck_api):
     """Тест: обработка различных ошибок API"""
-    mock_resp = MagicMock()
-    mock_resp.status = status_code
-    mock_resp.text = AsyncMock(return_value=error_msg)
+    with aioresponses() as mocked:
+        mocked.get(REPORT_URL, status=status_code, body=error_msg)
 
-    mock_session = mock_aiohttp.return_value
-    mock_session.get.return_value.__aenter__.return_value = mock_resp
+        with pytest.raises(APIError) as exc_info:
+            await rugcheck_api.get_token_report("0x123")
 
-    with pytest.raises(Exception, match=f"Error {status_code}: {error_msg}"):
-        await rugcheck_api.get_token_report("0x123")
+    assert exc_info.value.status == status_code
+    assert error_msg in exc_info.value.message
+    # caught by handlers written for the old Exception as well
+    assert isinstance(exc_info.value, Exception)
 
 
 @pytest.mark.asyncio
-async def test_request_with_empty_endpoint(rugcheck_api, mock_aiohttp):
+async def test_request_with_empty_endpoint(rugcheck_api):
     """Тест: запрос с пустым эндпоинтом"""
-    mock_resp = MagicMock()
-    mock_resp.status = 200
-    mock_resp.json = AsyncMock(return_value={})
-
-    mock_session = mock_aiohttp.return_value
-    mock_session.get.return_value.__aenter__.return_value = mock_resp
-
     with patch.object(rugcheck_api, "_request") as mock_request:
         await rugcheck_api._request("")
         mock_request.assert_called_once()
 
 
 @pytest.mark.asyncio
-async def test_close_session(rugcheck_api, mock_aiohttp):
-    """Тест: корректное закрытие сессии"""
-    mock_session = mock_aiohttp.return_value
-    mock_session.close = AsyncMock()
+async def test_get_token_reports_batch(rugcheck_api):
+    """Тест: пакетный запрос отчётов с ограничением параллелизма"""
+    with aioresponses() as mocked:
+        for mint in ("a", "b", "c"):
+            mocked.get(
+                f"https://api.rugcheck.xyz/v1/tokens/{mint}/report",
+                payload={"mint": mint, "score": 1},
+            )
+        mocked.get("https://api.rugcheck.xyz/v1/tokens/bad/report", status=500)
 
-    await rugcheck_api.close()
-    mock_session.close.assert_awaited_once()
+        reports = await rugcheck_api.get_token_reports(
+            ["a", "b", "c", "bad", "a"], concurrency=2, return_exceptions=True
+        )
+
+    assert list(reports) == ["a", "b", "c", "bad"]
+    assert reports["b"].mint == "b"
+    assert isinstance(reports["bad"], APIError)
 
 
 @pytest.mark.asyncio
-async def test_context_manager():
-    """Тест: использование как контекстного менеджера"""
-    with patch("aiohttp.ClientSession") as mock_session:
-        mock_session.return_value.close = AsyncMock()
-        async with RugCheckAPI() as api:
-            assert isinstance(api, RugCheckAPI)
-        mock_session.return_value.close.assert_awaited_once()
\ No newline at end of file
+async def test_clients_share_one_pooled_session():
+    """Тест: все клиенты используют одну сессию из session_registry"""
+    with aioresponses() as mocked:
+        mocked.get(REPORT_URL, payload={"mint": "0x123"}, repeat=True)
+        async with RugCheckAPI() as first:
+            await first.get_token_report("0x123")
+        async with RugCheckAPI() as second:
+            await second.get_token_report("0x123")
+
+    session = session_registry.get_session("rugcheck")
+    assert not session.closed
+    assert len(mocked.requests[("GET", URL(REPORT_URL))]) == 2
+    await session_registry.close()
+
+
+@pytest.mark.asyncio
+async def test_get_token_report_uses_cache(rugcheck_api):
+    """Тест: свежий отчёт берётся из кэша"""
+    from shared_clients.aiohttp_ import ResponseCache
+
+    rugcheck_api.cache = ResponseCache(ttl=60)
+    with aioresponses() as mocked:
+        mocked.get(REPORT_URL, payload={"mint": "0x123", "score": 5})
+        first = await rugcheck_api.get_token_report("0x123")
+        second = await rugcheck_api.get_token_report("0x123")
+
+    assert first == second
+    assert first.score == 5
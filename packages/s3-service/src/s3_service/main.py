@@ -1,4 +1,8 @@
+import asyncio
 import re
+import threading
+import weakref
+from collections import defaultdict
 
 import aioboto3
 from botocore.exceptions import ClientError
@@ -10,31 +14,165 @@ from s3_service.config import get_settings
 settings = get_settings()
 
 
+class _LoopClients:
+    """Clients and locks of one event loop; aiohttp connections can't cross loops."""
+
+    def __init__(self):
+        self.clients = {}
+        self.contexts = {}
+        self.locks = defaultdict(asyncio.Lock)
+
+
+class S3ClientPool:
+    """aioboto3 S3 clients shared per endpoint and kept open until close().
+
+    Every event loop gets its own clients. The pool also remembers which
+    buckets were already checked, so head_bucket runs once per bucket per
+    process instead of once per S3Service.
+    """
+
+    def __init__(self):
+        self._loops = weakref.WeakKeyDictionary()
+        self._loops_lock = threading.Lock()
+        self._buckets = set()
+        self._services = weakref.WeakSet()
+
+    @staticmethod
+    def _create(endpoint_url: str, access_key: str, secret_key: str):
+        return aioboto3.Session().client(
+            "s3",
+            endpoint_url=endpoint_url,
+            aws_access_key_id=access_key,
+            aws_secret_access_key=secret_key,
+        )
+
+    def _current(self) -> _LoopClients:
+        loop = asyncio.get_running_loop()
+        with self._loops_lock:
+            state = self._loops.get(loop)
+            if state is None:
+                state = self._loops[loop] = _LoopClients()
+        return state
+
+    async def get(self, endpoint_url: str, access_key: str, secret_key: str):
+        state = self._current()
+        key = (endpoint_url, access_key)
+        client = state.clients.get(key)
+        if client is None:
+            async with state.locks[key]:
+                client = state.clients.get(key)
+                if client is None:
+                    context = self._create(endpoint_url, access_key, secret_key)
+                    client = await context.__aenter__()
+                    state.contexts[key] = context
+                    state.clients[key] = client
+        return client
+
+    def attach(self, service: "S3Service") -> None:
+        """Registers service so close() detaches it from its client."""
+        self._services.add(service)
+
+    async def ensure_bucket(self, endpoint_url: str, bucket_name: str, check):
+        """Awaits check() the first time bucket_name is seen on endpoint_url."""
+        key = (endpoint_url, bucket_name)
+        if key in self._buckets:
+            return
+        async with self._current().locks[key]:
+            if key not in self._buckets:
+                await check()
+                self._buckets.add(key)
+
+    async def close(self):
+        """Closes the clients of the running loop and detaches all services.
+
+        Detached services fetch a fresh client on their next call.
+        """
+        with self._loops_lock:
+            state = self._loops.pop(asyncio.get_running_loop(), None)
+        for service in list(self._services):
+            service.s3_client = None
+        self._services.clear()
+        self._buckets.clear()
+        if state is not None:
+            for context in state.contexts.values():
+                await context.__aexit__(None, None, None)
+
+
+# Клиенты живут весь процесс; закрывать при остановке приложения
+s3_client_pool = S3ClientPool()
+
+
 class S3Service:
-    def __init__(self, bucket_name: str):
+    """Long-lived access to one bucket.
+
+    By default the aioboto3 client comes from s3_client_pool and is shared
+    with every other service on the same endpoint and event loop; close()
+    only detaches from it. A service detached by s3_client_pool.close(), or
+    used from another event loop, attaches again on its next call. With
+    shared=False the service opens its own client and close() tears it down.
+    """
+
+    def __init__(
+        self,
+        bucket_name: str,
+        shared: bool = True,
+        pool: S3ClientPool | None = None,
+    ):
         if not re.match(r"^[a-z0-9.-]{3,63}$", bucket_name):
             raise ValueError(f"Invalid bucket name: {bucket_name}")
         self.s3_bucket_url = f"{settings.infrastructure.s3_base_url}/{settings.infrastructure.s3_bucket_prefix}-{bucket_name}"
         self.bucket_name = f"{settings.infrastructure.s3_bucket_prefix}-{bucket_name}"
         self.s3_client = None
+        self.shared = shared
+        self._pool = pool or s3_client_pool
+        self._client_context = None
+        self._loop = None
 
     async def __aenter__(self):
-        self.s3_client = (
-            await aioboto3.Session()
-            .client(
-                "s3",
-                endpoint_url=settings.infrastructure.s3_base_url,
-                aws_access_key_id=settings.infrastructure.s3_access_key,
-                aws_secret_access_key=settings.infrastructure.s3_secret_key,
+        await self.connect()
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
+
+    async def connect(self) -> "S3Service":
+        """Attaches the client and makes sure the bucket exists."""
+        endpoint_url = settings.infrastructure.s3_base_url
+        loop = asyncio.get_running_loop()
+        if self.s3_client is None or self._loop not in (None, loop):
+            args = (
+                endpoint_url,
+                settings.infrastructure.s3_access_key,
+                settings.infrastructure.s3_secret_key,
             )
-            .__aenter__()
+            if self.shared:
+                self.s3_client = await self._pool.get(*args)
+                self._pool.attach(self)
+            else:
+                # клиент другого цикла закрыть отсюда нельзя, просто отпускаем
+                self._client_context = self._pool._create(*args)
+                self.s3_client = await self._client_context.__aenter__()
+            self._loop = loop
+        await self._pool.ensure_bucket(
+            endpoint_url, self.bucket_name, self._ensure_bucket_exists
         )
-        await self._ensure_bucket_exists()
         return self
 
-    async def __aexit__(self, exc_type, exc_value, traceback):
-        if self.s3_client:
-            await self.s3_client.__aexit__(exc_type, exc_value, traceback)
+    async def close(self):
+        if self._client_context is not None:
+            await self._client_context.__aexit__(None, None, None)
+            self._client_context = None
+        self.s3_client = None
+        self._loop = None
+
+    async def _client(self):
+        """The attached client, attaching again when it went stale."""
+        if self.s3_client is None or self._loop not in (
+            None,
+            asyncio.get_running_loop(),
+        ):
+            await self.connect()
+        return self.s3_client
 
     async def _ensure_bucket_exists(self):
         try:
@@ -55,7 +193,8 @@ class S3Service:
 
     async def upload_file(self, file: UploadFile, file_key: str) -> str:
         try:
-            await self.s3_client.upload_fileobj(
+            client = await self._client()
+            await client.upload_fileobj(
                 file.file,
                 self.bucket_name,
                 file_key,
@@ -65,17 +204,14 @@ class S3Service:
         except ClientError as e:
             logger.exception("Failed to upload file to S3.")
             raise Exception(f"Uploading file error: {e}")
-        finally:
-            await self.__aexit__(None, None, None)
 
     async def delete_file(self, file_key: str):
         try:
-            await self.s3_client.delete_object(Bucket=self.bucket_name, Key=file_key)
+            client = await self._client()
+            await client.delete_object(Bucket=self.bucket_name, Key=file_key)
         except ClientError as e:
             logger.exception("Failed to delete file from S3.")
             raise Exception(f"Deleting file error: {e}")
-        finally:
-            await self.__aexit__(None, None, None)
 
     def get_file_url(self, file_key: str) -> str:
         return f"{self.s3_bucket_url}/{file_key}"
@@ -84,7 +220,8 @@ class S3Service:
         self, file_key: str, file_bytes: bytes, content_type: str = None
     ) -> str:
         try:
-            await self.s3_client.put_object(
+            client = await self._client()
+            await client.put_object(
                 Bucket=self.bucket_name,
                 Key=file_key,
                 Body=file_bytes,
@@ -96,42 +233,40 @@ class S3Service:
         except ClientError as e:
             logger.exception("Failed to upload bytes to S3.")
             raise Exception(f"Uploading bytes error: {e}")
-        finally:
-            await self.__aexit__(None, None, None)
 
     async def list_files(self, prefix: str = "") -> list[str]:
         try:
-            response = await self.s3_client.list_objects_v2(
+            client = await self._client()
+            response = await client.list_objects_v2(
                 Bucket=self.bucket_name, Prefix=prefix
             )
             return [item["Key"] for item in response.get("Contents", [])]
         except ClientError as e:
             logger.exception("Failed to list files in S3 bucket.")
             raise Exception(f"Listing files error: {e}")
-        finally:
-            await self.__aexit__(None, None, None)
 
     async def get_file_bytes(self, file_key: str) -> bytes:
         try:
-            response = await self.s3_client.get_object(
-                Bucket=self.bucket_name, Key=file_key
-            )
+            client = await self._client()
+            response = await client.get_object(Bucket=self.bucket_name, Key=file_key)
             return await response["Body"].read()
         except ClientError as e:
             logger.exception(f"Failed to get file bytes from S3 for key {file_key}.")
             raise Exception(f"Error getting file bytes: {e}")
-        finally:
-            await self.__aexit__(None, None, None)
 
 
 async def get_s3_service(bucket_name: str) -> S3Service:
-    async with S3Service(bucket_name) as service:
-        return service
+    return await S3Service(bucket_name).__aenter__()
 
 
 def s3_service_dependency(bucket_name: str):
+    service = None
+
     async def dependency() -> S3Service:
-        async with S3Service(bucket_name) as service:
-            return service
+        # Один сервис на bucket на всё время жизни приложения
+        nonlocal service
+        if service is None:
+            service = await S3Service(bucket_name).__aenter__()
+        return service
 
     return dependency
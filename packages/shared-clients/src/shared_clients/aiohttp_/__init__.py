@@ -1,7 +1,22 @@
 __all__ = (
     "AiohttpSession",
     "AiohttpAPI",
+    "BACKGROUND",
+    "DiskCacheBackend",
+    "INTERACTIVE",
+    "RateLimiter",
+    "RateLimitSlot",
+    "RedisCacheBackend",
+    "ResponseCache",
+    "SessionRegistry",
+    "SingleFlight",
+    "get_shared_session",
+    "session_registry",
 )
 
 from .api import AiohttpAPI
+from .cache import DiskCacheBackend, RedisCacheBackend, ResponseCache
+from .limiter import BACKGROUND, INTERACTIVE, RateLimiter, RateLimitSlot
+from .registry import SessionRegistry, get_shared_session, session_registry
 from .session import AiohttpSession
+from .singleflight import SingleFlight
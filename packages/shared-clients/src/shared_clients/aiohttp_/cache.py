@@ -0,0 +1,255 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import os
+import time
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable, Mapping
+from pathlib import Path
+from typing import Any, Protocol
+from urllib.parse import urlparse
+
+from aiohttp import ClientSession
+from msgspec import Struct, msgpack
+
+from shared_clients.aiohttp_.singleflight import SingleFlight, freeze
+
+
+class CachedResponse(Struct, array_like=True, gc=False):
+    body: bytes
+    expires_at: float
+    etag: str | None = None
+    last_modified: str | None = None
+
+
+class CacheBackend(Protocol):
+    """Second cache tier shared between processes (Redis, disk, ...)."""
+
+    async def get(self, key: str) -> bytes | None: ...
+
+    async def set(self, key: str, value: bytes, ttl: int) -> None: ...
+
+
+class RedisCacheBackend:
+    """Stores entries in Redis through a redis.asyncio client (AsyncRedisDB.r)."""
+
+    __slots__ = ("_redis", "_prefix")
+
+    def __init__(self, redis: Any, prefix: str = "http_cache:") -> None:
+        self._redis = redis
+        self._prefix = prefix
+
+    async def get(self, key: str) -> bytes | None:
+        return await self._redis.get(self._prefix + key)
+
+    async def set(self, key: str, value: bytes, ttl: int) -> None:
+        await self._redis.set(self._prefix + key, value, ex=max(ttl, 1))
+
+
+class DiskCacheBackend:
+    """Stores entries as files under directory, pruned to max_bytes."""
+
+    __slots__ = ("_directory", "_max_bytes")
+
+    def __init__(
+        self, directory: str | os.PathLike, max_bytes: int = 256 << 20
+    ) -> None:
+        self._directory = Path(directory)
+        self._max_bytes = max_bytes
+        self._directory.mkdir(parents=True, exist_ok=True)
+
+    def _path(self, key: str) -> Path:
+        return self._directory / key
+
+    async def get(self, key: str) -> bytes | None:
+        return await asyncio.to_thread(self._read, self._path(key))
+
+    async def set(self, key: str, value: bytes, ttl: int) -> None:
+        await asyncio.to_thread(self._write, self._path(key), value)
+
+    @staticmethod
+    def _read(path: Path) -> bytes | None:
+        try:
+            return path.read_bytes()
+        except FileNotFoundError:
+            return None
+
+    def _write(self, path: Path, value: bytes) -> None:
+        tmp = path.with_suffix(".tmp")
+        tmp.write_bytes(value)
+        os.replace(tmp, path)
+        self._prune()
+
+    def _prune(self) -> None:
+        files = [(p, p.stat()) for p in self._directory.iterdir() if p.suffix != ".tmp"]
+        total = sum(st.st_size for _, st in files)
+        for path, st in sorted(files, key=lambda f: f[1].st_mtime):
+            if total <= self._max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= st.st_size
+
+
+class ResponseCache:
+    """Read-through cache for GET responses of read-only APIs.
+
+    Bodies are kept in an in-process LRU bounded by max_entries and
+    max_bytes, and, with a backend, in a shared tier that survives restarts.
+    Freshness comes from ttls, a mapping of URL path fragments such as
+    "/coins/list" to seconds (longest match wins, ttl otherwise). Once an
+    entry is stale it is revalidated with If-None-Match / If-Modified-Since
+    when the server sent an ETag or Last-Modified, so an unchanged resource
+    costs a 304 instead of a full download; the shared tier keeps entries
+    keep_stale seconds past expiry for that purpose. Concurrent misses for the
+    same key share one request.
+    """
+
+    def __init__(
+        self,
+        ttl: float = 60.0,
+        ttls: Mapping[str, float] | None = None,
+        max_entries: int = 1024,
+        max_bytes: int = 64 << 20,
+        backend: CacheBackend | None = None,
+        keep_stale: float = 3600.0,
+    ) -> None:
+        self.ttl = ttl
+        self.ttls = dict(ttls or {})
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.backend = backend
+        self.keep_stale = keep_stale
+        self._entries: OrderedDict[str, CachedResponse] = OrderedDict()
+        self._size = 0
+        self._flights = SingleFlight()
+        self.hits = 0
+        self.misses = 0
+        self.revalidated = 0
+
+    def ttl_for(self, url: str) -> float:
+        path = urlparse(url).path
+        best, best_len = self.ttl, -1
+        for fragment, ttl in self.ttls.items():
+            if fragment in path and len(fragment) > best_len:
+                best, best_len = ttl, len(fragment)
+        return best
+
+    @staticmethod
+    def key(url: str, params: Mapping[str, Any] | None = None) -> str:
+        raw = repr((url, freeze(params or {})))
+        return hashlib.sha256(raw.encode()).hexdigest()
+
+    def peek(self, url: str, params: Mapping[str, Any] | None = None) -> bytes | None:
+        """The fresh in-process body for url, without any I/O."""
+        entry = self._entries.get(self.key(url, params))
+        if entry is not None and entry.expires_at > time.time():
+            self.hits += 1
+            return entry.body
+        return None
+
+    async def get(
+        self,
+        session: ClientSession,
+        url: str,
+        params: Mapping[str, Any] | None = None,
+        headers: Mapping[str, str] | None = None,
+        ttl: float | None = None,
+        acquire: Callable[[], Awaitable[Any]] | None = None,
+    ) -> bytes:
+        """Return the body of GET url, from cache when it is still fresh.
+
+        acquire is awaited only right before a request goes out, so hits in
+        either tier and callers joining an in-flight load spend no rate-limit
+        token; if it returns a RateLimitSlot, the response status is fed back.
+        Non-2xx responses raise aiohttp.ClientResponseError and are not cached.
+        """
+        key = self.key(url, params)
+        entry = self._entries.get(key)
+        if entry is not None and entry.expires_at > time.time():
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry.body
+        return await self._flights.do(
+            key,
+            lambda: self._load(session, key, url, params, headers, ttl, acquire),
+        )
+
+    async def _load(
+        self, session, key, url, params, headers, ttl, acquire=None
+    ) -> bytes:
+        entry = self._entries.get(key)
+        if entry is None and self.backend is not None:
+            raw = await self.backend.get(key)
+            if raw:
+                entry = msgpack.decode(raw, type=CachedResponse)
+                if entry.expires_at > time.time():
+                    self._remember(key, entry)
+                    self.hits += 1
+                    return entry.body
+
+        self.misses += 1
+        request_headers = dict(headers or {})
+        if entry is not None:
+            if entry.etag:
+                request_headers["If-None-Match"] = entry.etag
+            if entry.last_modified:
+                request_headers["If-Modified-Since"] = entry.last_modified
+
+        ttl = self.ttl_for(url) if ttl is None else ttl
+        slot = await acquire() if acquire is not None else None
+        async with session.get(url, params=params, headers=request_headers) as resp:
+            if slot is not None:
+                slot.feedback(resp.status, resp.headers)
+            if resp.status == 304 and entry is not None:
+                self.revalidated += 1
+                body = entry.body
+            else:
+                resp.raise_for_status()
+                body = await resp.read()
+            fresh = CachedResponse(
+                body=body,
+                expires_at=time.time() + ttl,
+                etag=resp.headers.get("ETag") or (entry.etag if entry else None),
+                last_modified=resp.headers.get("Last-Modified")
+                or (entry.last_modified if entry else None),
+            )
+        self._remember(key, fresh)
+        if self.backend is not None:
+            await self.backend.set(
+                key, msgpack.encode(fresh), int(ttl + self.keep_stale)
+            )
+        return body
+
+    def _remember(self, key: str, entry: CachedResponse) -> None:
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self._size -= len(old.body)
+        if len(entry.body) > self.max_bytes:
+            return
+        self._entries[key] = entry
+        self._size += len(entry.body)
+        while len(self._entries) > self.max_entries or self._size > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self._size -= len(evicted.body)
+
+    def invalidate(
+        self, url: str | None = None, params: Mapping[str, Any] | None = None
+    ) -> None:
+        """Drop one URL from the in-process tier, or everything."""
+        if url is None:
+            self._entries.clear()
+            self._size = 0
+            return
+        entry = self._entries.pop(self.key(url, params), None)
+        if entry is not None:
+            self._size -= len(entry.body)
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "revalidated": self.revalidated,
+            "entries": len(self._entries),
+            "bytes": self._size,
+        }
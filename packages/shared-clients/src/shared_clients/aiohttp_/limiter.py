@@ -0,0 +1,357 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from collections import OrderedDict, deque
+from collections.abc import Mapping
+from email.utils import parsedate_to_datetime
+from typing import Any
+
+INTERACTIVE = 0
+BACKGROUND = 1
+
+_RETRY_STATUSES = frozenset({429, 503})
+_REMAINING_HEADERS = ("X-RateLimit-Remaining", "RateLimit-Remaining")
+_RESET_HEADERS = ("X-RateLimit-Reset", "RateLimit-Reset")
+
+
+def _header(headers: Mapping[str, str] | None, names: tuple[str, ...]) -> str | None:
+    if not headers:
+        return None
+    for name in names:
+        value = headers.get(name)
+        if value is not None:
+            return value
+    return None
+
+
+def parse_retry_after(value: str | None) -> float | None:
+    """Seconds to wait from a Retry-After value (delta-seconds or HTTP date)."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def _parse_reset(value: str | None) -> float | None:
+    # Reset is either seconds until the window resets or a unix timestamp.
+    if not value:
+        return None
+    try:
+        reset = float(value)
+    except ValueError:
+        return None
+    if reset > 1e9:
+        reset -= time.time()
+    return max(0.0, reset)
+
+
+class TokenBucket:
+    """Token bucket whose refill rate adapts to server feedback.
+
+    rate is the current refill rate in tokens per second; it is halved on
+    throttling responses, creeps back up on successes and never exceeds
+    max_rate. A bucket can also be blocked outright until a deadline
+    (Retry-After, exhausted quota).
+    """
+
+    __slots__ = ("max_rate", "rate", "capacity", "tokens", "updated", "blocked_until")
+
+    def __init__(self, rate: float, capacity: float | None = None) -> None:
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.max_rate = self.rate = float(rate)
+        self.capacity = float(capacity or max(1.0, rate))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self, now: float) -> float:
+        """Seconds until a token can be taken (0 if one is available now)."""
+        self._refill(now)
+        wait = max(0.0, self.blocked_until - now)
+        if self.tokens < 1:
+            wait = max(wait, (1 - self.tokens) / self.rate)
+        return wait
+
+    def consume(self, now: float) -> None:
+        self._refill(now)
+        self.tokens -= 1
+
+    def block(self, seconds: float, now: float) -> None:
+        self.blocked_until = max(self.blocked_until, now + seconds)
+        self.tokens = min(self.tokens, 0.0)
+
+    def throttle(self) -> None:
+        self.rate = max(self.max_rate / 16, self.rate / 2)
+
+    def recover(self) -> None:
+        self.rate = min(self.max_rate, self.rate + self.max_rate / 10)
+
+    def pace(self, remaining: int, reset_after: float) -> None:
+        """Spread the remaining server quota over the rest of the window."""
+        self.tokens = min(self.tokens, float(remaining))
+        if reset_after > 0:
+            self.rate = min(self.max_rate, max(remaining / reset_after, 1e-3))
+
+
+class _Waiter:
+    __slots__ = ("buckets", "future")
+
+    def __init__(
+        self, buckets: tuple[TokenBucket, ...], future: asyncio.Future
+    ) -> None:
+        self.buckets = buckets
+        self.future = future
+
+
+class RateLimitSlot:
+    """One request's claim on a RateLimiter: acquire() before, feedback() after."""
+
+    __slots__ = ("_limiter", "_buckets", "priority", "agent")
+
+    def __init__(
+        self,
+        limiter: RateLimiter,
+        buckets: tuple[TokenBucket, ...],
+        priority: int,
+        agent: str,
+    ) -> None:
+        self._limiter = limiter
+        self._buckets = buckets
+        self.priority = priority
+        self.agent = agent
+
+    async def acquire(self) -> None:
+        await self._limiter._acquire(self._buckets, self.priority, self.agent)
+
+    def feedback(self, status: int, headers: Mapping[str, str] | None = None) -> None:
+        self._limiter._feedback(self._buckets, status, headers)
+
+    async def __aenter__(self) -> RateLimitSlot:
+        await self.acquire()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb) -> None:
+        pass
+
+
+class RateLimiter:
+    """Adaptive token-bucket limiter with priority lanes and fair queuing.
+
+    Each request takes a token from its endpoint bucket and, if key_rate is
+    set, from a bucket shared by everything sent with the same API key.
+    Endpoints are matched by prefix against limits, whose keys look like
+    "search-tweets" or "GET /latest/dex/pairs"; unmatched requests share a
+    default bucket of rate/burst. Buckets are kept per API key.
+
+    Waiting requests are served strictly by priority (INTERACTIVE before
+    BACKGROUND) and round-robin across agents within a lane, so one busy
+    crawler cannot starve the others. Requests whose buckets are ready are not
+    held up behind requests for a throttled endpoint.
+
+    Responses are fed back through RateLimitSlot.feedback(): Retry-After on
+    429/503 blocks the buckets, rate-limit headers pace them to the remaining
+    quota, and throttling without headers halves the rate until successes
+    bring it back.
+    """
+
+    def __init__(
+        self,
+        rate: float = 10.0,
+        burst: int | None = None,
+        limits: Mapping[str, float | tuple[float, int]] | None = None,
+        key_rate: float | None = None,
+        key_burst: int | None = None,
+        lanes: int = 2,
+    ) -> None:
+        self.rate = rate
+        self.burst = burst
+        self.key_rate = key_rate
+        self.key_burst = key_burst
+        self._limits: dict[str, tuple[str, str, float, int | None]] = {}
+        for endpoint, limit in (limits or {}).items():
+            self.set_limit(endpoint, *(limit if isinstance(limit, tuple) else (limit,)))
+        self._buckets: dict[tuple[str | None, str | None], TokenBucket] = {}
+        self._lanes: list[OrderedDict[str, deque[_Waiter]]] = [
+            OrderedDict() for _ in range(lanes)
+        ]
+        self._wakeup: asyncio.Event | None = None
+        self._dispatcher: asyncio.Task | None = None
+
+    def set_limit(self, endpoint: str, rate: float, burst: int | None = None) -> None:
+        """Configure rate (requests per second) and burst for an endpoint prefix."""
+        method, _, path = endpoint.rpartition(" ")
+        self._limits[endpoint] = (method.upper(), path.lstrip("/"), rate, burst)
+
+    def set_rate(self, rate: float, burst: int | None = None) -> None:
+        """Change the default rate and burst, also for buckets already in use.
+
+        Tokens left in existing buckets and queued requests are kept.
+        """
+        self.rate, self.burst = rate, burst
+        for (_, endpoint), bucket in self._buckets.items():
+            if endpoint == "*":
+                bucket.max_rate = bucket.rate = float(rate)
+                bucket.capacity = float(burst or max(1.0, rate))
+                bucket.tokens = min(bucket.tokens, bucket.capacity)
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def _match(self, method: str, endpoint: str) -> str:
+        path = endpoint.lstrip("/")
+        best, best_len = "*", -1
+        for name, (limit_method, prefix, _, _) in self._limits.items():
+            if limit_method and limit_method != method.upper():
+                continue
+            if path.startswith(prefix) and len(prefix) > best_len:
+                best, best_len = name, len(prefix)
+        return best
+
+    def _bucket(self, api_key: str | None, endpoint: str | None) -> TokenBucket:
+        bucket = self._buckets.get((api_key, endpoint))
+        if bucket is None:
+            if endpoint is None:
+                rate, burst = self.key_rate, self.key_burst
+            elif endpoint in self._limits:
+                _, _, rate, burst = self._limits[endpoint]
+            else:
+                rate, burst = self.rate, self.burst
+            bucket = self._buckets[(api_key, endpoint)] = TokenBucket(rate, burst)
+        return bucket
+
+    def slot(
+        self,
+        endpoint: str,
+        method: str = "GET",
+        api_key: str | None = None,
+        priority: int = INTERACTIVE,
+        agent: str = "default",
+    ) -> RateLimitSlot:
+        """A slot for one request to endpoint (path relative to the API root)."""
+        buckets = [self._bucket(api_key, self._match(method, endpoint))]
+        if self.key_rate is not None:
+            buckets.append(self._bucket(api_key, None))
+        priority = min(max(priority, 0), len(self._lanes) - 1)
+        return RateLimitSlot(self, tuple(buckets), priority, agent)
+
+    async def acquire(
+        self,
+        endpoint: str,
+        method: str = "GET",
+        api_key: str | None = None,
+        priority: int = INTERACTIVE,
+        agent: str = "default",
+    ) -> RateLimitSlot:
+        """Wait for a token and return the slot to report the response to."""
+        slot = self.slot(endpoint, method, api_key, priority, agent)
+        await slot.acquire()
+        return slot
+
+    def pending(self) -> int:
+        return sum(len(q) for lane in self._lanes for q in lane.values())
+
+    async def _acquire(
+        self, buckets: tuple[TokenBucket, ...], priority: int, agent: str
+    ) -> None:
+        now = time.monotonic()
+        if not self.pending() and all(b.delay(now) == 0 for b in buckets):
+            for bucket in buckets:
+                bucket.consume(now)
+            return
+        loop = asyncio.get_running_loop()
+        waiter = _Waiter(buckets, loop.create_future())
+        self._lanes[priority].setdefault(agent, deque()).append(waiter)
+        self._ensure_dispatcher(loop)
+        await waiter.future
+
+    def _ensure_dispatcher(self, loop: asyncio.AbstractEventLoop) -> None:
+        if (
+            self._dispatcher is None
+            or self._dispatcher.done()
+            or self._dispatcher.get_loop() is not loop
+        ):
+            self._wakeup = asyncio.Event()
+            self._dispatcher = loop.create_task(self._dispatch())
+        self._wakeup.set()
+
+    async def _dispatch(self) -> None:
+        while self.pending():
+            self._wakeup.clear()
+            delay = self._grant_next(time.monotonic())
+            if delay is None:
+                continue
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), delay)
+            except asyncio.TimeoutError:
+                pass
+
+    def _grant_next(self, now: float) -> float | None:
+        """Grant the first ready waiter; otherwise return the shortest wait."""
+        shortest = None
+        for lane in self._lanes:
+            for agent in list(lane):
+                queue = lane[agent]
+                while queue and queue[0].future.done():
+                    queue.popleft()  # cancelled while waiting
+                if not queue:
+                    del lane[agent]
+                    continue
+                waiter = queue[0]
+                delay = max(b.delay(now) for b in waiter.buckets)
+                if delay == 0:
+                    queue.popleft()
+                    for bucket in waiter.buckets:
+                        bucket.consume(now)
+                    waiter.future.set_result(None)
+                    if queue:
+                        lane.move_to_end(agent)
+                    else:
+                        del lane[agent]
+                    return None
+                shortest = delay if shortest is None else min(shortest, delay)
+        return shortest if shortest is not None else 0.0
+
+    def _feedback(
+        self,
+        buckets: tuple[TokenBucket, ...],
+        status: int,
+        headers: Mapping[str, str] | None,
+    ) -> None:
+        now = time.monotonic()
+        retry_after = parse_retry_after(_header(headers, ("Retry-After",)))
+        remaining = _header(headers, _REMAINING_HEADERS)
+        reset_after = _parse_reset(_header(headers, _RESET_HEADERS))
+        throttled = status in _RETRY_STATUSES
+        for bucket in buckets:
+            if throttled:
+                bucket.throttle()
+                bucket.block(
+                    retry_after if retry_after is not None else 1 / bucket.rate, now
+                )
+            if (
+                remaining is not None
+                and remaining.isdigit()
+                and reset_after is not None
+            ):
+                if int(remaining) == 0:
+                    bucket.block(reset_after, now)
+                else:
+                    bucket.pace(int(remaining), reset_after)
+            elif not throttled and status < 400:
+                bucket.recover()
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def stats(self) -> dict[str, Any]:
+        return {"pending": self.pending(), "buckets": len(self._buckets)}
@@ -0,0 +1,133 @@
+from __future__ import annotations
+
+import asyncio
+import inspect
+import weakref
+from collections.abc import Awaitable, Callable
+from functools import partial
+from typing import Any
+
+from aiohttp import ClientSession, ClientTimeout, TCPConnector
+
+SessionHook = Callable[[str, ClientSession], Awaitable[None] | None]
+
+_CONNECTOR_OPTIONS = frozenset(
+    {
+        "limit",
+        "limit_per_host",
+        "ttl_dns_cache",
+        "use_dns_cache",
+        "keepalive_timeout",
+        "force_close",
+        "ssl",
+        "family",
+        "local_addr",
+    }
+)
+
+
+class SessionRegistry:
+    """Long-lived aiohttp sessions shared by every client in the process.
+
+    Sessions are created lazily, one per (event loop, name), and reused until
+    close() is called, so requests keep their TCP/TLS connections alive and
+    DNS answers are cached by the connector. Names let clients with different
+    needs (per-host limits, timeouts, default headers) use separate pools; see
+    configure().
+    """
+
+    __slots__ = ("_defaults", "_options", "_sessions", "_on_create", "_on_close")
+
+    def __init__(
+        self,
+        *,
+        limit: int = 100,
+        limit_per_host: int = 20,
+        ttl_dns_cache: int = 300,
+        keepalive_timeout: float = 30.0,
+        timeout: ClientTimeout | None = None,
+    ) -> None:
+        self._defaults: dict[str, Any] = {
+            "limit": limit,
+            "limit_per_host": limit_per_host,
+            "ttl_dns_cache": ttl_dns_cache,
+            "use_dns_cache": True,
+            "keepalive_timeout": keepalive_timeout,
+            "timeout": timeout or ClientTimeout(total=60),
+        }
+        self._options: dict[str, dict[str, Any]] = {}
+        self._sessions: weakref.WeakKeyDictionary[
+            asyncio.AbstractEventLoop, dict[str, ClientSession]
+        ] = weakref.WeakKeyDictionary()
+        self._on_create: list[SessionHook] = []
+        self._on_close: list[SessionHook] = []
+
+    def configure(self, name: str, **options: Any) -> None:
+        """Override connector or session options for the named session.
+
+        Connector options (limit, limit_per_host, ttl_dns_cache, ...) go to the
+        TCPConnector, everything else (timeout, headers, ...) to ClientSession.
+        Applies to sessions created after the call.
+        """
+        self._options.setdefault(name, {}).update(options)
+
+    def get_session(self, name: str = "default") -> ClientSession:
+        """Return the open session for name on the running loop, creating it."""
+        loop = asyncio.get_running_loop()
+        sessions = self._sessions.get(loop)
+        if sessions is None:
+            sessions = self._sessions[loop] = {}
+        session = sessions.get(name)
+        if session is None or session.closed:
+            session = sessions[name] = self._create_session(name)
+            for hook in self._on_create:
+                hook(name, session)
+        return session
+
+    def provider(self, name: str = "default") -> Callable[[], ClientSession]:
+        """A session_provider for AiohttpSession that borrows the named session."""
+        return partial(self.get_session, name)
+
+    def on_create(self, hook: SessionHook) -> SessionHook:
+        """Register a synchronous hook called with (name, session) on creation."""
+        self._on_create.append(hook)
+        return hook
+
+    def on_close(self, hook: SessionHook) -> SessionHook:
+        """Register a hook (sync or async) called with (name, session) before close."""
+        self._on_close.append(hook)
+        return hook
+
+    async def close(self, name: str | None = None) -> None:
+        """Close the running loop's sessions: all of them, or only name."""
+        sessions = self._sessions.get(asyncio.get_running_loop(), {})
+        names = list(sessions) if name is None else [name]
+        for session_name in names:
+            session = sessions.pop(session_name, None)
+            if session is None or session.closed:
+                continue
+            for hook in self._on_close:
+                result = hook(session_name, session)
+                if inspect.isawaitable(result):
+                    await result
+            await session.close()
+
+    def _create_session(self, name: str) -> ClientSession:
+        options = {**self._defaults, **self._options.get(name, {})}
+        connector_options = {
+            k: v for k, v in options.items() if k in _CONNECTOR_OPTIONS
+        }
+        session_options = {
+            k: v for k, v in options.items() if k not in _CONNECTOR_OPTIONS
+        }
+        return ClientSession(
+            connector=TCPConnector(**connector_options), **session_options
+        )
+
+
+session_registry = SessionRegistry()
+
+
+def get_shared_session(name: str = "default") -> ClientSession:
+    """Return a long-lived session from the process-wide registry."""
+    return session_registry.get_session(name)
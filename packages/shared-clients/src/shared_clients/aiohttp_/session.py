@@ -6,8 +6,12 @@ from types import TracebackType
 from typing import Any, Callable, ParamSpec, TypeVar, Generic
 from urllib.parse import urlparse
 
-from aiohttp import ClientResponse, ClientSession
+from aiohttp import ClientResponse, ClientResponseError, ClientSession
+from msgspec import json
 from aiohttp.client import _BaseRequestContextManager, _RequestOptions
+from shared_clients.aiohttp_.limiter import INTERACTIVE, RateLimiter, RateLimitSlot
+from shared_clients.aiohttp_.registry import session_registry
+from shared_clients.aiohttp_.singleflight import SingleFlight, freeze
 from shared_clients.exceptions import APIError
 
 P = ParamSpec("P")
@@ -16,19 +20,38 @@ R = TypeVar("R", bound=ClientResponse)
 
 def _factory(method: str) -> Callable[..., ResponseWrapper]:
     def wrapper(self: AiohttpSession, url: str, **kwargs: Any) -> ResponseWrapper:
-        return ResponseWrapper(self.request(method.upper(), url, **kwargs))  # type: ignore
+        return self._wrap(method.upper(), url, **kwargs)
+
     return wrapper
 
 
 class ResponseWrapper(Generic[R]):
-    __slots__ = "_coro", "_resp", "_context"  # Добавляем _context
+    __slots__ = "_coro", "_resp", "_context", "_slot"  # Добавляем _context
 
-    def __init__(self, context: _BaseRequestContextManager[R]) -> None:
+    def __init__(
+        self,
+        context: _BaseRequestContextManager[R],
+        slot: RateLimitSlot | None = None,
+    ) -> None:
         self._coro = context.__aenter__
         self._context = context
+        self._slot = slot
 
     async def __aenter__(self) -> R:
-        self._resp: R = await self._coro()
+        if self._slot is None:
+            self._resp: R = await self._coro()
+        else:
+            try:
+                await self._slot.acquire()
+            except BaseException:
+                self._context.close()
+                raise
+            try:
+                self._resp = await self._coro()
+            except ClientResponseError as e:
+                self._slot.feedback(e.status, e.headers)
+                raise
+            self._slot.feedback(self._resp.status, self._resp.headers)
         if not self._resp.ok:
             raise APIError(self._resp.status, repr(await self._resp.read()))
         return self._resp
@@ -47,20 +70,57 @@ def _create_session() -> ClientSession:
 
 
 class AiohttpSession:
+    """Thin request helper around an aiohttp ClientSession.
+
+    By default it owns its session and closes it on __aexit__. With shared set
+    to a session name it borrows a long-lived session from session_registry
+    instead, and entering or leaving the context never closes it.
+
+    With a limiter, every get/post/... first waits for a RateLimiter slot
+    (bucketed by endpoint and _limiter_key) and reports the response back so
+    the limiter can adapt. priority and agent set the defaults for the
+    session's requests and can be overridden per call with the same keywords.
+
+    fetch() reads and decodes the body in one go; concurrent identical GETs
+    (same URL, params and other arguments, same target type) share one
+    request and one decoded result through single_flight. Pass the same
+    SingleFlight to several sessions to coalesce across them.
+    """
+
     __slots__ = (
         "_session_provider",
         "_base_url",
         "_session",
+        "_owns_session",
+        "_limiter",
+        "_limiter_key",
+        "_priority",
+        "_agent",
+        "_single_flight",
     )
 
     def __init__(
         self,
         session_provider: Callable[[], ClientSession] | None = None,
         base_url: str = "",
+        shared: str | None = None,
+        limiter: RateLimiter | None = None,
+        priority: int = INTERACTIVE,
+        agent: str = "default",
+        single_flight: SingleFlight | None = None,
     ) -> None:
-        self._session_provider = session_provider or _create_session
         self._base_url = base_url
-        self._create_session()
+        self._single_flight = single_flight or SingleFlight()
+        self._limiter = limiter
+        self._limiter_key: str | None = None
+        self._priority = priority
+        self._agent = agent
+        self._owns_session = shared is None
+        if self._owns_session:
+            self._session_provider = session_provider or _create_session
+            self._create_session()
+        else:
+            self._session_provider = session_registry.provider(shared)
 
     def request(
         self,
@@ -70,13 +130,55 @@ class AiohttpSession:
     ) -> _BaseRequestContextManager[ClientResponse]:
         if not urlparse(url).netloc:
             url = self._base_url + url
-        return self._session.request(method, url, **self._handle_kwargs(**kwargs))
+        session = self._session if self._owns_session else self._session_provider()
+        return session.request(method, url, **self._handle_kwargs(**kwargs))
 
     def _handle_kwargs(self, **kwargs: Any) -> _RequestOptions:
         return kwargs
 
+    def _wrap(
+        self,
+        method: str,
+        url: str,
+        priority: int | None = None,
+        agent: str | None = None,
+        **kwargs: Any,
+    ) -> ResponseWrapper[ClientResponse]:
+        context = self.request(method, url, **kwargs)
+        if self._limiter is None:
+            return ResponseWrapper(context)
+        slot = self._limiter.slot(
+            urlparse(url).path,
+            method,
+            self._limiter_key,
+            self._priority if priority is None else priority,
+            agent or self._agent,
+        )
+        return ResponseWrapper(context, slot)
+
     def get(self, url: str, **kwargs: Any) -> ResponseWrapper[ClientResponse]:
-        return ResponseWrapper(self.request("GET", url, **kwargs))
+        return self._wrap("GET", url, **kwargs)
+
+    @property
+    def single_flight(self) -> SingleFlight:
+        return self._single_flight
+
+    async def fetch(self, method: str, url: str, type: Any = Any, **kwargs: Any) -> Any:
+        """Send a request and return the JSON body decoded into type."""
+        method = method.upper()
+        if method != "GET":
+            return await self._fetch(method, url, type, **kwargs)
+        try:
+            key = (method, self._base_url, url, type, freeze(kwargs))
+        except TypeError:  # unhashable arguments, don't coalesce
+            return await self._fetch(method, url, type, **kwargs)
+        return await self._single_flight.do(
+            key, partial(self._fetch, method, url, type, **kwargs)
+        )
+
+    async def _fetch(self, method: str, url: str, type: Any, **kwargs: Any) -> Any:
+        async with self._wrap(method, url, **kwargs) as resp:
+            return json.decode(await resp.read(), type=type)
 
     post = _factory("post")
     delete = _factory("delete")
@@ -88,6 +190,8 @@ class AiohttpSession:
     connect = _factory("connect")
 
     async def __aenter__(self):
+        if not self._owns_session:
+            return self
         if not hasattr(self, "_session") or self._session.closed:
             self._create_session()
         await self._session.__aenter__()
@@ -99,7 +203,8 @@ class AiohttpSession:
         exc_val: BaseException | None,
         exc_tb: TracebackType | None,
     ) -> None:
-        await self._session.__aexit__(exc_type, exc_val, exc_tb)
+        if self._owns_session:
+            await self._session.__aexit__(exc_type, exc_val, exc_tb)
 
     def _create_session(self) -> None:
         self._session = self._session_provider()
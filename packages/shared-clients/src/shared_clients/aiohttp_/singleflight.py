@@ -0,0 +1,66 @@
+from __future__ import annotations
+
+import asyncio
+import weakref
+from collections.abc import Awaitable, Callable, Hashable
+from typing import Any, TypeVar
+
+T = TypeVar("T")
+
+
+def freeze(value: Any) -> Hashable:
+    """A hashable, order-independent form of request arguments."""
+    if hasattr(value, "items"):
+        return tuple(sorted((str(k), freeze(v)) for k, v in value.items()))
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(v) for v in value)
+    if isinstance(value, (set, frozenset)):
+        return tuple(sorted(freeze(v) for v in value))
+    hash(value)
+    return value
+
+
+class SingleFlight:
+    """Collapses concurrent calls with the same key into one execution.
+
+    The first caller for a key runs the coroutine; callers arriving while it
+    is in flight await the same result (or exception). Nothing is cached once
+    the call completes. Cancelling one waiter does not cancel the shared call.
+    Counters report how many calls were collapsed.
+    """
+
+    __slots__ = ("_calls", "calls", "executed", "collapsed")
+
+    def __init__(self) -> None:
+        self._calls: weakref.WeakKeyDictionary[
+            asyncio.AbstractEventLoop, dict[Hashable, asyncio.Future]
+        ] = weakref.WeakKeyDictionary()
+        self.calls = 0
+        self.executed = 0
+        self.collapsed = 0
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        loop = asyncio.get_running_loop()
+        calls = self._calls.get(loop)
+        if calls is None:
+            calls = self._calls[loop] = {}
+        self.calls += 1
+        future = calls.get(key)
+        if future is None:
+            self.executed += 1
+            future = calls[key] = asyncio.ensure_future(fn())
+            future.add_done_callback(lambda _: calls.pop(key, None))
+        else:
+            self.collapsed += 1
+        return await asyncio.shield(future)
+
+    def in_flight(self) -> int:
+        return sum(len(calls) for calls in self._calls.values())
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "calls": self.calls,
+            "executed": self.executed,
+            "collapsed": self.collapsed,
+            "in_flight": self.in_flight(),
+        }
@@ -0,0 +1,268 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from collections import OrderedDict
+from collections.abc import AsyncIterable, AsyncIterator, Iterable
+from typing import Any, Generic, Protocol, TypeVar
+
+from msgspec import Struct
+
+TokenRef = str | tuple[str, str]
+
+PoolT = TypeVar("PoolT")
+PairT = TypeVar("PairT")
+ReportT = TypeVar("ReportT")
+PoolT_co = TypeVar("PoolT_co", covariant=True)
+PairT_co = TypeVar("PairT_co", covariant=True)
+ReportT_co = TypeVar("ReportT_co", covariant=True)
+
+
+class PoolSource(Protocol[PoolT_co]):
+    """dextools_wrapper.DextoolsAPIWrapper"""
+
+    async def get_pool_by_address(self, chain: str, address: str) -> PoolT_co: ...
+
+
+class PairsSource(Protocol[PairT_co]):
+    """dexscreener_wrapper.DexScreenerAPI (pairs are dexscreener_wrapper.dto.Pair)"""
+
+    async def get_token_data_by_address(
+        self, chain: str, token_address: str
+    ) -> list[PairT_co]: ...
+
+
+class ReportSource(Protocol[ReportT_co]):
+    """rugcheck_wrapper.RugCheckAPI (reports are rugcheck_wrapper.dto.TokenReport)"""
+
+    async def get_token_report(self, token_address: str) -> ReportT_co: ...
+
+
+class TokenRecord(Struct, Generic[PoolT, PairT, ReportT], kw_only=True):
+    """Typed by the sources of the pipeline that built it.
+
+    TokenEnrichmentPipeline(dextools, DexScreenerAPI(), RugCheckAPI()) yields
+    TokenRecord[Any, dto.Pair, dto.TokenReport].
+    """
+
+    chain: str
+    address: str
+    pool: PoolT | None = None
+    pairs: list[PairT] = []
+    report: ReportT | None = None
+    # source name -> error, for sources that failed for this token
+    errors: dict[str, str] = {}
+
+
+def _field(item: Any, name: str) -> Any:
+    if isinstance(item, dict):
+        return item.get(name)
+    return getattr(item, name, None)
+
+
+class _PairsBatcher:
+    """Collects concurrent DexScreener lookups into comma-joined batch calls."""
+
+    def __init__(self, source: Any, max_batch: int, delay: float) -> None:
+        self._source = source
+        self._max_batch = max_batch
+        self._delay = delay
+        self._pending: dict[str, dict[str, asyncio.Future]] = {}
+        self._timers: dict[str, asyncio.TimerHandle] = {}
+        self._fetches: set[asyncio.Task] = set()
+
+    async def get(self, chain: str, address: str) -> list[Any]:
+        loop = asyncio.get_running_loop()
+        pending = self._pending.setdefault(chain, {})
+        future = pending.get(address)
+        if future is None:
+            future = pending[address] = loop.create_future()
+            if len(pending) >= self._max_batch:
+                self._flush(chain)
+            elif chain not in self._timers:
+                self._timers[chain] = loop.call_later(self._delay, self._flush, chain)
+        return await asyncio.shield(future)
+
+    def _flush(self, chain: str) -> None:
+        timer = self._timers.pop(chain, None)
+        if timer is not None:
+            timer.cancel()
+        batch = self._pending.pop(chain, None)
+        if batch:
+            task = asyncio.ensure_future(self._fetch(chain, batch))
+            self._fetches.add(task)
+            task.add_done_callback(self._fetches.discard)
+
+    async def _fetch(self, chain: str, batch: dict[str, asyncio.Future]) -> None:
+        try:
+            pairs = await self._source.get_tokens_data_by_addresses(chain, list(batch))
+        except Exception as e:
+            for future in batch.values():
+                if not future.done():
+                    future.set_exception(e)
+            return
+        # EVM addresses come back checksummed, so match case-insensitively
+        by_token: dict[str, list[Any]] = {address.lower(): [] for address in batch}
+        for pair in pairs or ():
+            for side in ("baseToken", "quoteToken"):
+                address = _field(_field(pair, side), "address")
+                if address and address.lower() in by_token:
+                    by_token[address.lower()].append(pair)
+        for address, future in batch.items():
+            if not future.done():
+                future.set_result(by_token[address.lower()])
+
+
+class _RecentTokens:
+    """Tokens seen in the last ttl seconds, at most max_size of them."""
+
+    def __init__(self, ttl: float, max_size: int) -> None:
+        self.ttl = ttl
+        self.max_size = max_size
+        # insertion order is also age order, so expired tokens sit in front
+        self._seen: OrderedDict[tuple[str, str], float] = OrderedDict()
+
+    def add(self, token: tuple[str, str]) -> bool:
+        """Remember token; False if it was already seen recently."""
+        now = time.monotonic()
+        while self._seen:
+            seen_at = next(iter(self._seen.values()))
+            if now - seen_at < self.ttl and len(self._seen) < self.max_size:
+                break
+            self._seen.popitem(last=False)
+        if token in self._seen:
+            return False
+        self._seen[token] = now
+        return True
+
+
+async def _iterate(items: Iterable[TokenRef] | AsyncIterable[TokenRef]):
+    if hasattr(items, "__aiter__"):
+        async for item in items:
+            yield item
+    else:
+        for item in items:
+            yield item
+
+
+class TokenEnrichmentPipeline(Generic[PoolT, PairT, ReportT]):
+    """Looks tokens up in Dextools, DexScreener and RugCheck at once.
+
+    Each source is one of the SDK wrappers (any of them may be omitted) and
+    keeps its own rate limiting; the pipeline only decides what runs
+    concurrently. For every token the three lookups run in parallel and are
+    merged into a TokenRecord; a failing source is recorded in
+    TokenRecord.errors instead of failing the token. DexScreener lookups that
+    arrive within batch_delay of each other share one request of up to
+    max_batch comma-joined addresses when the source supports it.
+
+    run() consumes a (possibly endless) stream of addresses and yields records
+    in completion order, with at most concurrency tokens in flight or waiting
+    to be consumed. A token seen within dedupe_ttl seconds is skipped; the
+    memory of seen tokens holds at most dedupe_size entries (dedupe=False
+    enriches every item).
+    """
+
+    def __init__(
+        self,
+        dextools: PoolSource[PoolT] | None = None,
+        dexscreener: PairsSource[PairT] | None = None,
+        rugcheck: ReportSource[ReportT] | None = None,
+        concurrency: int = 16,
+        max_batch: int = 30,
+        batch_delay: float = 0.05,
+        dedupe: bool = True,
+        dedupe_ttl: float = 3600.0,
+        dedupe_size: int = 100_000,
+    ) -> None:
+        self.dextools = dextools
+        self.dexscreener = dexscreener
+        self.rugcheck = rugcheck
+        self.concurrency = concurrency
+        self.dedupe = dedupe
+        self.dedupe_ttl = dedupe_ttl
+        self.dedupe_size = dedupe_size
+        self._batcher = None
+        if hasattr(dexscreener, "get_tokens_data_by_addresses"):
+            self._batcher = _PairsBatcher(dexscreener, max_batch, batch_delay)
+
+    async def _pairs(self, chain: str, address: str) -> list[PairT]:
+        if self._batcher is not None:
+            return await self._batcher.get(chain, address)
+        return await self.dexscreener.get_token_data_by_address(chain, address)
+
+    async def enrich(
+        self, address: str, chain: str = "solana"
+    ) -> TokenRecord[PoolT, PairT, ReportT]:
+        calls = {}
+        if self.dextools is not None:
+            calls["dextools"] = self.dextools.get_pool_by_address(chain, address)
+        if self.dexscreener is not None:
+            calls["dexscreener"] = self._pairs(chain, address)
+        if self.rugcheck is not None:
+            calls["rugcheck"] = self.rugcheck.get_token_report(address)
+        results = await asyncio.gather(*calls.values(), return_exceptions=True)
+
+        record = TokenRecord(chain=chain, address=address)
+        for source, result in zip(calls, results, strict=True):
+            if isinstance(result, BaseException):
+                if not isinstance(result, Exception):
+                    raise result
+                record.errors[source] = repr(result)
+            elif source == "dextools":
+                record.pool = result
+            elif source == "dexscreener":
+                record.pairs = list(result or ())
+            else:
+                record.report = result
+        return record
+
+    async def run(
+        self,
+        addresses: Iterable[TokenRef] | AsyncIterable[TokenRef],
+        chain: str = "solana",
+    ) -> AsyncIterator[TokenRecord[PoolT, PairT, ReportT]]:
+        """Yield a TokenRecord per distinct address as soon as it is complete.
+
+        Items are addresses on chain or (chain, address) pairs.
+        """
+        semaphore = asyncio.Semaphore(self.concurrency)
+        finished: asyncio.Queue = asyncio.Queue()
+        tasks: set[asyncio.Task] = set()
+
+        def on_done(task: asyncio.Task) -> None:
+            tasks.discard(task)
+            finished.put_nowait(task)
+
+        async def feed() -> None:
+            recent = _RecentTokens(self.dedupe_ttl, self.dedupe_size)
+            try:
+                async for item in _iterate(addresses):
+                    token = item if isinstance(item, tuple) else (chain, item)
+                    if self.dedupe and not recent.add(token):
+                        continue
+                    await semaphore.acquire()
+                    task = asyncio.ensure_future(self.enrich(token[1], token[0]))
+                    tasks.add(task)
+                    task.add_done_callback(on_done)
+                if tasks:
+                    await asyncio.wait(set(tasks))
+            except Exception as e:
+                finished.put_nowait(e)
+                return
+            finished.put_nowait(None)
+
+        feeder = asyncio.ensure_future(feed())
+        try:
+            while True:
+                item = await finished.get()
+                if item is None:
+                    break
+                if isinstance(item, Exception):
+                    raise item
+                semaphore.release()
+                yield item.result()
+        finally:
+            feeder.cancel()
+            for task in tasks:
+                task.cancel()
@@ -1,3 +1,5 @@
+from collections.abc import AsyncIterator
+from datetime import datetime
 from typing import overload
 
 from msgspec import json
@@ -5,6 +7,7 @@ from msgspec import json
 from shared_clients.aiohttp_ import AiohttpAPI
 
 from . import dto
+from .pagination import CheckpointStore, paginate
 from .session import TweetScoutSession
 
 
@@ -27,23 +30,23 @@ class TweetScoutAPI(AiohttpAPI[TweetScoutSession]):
             params["link"] = link
         elif user_id is not None:
             params["user_id"] = user_id
-        async with self._session.get(url="follows", params=params) as resp:
-            return json.decode(await resp.read(), type=list[dto.HandlerLookupRes])
+        return await self._session.fetch(
+            "GET", "follows", type=list[dto.HandlerLookupRes], params=params
+        )
 
     async def info_id(self, user_id: str) -> dto.HandlerLookupRes:
         url = f"info-id/{user_id}"
-        async with self._session.get(url=url) as resp:
-            return json.decode(await resp.read(), type=dto.HandlerLookupRes)
+        return await self._session.fetch("GET", url, type=dto.HandlerLookupRes)
 
     async def info(self, user_handle: str) -> dto.HandlerLookupRes:
         url = f"info/{user_handle}"
-        async with self._session.get(url=url) as resp:
-            return json.decode(await resp.read(), type=dto.HandlerLookupRes)
+        return await self._session.fetch("GET", url, type=dto.HandlerLookupRes)
 
     async def list_members(self, list_id: str) -> list[dto.HandlerListMember]:
         params = {"list_id": list_id}
-        async with self._session.get(url="list-members", params=params) as resp:
-            return json.decode(await resp.read(), type=list[dto.HandlerListMember])
+        return await self._session.fetch(
+            "GET", "list-members", type=list[dto.HandlerListMember], params=params
+        )
 
     async def list_tweets(
         self, list_id: str, cursor: str | None = None
@@ -51,8 +54,9 @@ class TweetScoutAPI(AiohttpAPI[TweetScoutSession]):
         params = {"list_id": list_id}
         if cursor:
             params["cursor"] = cursor
-        async with self._session.get(url="list-tweets", params=params) as resp:
-            return json.decode(await resp.read(), type=dto.HandlerListTweetsRes)
+        return await self._session.fetch(
+            "GET", "list-tweets", type=dto.HandlerListTweetsRes, params=params
+        )
 
     async def search_tweets(
         self, payload: dto.HandlerSearchTweetsReq
@@ -76,15 +80,79 @@ class TweetScoutAPI(AiohttpAPI[TweetScoutSession]):
         ) as resp:
             return json.decode(await resp.read(), type=dto.HandlerUserTweetsRes)
 
+    def iter_list_tweets(
+        self,
+        list_id: str,
+        *,
+        since_id: str | None = None,
+        since: datetime | None = None,
+        prefetch: int = 1,
+        checkpoint: CheckpointStore | None = None,
+        checkpoint_key: str | None = None,
+    ) -> AsyncIterator[dto.TypesListItem]:
+        """Stream every tweet of a list page by page; see pagination.paginate."""
+        return paginate(
+            lambda cursor: self.list_tweets(list_id, cursor),
+            since_id=since_id,
+            since=since,
+            prefetch=prefetch,
+            checkpoint=checkpoint,
+            checkpoint_key=checkpoint_key,
+        )
+
+    def iter_search_tweets(
+        self,
+        query: str,
+        *,
+        order: str | None = None,
+        since_id: str | None = None,
+        since: datetime | None = None,
+        prefetch: int = 1,
+        checkpoint: CheckpointStore | None = None,
+        checkpoint_key: str | None = None,
+    ) -> AsyncIterator[dto.TypesListItem]:
+        """Stream search results page by page; see pagination.paginate."""
+        return paginate(
+            lambda cursor: self.search_tweets(
+                dto.HandlerSearchTweetsReq(next_cursor=cursor, order=order, query=query)
+            ),
+            since_id=since_id,
+            since=since,
+            prefetch=prefetch,
+            checkpoint=checkpoint,
+            checkpoint_key=checkpoint_key,
+        )
+
+    def iter_user_tweets(
+        self,
+        *,
+        link: str | None = None,
+        user_id: str | None = None,
+        since_id: str | None = None,
+        since: datetime | None = None,
+        prefetch: int = 1,
+        checkpoint: CheckpointStore | None = None,
+        checkpoint_key: str | None = None,
+    ) -> AsyncIterator[dto.TypesListItem]:
+        """Stream a user's timeline page by page; see pagination.paginate."""
+        return paginate(
+            lambda cursor: self.user_tweets(
+                dto.HandlerUserTweetsReq(cursor=cursor, link=link, user_id=user_id)
+            ),
+            since_id=since_id,
+            since=since,
+            prefetch=prefetch,
+            checkpoint=checkpoint,
+            checkpoint_key=checkpoint_key,
+        )
+
     async def handle_to_id(self, user_handle: str) -> dto.HandlerIDRes:
         url = f"handle-to-id/{user_handle}"
-        async with self._session.get(url=url) as resp:
-            return json.decode(await resp.read(), type=dto.HandlerIDRes)
+        return await self._session.fetch("GET", url, type=dto.HandlerIDRes)
 
     async def id_to_handle(self, user_id: str) -> dto.HandlerHandleRes:
         url = f"id-to-handle/{user_id}"
-        async with self._session.get(url=url) as resp:
-            return json.decode(await resp.read(), type=dto.HandlerHandleRes)
+        return await self._session.fetch("GET", url, type=dto.HandlerHandleRes)
 
     @overload
     async def handle_history(
@@ -104,8 +172,9 @@ class TweetScoutAPI(AiohttpAPI[TweetScoutSession]):
             params["link"] = link
         elif user_id is not None:
             params["user_id"] = user_id
-        async with self._session.get(url="handle-history", params=params) as resp:
-            return json.decode(await resp.read(), type=dto.HandlerHandleHistoriesResp)
+        return await self._session.fetch(
+            "GET", "handle-history", type=dto.HandlerHandleHistoriesResp, params=params
+        )
 
     @overload
     async def followers_stats(
@@ -125,8 +194,9 @@ class TweetScoutAPI(AiohttpAPI[TweetScoutSession]):
             params["user_handle"] = user_handle
         elif user_id is not None:
             params["user_id"] = user_id
-        async with self._session.get(url="followers-stats", params=params) as resp:
-            return json.decode(await resp.read(), type=dto.HandlerFollowersStatsResp)
+        return await self._session.fetch(
+            "GET", "followers-stats", type=dto.HandlerFollowersStatsResp, params=params
+        )
 
     @overload
     async def new_following_7d(
@@ -146,8 +216,9 @@ class TweetScoutAPI(AiohttpAPI[TweetScoutSession]):
             params["user_handle"] = user_handle
         elif user_id is not None:
             params["user_id"] = user_id
-        async with self._session.get(url="new-following-7d", params=params) as resp:
-            return json.decode(await resp.read(), type=list[dto.TypesFollower])
+        return await self._session.fetch(
+            "GET", "new-following-7d", type=list[dto.TypesFollower], params=params
+        )
 
     @overload
     async def score_changes(
@@ -167,18 +238,17 @@ class TweetScoutAPI(AiohttpAPI[TweetScoutSession]):
             params["user_handle"] = user_handle
         elif user_id is not None:
             params["user_id"] = user_id
-        async with self._session.get(url="score-changes", params=params) as resp:
-            return json.decode(await resp.read(), type=dto.HandlerScoreChangesResp)
+        return await self._session.fetch(
+            "GET", "score-changes", type=dto.HandlerScoreChangesResp, params=params
+        )
 
     async def score_id(self, user_id: str) -> dto.HandlerScoreResp:
         url = f"score-id/{user_id}"
-        async with self._session.get(url=url) as resp:
-            return json.decode(await resp.read(), type=dto.HandlerScoreResp)
+        return await self._session.fetch("GET", url, type=dto.HandlerScoreResp)
 
     async def score(self, user_handle: str) -> dto.HandlerScoreResp:
         url = f"score/{user_handle}"
-        async with self._session.get(url=url) as resp:
-            return json.decode(await resp.read(), type=dto.HandlerScoreResp)
+        return await self._session.fetch("GET", url, type=dto.HandlerScoreResp)
 
     async def top_followers(
         self, user_handle: str, from_db: str | None = None
@@ -187,10 +257,10 @@ class TweetScoutAPI(AiohttpAPI[TweetScoutSession]):
         params: dict[str, str] = {}
         if from_db is not None:
             params["from"] = from_db
-        async with self._session.get(url=url, params=params) as resp:
-            return json.decode(await resp.read(), type=list[dto.TypesAccount])
+        return await self._session.fetch(
+            "GET", url, type=list[dto.TypesAccount], params=params
+        )
 
     async def top_following(self, user_handle: str) -> list[dto.TypesAccount]:
         url = f"top-following/{user_handle}"
-        async with self._session.get(url=url) as resp:
-            return json.decode(await resp.read(), type=list[dto.TypesAccount])
+        return await self._session.fetch("GET", url, type=list[dto.TypesAccount])
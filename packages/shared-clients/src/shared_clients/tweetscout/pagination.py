@@ -0,0 +1,124 @@
+from __future__ import annotations
+
+import asyncio
+import contextlib
+from collections.abc import AsyncIterator, Awaitable, Callable
+from datetime import datetime, timezone
+from typing import TYPE_CHECKING, Any, Protocol
+
+if TYPE_CHECKING:
+    from . import dto
+
+TWEET_TIME_FORMAT = "%a %b %d %H:%M:%S %z %Y"
+
+
+class CheckpointStore(Protocol):
+    """Where resumable cursors live, e.g. redis_client.AsyncRedisDB."""
+
+    async def get(self, key: str) -> Any: ...
+
+    async def set(self, key: str, value: Any) -> None: ...
+
+
+def parse_tweet_time(value: str | None) -> datetime | None:
+    """created_at as an aware datetime (Twitter or ISO format), or None."""
+    if not value:
+        return None
+    try:
+        return datetime.strptime(value, TWEET_TIME_FORMAT)
+    except ValueError:
+        pass
+    try:
+        parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+def _reached_boundary(
+    tweet: dto.TypesListItem, since_id: int | None, since: datetime | None
+) -> bool:
+    if since_id is not None and tweet.id_str and tweet.id_str.isdigit():
+        if int(tweet.id_str) <= since_id:
+            return True
+    if since is not None:
+        created_at = parse_tweet_time(tweet.created_at)
+        if created_at is not None and created_at < since:
+            return True
+    return False
+
+
+async def paginate(
+    fetch_page: Callable[[str | None], Awaitable[Any]],
+    *,
+    since_id: str | None = None,
+    since: datetime | None = None,
+    prefetch: int = 1,
+    checkpoint: CheckpointStore | None = None,
+    checkpoint_key: str | None = None,
+) -> AsyncIterator[dto.TypesListItem]:
+    """Yield tweets from a cursor-paginated endpoint, newest first.
+
+    fetch_page(cursor) returns a page with tweets and next_cursor. Up to
+    prefetch pages are fetched ahead in the background while the caller
+    processes the current one, so only those pages are ever held in memory.
+    Iteration stops when the cursor runs out or at the first tweet at/below
+    since_id or older than since (timelines come newest first).
+
+    With checkpoint and checkpoint_key the cursor of the next page is saved
+    once a page has been fully consumed, and a later call with the same key
+    resumes from there; the checkpoint is cleared when the crawl finishes.
+    """
+    if since is not None and since.tzinfo is None:
+        since = since.replace(tzinfo=timezone.utc)
+    min_id = int(since_id) if since_id and since_id.isdigit() else None
+    use_checkpoint = checkpoint is not None and checkpoint_key is not None
+
+    cursor = None
+    if use_checkpoint:
+        saved = await checkpoint.get(checkpoint_key)
+        cursor = saved.get("cursor") if isinstance(saved, dict) else None
+
+    pages: asyncio.Queue = asyncio.Queue(maxsize=max(prefetch, 1))
+
+    async def produce(cursor: str | None) -> None:
+        seen: set[str] = set()
+        try:
+            while True:
+                page = await fetch_page(cursor)
+                await pages.put((page, None))
+                cursor = page.next_cursor
+                if not page.tweets or not cursor or cursor in seen:
+                    break
+                seen.add(cursor)
+        except Exception as e:
+            await pages.put((None, e))
+            return
+        await pages.put((None, None))
+
+    producer = asyncio.create_task(produce(cursor))
+    try:
+        while True:
+            page, error = await pages.get()
+            if error is not None:
+                raise error
+            if page is None:
+                if use_checkpoint:
+                    await checkpoint.set(checkpoint_key, None)
+                break
+            for tweet in page.tweets or ():
+                if _reached_boundary(tweet, min_id, since):
+                    producer.cancel()
+                    if use_checkpoint:
+                        await checkpoint.set(checkpoint_key, None)
+                    return
+                yield tweet
+            if use_checkpoint:
+                await checkpoint.set(
+                    checkpoint_key,
+                    {"cursor": page.next_cursor} if page.next_cursor else None,
+                )
+    finally:
+        producer.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await producer
@@ -4,8 +4,9 @@ from aiohttp import ClientSession
 from aiohttp.client import _RequestOptions
 from multidict import CIMultiDict
 
+from shared_clients.aiohttp_.limiter import INTERACTIVE, RateLimiter
 from shared_clients.aiohttp_.session import AiohttpSession
-
+from shared_clients.aiohttp_.singleflight import SingleFlight
 
 
 class TweetScoutSession(AiohttpSession):
@@ -13,9 +14,27 @@ class TweetScoutSession(AiohttpSession):
 
     __slots__ = ("__api_key",)
 
-    def __init__(self, api_key: str, session_provider: Callable[[], ClientSession] | None = None) -> None:
-        super().__init__(session_provider, self.BASE_URL)
+    def __init__(
+        self,
+        api_key: str,
+        session_provider: Callable[[], ClientSession] | None = None,
+        shared: str | None = None,
+        limiter: RateLimiter | None = None,
+        priority: int = INTERACTIVE,
+        agent: str = "default",
+        single_flight: SingleFlight | None = None,
+    ) -> None:
+        super().__init__(
+            session_provider,
+            self.BASE_URL,
+            shared,
+            limiter,
+            priority,
+            agent,
+            single_flight,
+        )
         self.__api_key = api_key
+        self._limiter_key = api_key
 
     def _handle_kwargs(self, **kwargs) -> _RequestOptions:
         headers = CIMultiDict[str]()
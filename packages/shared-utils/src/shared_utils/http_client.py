@@ -1,22 +1,80 @@
-import aiohttp
+from collections.abc import AsyncIterator
+from typing import Any, TypeVar
+
+from msgspec import json
+from shared_clients.aiohttp_ import get_shared_session
+
+T = TypeVar("T")
 
 
 class HttpClient:
-    def __init__(self, base_url: str):
+    """JSON/bytes HTTP client on top of a pooled, long-lived aiohttp session.
+
+    Every method reads the body while the response is still open, so the
+    connection goes back to the pool, and returns decoded data instead of a
+    ClientResponse. Pass type to decode straight into a msgspec Struct (or any
+    type msgspec understands); use stream() for payloads too large to buffer.
+    Non-2xx responses raise aiohttp.ClientResponseError.
+    """
+
+    def __init__(self, base_url: str, session_name: str = "default"):
         self.base_url = base_url
+        self.session_name = session_name
 
-    async def post(
-        self, endpoint: str, data: dict, headers: dict = None
-    ) -> aiohttp.ClientResponse:
+    async def request_bytes(self, method: str, endpoint: str, **kwargs: Any) -> bytes:
         url = f"{self.base_url}{endpoint}"
-        async with aiohttp.ClientSession() as session:
-            response = await session.post(url, data=data, headers=headers)
+        session = get_shared_session(self.session_name)
+        async with session.request(method, url, **kwargs) as response:
             response.raise_for_status()
-            return response
+            return await response.read()
+
+    async def request(
+        self, method: str, endpoint: str, type: type[T] | None = None, **kwargs: Any
+    ) -> T | Any:
+        body = await self.request_bytes(method, endpoint, **kwargs)
+        if not body:
+            return None
+        if type is None:
+            return json.decode(body)
+        return json.decode(body, type=type)
+
+    async def post(
+        self,
+        endpoint: str,
+        data: dict | None = None,
+        headers: dict | None = None,
+        type: type[T] | None = None,
+        **kwargs: Any,
+    ) -> T | Any:
+        return await self.request(
+            "POST", endpoint, type=type, data=data, headers=headers, **kwargs
+        )
+
+    async def get(
+        self,
+        endpoint: str,
+        headers: dict | None = None,
+        type: type[T] | None = None,
+        **kwargs: Any,
+    ) -> T | Any:
+        return await self.request("GET", endpoint, type=type, headers=headers, **kwargs)
+
+    async def get_bytes(
+        self, endpoint: str, headers: dict | None = None, **kwargs: Any
+    ) -> bytes:
+        return await self.request_bytes("GET", endpoint, headers=headers, **kwargs)
 
-    async def get(self, endpoint: str, headers: dict) -> aiohttp.ClientResponse:
+    async def stream(
+        self,
+        endpoint: str,
+        method: str = "GET",
+        chunk_size: int = 64 * 1024,
+        **kwargs: Any,
+    ) -> AsyncIterator[bytes]:
+        """Yield the response body in chunks without buffering it whole."""
         url = f"{self.base_url}{endpoint}"
-        async with aiohttp.ClientSession() as session:
-            response = await session.get(url, headers=headers)
+        session = get_shared_session(self.session_name)
+        async with session.request(method, url, **kwargs) as response:
             response.raise_for_status()
-            return response
+            async for chunk in response.content.iter_chunked(chunk_size):
+                yield chunk
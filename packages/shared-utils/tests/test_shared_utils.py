@@ -1,5 +1,9 @@
 import pytest
+import pytest_asyncio
 import aiohttp
+import msgspec
+from aioresponses import aioresponses
+from yarl import URL
 from unittest.mock import AsyncMock, patch, MagicMock
 from shared_utils.enums import AppPlatformEnum
 from shared_utils.http_client import HttpClient
@@ -65,64 +69,104 @@ def test_app_platform_enum_members(mock_openai_client, setup_mocks):
     assert actual_members == expected_members
 
 
+@pytest_asyncio.fixture
+async def shared_session():
+    from shared_clients.aiohttp_ import session_registry
+
+    yield session_registry
+    await session_registry.close()
+
+
 @pytest.mark.asyncio
-async def test_http_client_post_success(mock_openai_client, setup_mocks):
+async def test_http_client_post_success(mock_openai_client, setup_mocks, shared_session):
     base_url = "https://api.example.com"
     endpoint = "/test"
     data = {"key": "value"}
     headers = {"Authorization": "Bearer token"}
 
-    with patch("aiohttp.ClientSession.post", new=AsyncMock()) as mock_post:
-        mock_response = AsyncMock()
-        mock_response.status = 200
-        mock_response.raise_for_status = lambda: None
-        mock_post.return_value.__aenter__.return_value = mock_response
+    with aioresponses() as mocked:
+        mocked.post(f"{base_url}{endpoint}", payload={"ok": True})
 
         client = HttpClient(base_url)
         response = await client.post(endpoint, data, headers)
 
-        mock_post.assert_called_with(f"{base_url}{endpoint}", data=data, headers=headers)
-        assert response.status == 200
+        assert response == {"ok": True}
+        call = mocked.requests[("POST", URL(f"{base_url}{endpoint}"))][0]
+        assert call.kwargs["data"] == data
+        assert call.kwargs["headers"] == headers
 
 
 @pytest.mark.asyncio
-async def test_http_client_get_success(mock_openai_client, setup_mocks):
+async def test_http_client_get_success(mock_openai_client, setup_mocks, shared_session):
     base_url = "https://api.example.com"
     endpoint = "/test"
     headers = {"Authorization": "Bearer token"}
 
-    with patch("aiohttp.ClientSession.get", new=AsyncMock()) as mock_get:
-        mock_response = AsyncMock()
-        mock_response.status = 200
-        mock_response.raise_for_status = lambda: None
-        mock_get.return_value.__aenter__.return_value = mock_response
+    with aioresponses() as mocked:
+        mocked.get(f"{base_url}{endpoint}", payload=[1, 2, 3])
 
         client = HttpClient(base_url)
         response = await client.get(endpoint, headers)
 
-        mock_get.assert_called_with(f"{base_url}{endpoint}", headers=headers)
-        assert response.status == 200
+        assert response == [1, 2, 3]
+        call = mocked.requests[("GET", URL(f"{base_url}{endpoint}"))][0]
+        assert call.kwargs["headers"] == headers
 
 
 @pytest.mark.asyncio
-async def test_http_client_post_raises_error(mock_openai_client, setup_mocks):
+async def test_http_client_post_raises_error(mock_openai_client, setup_mocks, shared_session):
     base_url = "https://api.example.com"
     endpoint = "/test"
     data = {"key": "value"}
 
-    with patch("aiohttp.ClientSession.post", new=AsyncMock()) as mock_post:
-        mock_response = AsyncMock()
-        mock_response.status = 400
-        mock_response.raise_for_status.side_effect = aiohttp.ClientResponseError(
-            status=400, message="Bad Request", request_info=None, history=None
-        )
-        mock_post.return_value.__aenter__.return_value = mock_response
+    with aioresponses() as mocked:
+        mocked.post(f"{base_url}{endpoint}", status=400)
 
         client = HttpClient(base_url)
         with pytest.raises(aiohttp.ClientResponseError):
             await client.post(endpoint, data)
 
 
+@pytest.mark.asyncio
+async def test_http_client_decodes_into_type(mock_openai_client, setup_mocks, shared_session):
+    class Item(msgspec.Struct):
+        id: int
+        name: str
+
+    with aioresponses() as mocked:
+        mocked.get("https://api.example.com/items", payload=[{"id": 1, "name": "a"}])
+
+        items = await HttpClient("https://api.example.com").get("/items", type=list[Item])
+
+        assert items == [Item(id=1, name="a")]
+
+
+@pytest.mark.asyncio
+async def test_http_client_empty_body_and_bytes(mock_openai_client, setup_mocks, shared_session):
+    client = HttpClient("https://api.example.com")
+
+    with aioresponses() as mocked:
+        mocked.post("https://api.example.com/empty", status=204, body=b"")
+        mocked.get("https://api.example.com/raw", body=b"\x00\x01")
+
+        assert await client.post("/empty") is None
+        assert await client.get_bytes("/raw") == b"\x00\x01"
+
+
+@pytest.mark.asyncio
+async def test_http_client_stream(mock_openai_client, setup_mocks, shared_session):
+    body = b"x" * 10_000
+
+    with aioresponses() as mocked:
+        mocked.get("https://api.example.com/big", body=body)
+
+        client = HttpClient("https://api.example.com")
+        chunks = [chunk async for chunk in client.stream("/big", chunk_size=4096)]
+
+        assert b"".join(chunks) == body
+        assert all(len(chunk) <= 4096 for chunk in chunks)
+
+
 @pytest.mark.asyncio
 async def test_format_text_success_short_text(mock_openai_client, setup_mocks):
     from shared_utils.utils import format_text, add_blank_lines
@@ -1,7 +1,11 @@
 import asyncio
-from dataclasses import dataclass
+from collections import OrderedDict
+from typing import Any
 
 import aiohttp
+import msgspec
+from msgspec import json
+from shared_clients.aiohttp_ import SingleFlight, get_shared_session
 from tenacity import retry, stop_after_attempt, wait_fixed
 
 from tweetscout_utils.config import get_settings
@@ -9,8 +13,24 @@ from tweetscout_utils.config import get_settings
 settings = get_settings()
 
 
-@dataclass
-class User:
+class _Model(msgspec.Struct, gc=False):
+    """Base for the TweetScout response models.
+
+    Models are msgspec Structs decoded straight from response bytes. They keep
+    the field order (positional and keyword construction), equality and repr
+    of the former dataclasses. They are no longer dataclasses, so
+    dataclasses.asdict/replace raise TypeError: use to_dict() and replace().
+    gc=False is safe because the models never reference each other cyclically.
+    """
+
+    def to_dict(self) -> dict[str, Any]:
+        return msgspec.to_builtins(self)
+
+    def replace(self, **changes: Any):
+        return msgspec.structs.replace(self, **changes)
+
+
+class User(_Model):
     id_str: str
     name: str
     screen_name: str
@@ -26,8 +46,7 @@ class User:
         return f"Name: {self.name}\nUsername: {self.screen_name}\nDescription: {self.description}"
 
 
-@dataclass
-class QuotedStatus:
+class QuotedStatus(_Model):
     created_at: str
     id_str: str
     full_text: str
@@ -36,8 +55,7 @@ class QuotedStatus:
     favorite_count: int
 
 
-@dataclass
-class RetweetedStatus:
+class RetweetedStatus(_Model):
     created_at: str
     id_str: str
     full_text: str
@@ -46,96 +64,67 @@ class RetweetedStatus:
     favorite_count: int
 
 
-@dataclass
-class Tweet:
+class Tweet(_Model):
     created_at: str
     id_str: str
     full_text: str
     user: User
-    retweeted_status: RetweetedStatus | None
-    quoted_status: QuotedStatus | None
-    retweet_count: int
-    favorite_count: int
-    is_quote_status: bool
-    conversation_id_str: str
-    in_reply_to_status_id_str: str | None
+    # TweetScout omits the optional statuses, so these and every later field
+    # need a default to keep the dataclass field order
+    retweeted_status: RetweetedStatus | None = None
+    quoted_status: QuotedStatus | None = None
+    retweet_count: int = 0
+    favorite_count: int = 0
+    is_quote_status: bool = False
+    conversation_id_str: str = ""
+    in_reply_to_status_id_str: str | None = None
+
+
+class _TweetList(_Model):
+    tweets: list[Tweet] = []
 
 
+_tweet_decoder = json.Decoder(Tweet)
+_tweet_list_decoder = json.Decoder(_TweetList)
+
+
+# Разбор уже полученных dict (совместимость со старым API)
 def parse_user(data: dict) -> User:
-    return User(
-        id_str=data["id_str"],
-        name=data["name"],
-        screen_name=data["screen_name"],
-        description=data["description"],
-        followers_count=data["followers_count"],
-        friends_count=data["friends_count"],
-        statuses_count=data["statuses_count"],
-        created_at=data["created_at"],
-        can_dm=data.get("can_dm", False),
-    )
+    return msgspec.convert(data, User)
 
 
 def parse_retweeted_status(data: dict | None) -> RetweetedStatus | None:
     if data is None:
         return None
-    user = parse_user(data["user"])
-    return RetweetedStatus(
-        created_at=data["created_at"],
-        id_str=data["id_str"],
-        full_text=data["full_text"],
-        user=user,
-        retweet_count=data["retweet_count"],
-        favorite_count=data["favorite_count"],
-    )
+    return msgspec.convert(data, RetweetedStatus)
 
 
 def parse_quoted_status(data: dict | None) -> QuotedStatus | None:
     if data is None:
         return None
-    user = parse_user(data["user"])
-    return QuotedStatus(
-        created_at=data["created_at"],
-        id_str=data["id_str"],
-        full_text=data["full_text"],
-        user=user,
-        retweet_count=data["retweet_count"],
-        favorite_count=data["favorite_count"],
-    )
+    return msgspec.convert(data, QuotedStatus)
 
 
 def parse_tweet(data: dict) -> Tweet:
-    user = parse_user(data["user"])
-    retweeted_status = parse_retweeted_status(data.get("retweeted_status"))
-    quoted_status = parse_quoted_status(data.get("quoted_status"))
-    return Tweet(
-        created_at=data["created_at"],
-        id_str=data["id_str"],
-        full_text=data["full_text"],
-        user=user,
-        retweeted_status=retweeted_status,
-        quoted_status=quoted_status,
-        retweet_count=data["retweet_count"],
-        favorite_count=data["favorite_count"],
-        is_quote_status=data["is_quote_status"],
-        conversation_id_str=data["conversation_id_str"],
-        in_reply_to_status_id_str=data.get("in_reply_to_status_id_str"),
-    )
+    return msgspec.convert(data, Tweet)
 
 
 @retry(
     stop=stop_after_attempt(3),
     wait=wait_fixed(2),
 )
-async def _make_request(url: str, data: dict):
+async def _request_bytes(url: str, data: dict) -> bytes:
     headers = {"ApiKey": settings.TWEETSCOUT_API_KEY}
 
     try:
-        async with (
-            aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=60)) as session,
-            session.post(url, headers=headers, json=data) as response,
-        ):
+        async with get_shared_session("tweetscout").post(
+            url,
+            headers=headers,
+            json=data,
+            timeout=aiohttp.ClientTimeout(total=60),
+        ) as response:
             response.raise_for_status()  # Проверяем статус ответа
-            return await response.json()
+            return await response.read()
     except aiohttp.ClientResponseError as e:
         print(f"HTTP error during request to {url}: {e}")
         raise
@@ -147,42 +136,146 @@ async def _make_request(url: str, data: dict):
         raise
 
 
+async def _make_request(url: str, data: dict):
+    return json.decode(await _request_bytes(url, data))
+
+
 async def fetch_user_tweets(username: str) -> list[Tweet]:
     url = "https://api.tweetscout.io/v2/user-tweets"
     data = {"link": f"https://x.com/{username}"}
-    result = await _make_request(url, data)
-    tweets_data = result.get("tweets", [])
-    return [parse_tweet(tweet_data) for tweet_data in tweets_data]
+    return _tweet_list_decoder.decode(await _request_bytes(url, data)).tweets
 
 
 async def search_tweets(query: str) -> list[Tweet]:
     url = "https://api.tweetscout.io/v2/search-tweets"
     data = {"query": query}
-    result = await _make_request(url, data)
-    tweets_data = result.get("tweets", [])
-    return [parse_tweet(tweet_data) for tweet_data in tweets_data]
+    return _tweet_list_decoder.decode(await _request_bytes(url, data)).tweets
 
 
 async def get_tweet_by_link(link: str) -> Tweet:
     url = "https://api.tweetscout.io/v2/tweet-info"
     data = {"tweet_link": link}
-    result = await _make_request(url, data)
-    return parse_tweet(result)
-
-
-async def get_conversation_from_tweet(tweet: Tweet) -> list[Tweet]:
-    conversation_chain = [tweet]
-    tweet_id = tweet.in_reply_to_status_id_str
-    while tweet_id:
-        reply_tweet = await get_tweet_by_link(
-            f"https://twitter.com/apify/status/{tweet_id}"
+    return _tweet_decoder.decode(await _request_bytes(url, data))
+
+
+class ConversationResolver:
+    """Resolves reply chains with memoized, de-duplicated tweet fetches.
+
+    Fetched tweets are kept in an in-process LRU and, if redis is given (an
+    AsyncRedisDB or anything with async get_many/set_many), in Redis for
+    redis_ttl seconds, so chains that share ancestors are fetched once.
+    Concurrent requests for the same tweet share one tweet-info call. The
+    direct parent is fetched on its own; if the chain goes on past a tweet
+    that is not cached, the rest of the thread is prefetched with a single
+    conversation_id search and tweets the search misses are fetched one by
+    one. Chains are cut at max_depth tweets.
+    """
+
+    def __init__(
+        self,
+        max_size: int = 2048,
+        max_depth: int = 50,
+        redis: Any = None,
+        redis_ttl: int = 24 * 60 * 60,
+        prefetch: bool = True,
+        key_prefix: str = "tweetscout:tweet:",
+    ) -> None:
+        self.max_size = max_size
+        self.max_depth = max_depth
+        self.redis = redis
+        self.redis_ttl = redis_ttl
+        self.prefetch = prefetch
+        self.key_prefix = key_prefix
+        self._tweets: OrderedDict[str, Tweet] = OrderedDict()
+        self._flights = SingleFlight()
+
+    def _recall(self, tweet_id: str) -> Tweet | None:
+        tweet = self._tweets.get(tweet_id)
+        if tweet is not None:
+            self._tweets.move_to_end(tweet_id)
+        return tweet
+
+    def _remember(self, tweet: Tweet) -> None:
+        self._tweets[tweet.id_str] = tweet
+        self._tweets.move_to_end(tweet.id_str)
+        while len(self._tweets) > self.max_size:
+            self._tweets.popitem(last=False)
+
+    async def _store(self, tweets: list[Tweet]) -> None:
+        for tweet in tweets:
+            self._remember(tweet)
+        if self.redis is not None and tweets:
+            await self.redis.set_many(
+                {self.key_prefix + t.id_str: t.to_dict() for t in tweets},
+                ex=self.redis_ttl,
+                log=False,
+            )
+
+    async def get_tweet(self, tweet_id: str) -> Tweet | None:
+        tweet = self._recall(tweet_id)
+        if tweet is not None:
+            return tweet
+        return await self._flights.do(tweet_id, lambda: self._fetch(tweet_id))
+
+    async def _fetch(self, tweet_id: str) -> Tweet | None:
+        if self.redis is not None:
+            [cached] = await self.redis.get_many([self.key_prefix + tweet_id])
+            if cached is not None:
+                tweet = msgspec.convert(cached, Tweet)
+                self._remember(tweet)
+                return tweet
+        tweet = await get_tweet_by_link(f"https://twitter.com/apify/status/{tweet_id}")
+        if tweet is not None:
+            await self._store([tweet])
+        return tweet
+
+    async def prefetch_conversation(self, conversation_id: str) -> int:
+        """Load a thread with one search request. Returns the number of tweets."""
+        return await self._flights.do(
+            f"conversation:{conversation_id}",
+            lambda: self._prefetch(conversation_id),
         )
-        if reply_tweet is None:
-            break
-        conversation_chain.append(reply_tweet)
-        tweet_id = reply_tweet.in_reply_to_status_id_str
 
-    return conversation_chain[::-1]  # first tweet is newest
+    async def _prefetch(self, conversation_id: str) -> int:
+        try:
+            tweets = await search_tweets(f"conversation_id:{conversation_id}")
+        except Exception as e:
+            print(f"Conversation prefetch failed for {conversation_id}: {e}")
+            return 0
+        await self._store(tweets)
+        return len(tweets)
+
+    async def resolve(self, tweet: Tweet) -> list[Tweet]:
+        """The chain from the thread root down to tweet (oldest first)."""
+        self._remember(tweet)
+        conversation_chain = [tweet]
+        tweet_id = tweet.in_reply_to_status_id_str
+        # Most replies are one hop deep: a search costs more than that fetch
+        prefetch = self.prefetch and bool(tweet.conversation_id_str)
+        while tweet_id and len(conversation_chain) < self.max_depth:
+            if prefetch and len(conversation_chain) > 1:
+                if self._recall(tweet_id) is None:
+                    prefetch = False
+                    await self.prefetch_conversation(tweet.conversation_id_str)
+            reply_tweet = await self.get_tweet(tweet_id)
+            if reply_tweet is None:
+                break
+            conversation_chain.append(reply_tweet)
+            tweet_id = reply_tweet.in_reply_to_status_id_str
+
+        return conversation_chain[::-1]  # first tweet is newest
+
+    def clear(self) -> None:
+        self._tweets.clear()
+
+
+conversation_resolver = ConversationResolver()
+
+
+async def get_conversation_from_tweet(
+    tweet: Tweet, resolver: ConversationResolver | None = None
+) -> list[Tweet]:
+    return await (resolver or conversation_resolver).resolve(tweet)
 
 
 def create_conversation_string(tweets: list[Tweet]) -> str:
@@ -1,11 +1,12 @@
 import pytest
 import aiohttp
-from unittest.mock import AsyncMock, MagicMock, patch
+import msgspec
+from unittest.mock import ANY, AsyncMock, MagicMock, patch
 from tweetscout_utils.main import (
     User, QuotedStatus, RetweetedStatus, Tweet,
     parse_user, parse_retweeted_status, parse_quoted_status, parse_tweet,
     _make_request, fetch_user_tweets, search_tweets, get_tweet_by_link,
-    get_conversation_from_tweet, create_conversation_string
+    get_conversation_from_tweet, create_conversation_string, ConversationResolver
 )
 
 
@@ -14,19 +15,18 @@ from tweetscout_utils.main import (
 def mock_settings():
     settings = MagicMock()
     settings.TWEETSCOUT_API_KEY = "test_api_key"
-    return settings
+    with patch("tweetscout_utils.main.settings", settings):
+        yield settings
 
 
 @pytest.fixture
 def mock_aiohttp_session():
-    session = AsyncMock()
-    session.post = AsyncMock()
-    return session
+    return MagicMock()
 
 
 @pytest.fixture
 def mock_client_session(mock_aiohttp_session):
-    with patch("aiohttp.ClientSession", return_value=mock_aiohttp_session):
+    with patch("tweetscout_utils.main.get_shared_session", return_value=mock_aiohttp_session):
         yield mock_aiohttp_session
 
 
@@ -108,6 +108,10 @@ def test_tweet_dataclass():
     assert tweet.id_str == "101"
     assert tweet.full_text == "Test tweet"
     assert tweet.user == user
+    assert Tweet(
+        "2023-01-01", "101", "Test tweet", user, None, None, 5, 10, False, "101", None
+    ) == tweet
+    assert tweet.replace(full_text="Edited").to_dict()["full_text"] == "Edited"
 
 
 # Тесты для функций парсинга
@@ -233,7 +237,7 @@ def test_parse_tweet():
 async def test_make_request_success(mock_client_session, mock_settings):
     response = AsyncMock()
     response.status = 200
-    response.json = AsyncMock(return_value={"tweets": []})
+    response.read = AsyncMock(return_value=msgspec.json.encode({"tweets": []}))
     mock_client_session.post.return_value.__aenter__.return_value = response
 
     result = await _make_request("https://api.tweetscout.io/v2/test", {"key": "value"})
@@ -241,6 +245,7 @@ async def test_make_request_success(mock_client_session, mock_settings):
     mock_client_session.post.assert_called_with(
         "https://api.tweetscout.io/v2/test",
         headers={"ApiKey": "test_api_key"},
+        timeout=ANY,
         json={"key": "value"}
     )
 
@@ -262,7 +267,7 @@ async def test_make_request_client_error(mock_client_session, mock_settings):
 async def test_fetch_user_tweets(mock_client_session, mock_settings):
     response = AsyncMock()
     response.status = 200
-    response.json = AsyncMock(return_value={
+    response.read = AsyncMock(return_value=msgspec.json.encode({
         "tweets": [{
             "created_at": "2023-01-01",
             "id_str": "101",
@@ -283,7 +288,7 @@ async def test_fetch_user_tweets(mock_client_session, mock_settings):
             "conversation_id_str": "101",
             "in_reply_to_status_id_str": None
         }]
-    })
+    }))
     mock_client_session.post.return_value.__aenter__.return_value = response
 
     tweets = await fetch_user_tweets("testuser")
@@ -292,6 +297,7 @@ async def test_fetch_user_tweets(mock_client_session, mock_settings):
     mock_client_session.post.assert_called_with(
         "https://api.tweetscout.io/v2/user-tweets",
         headers={"ApiKey": "test_api_key"},
+        timeout=ANY,
         json={"link": "https://x.com/testuser"}
     )
 
@@ -300,7 +306,7 @@ async def test_fetch_user_tweets(mock_client_session, mock_settings):
 async def test_search_tweets(mock_client_session, mock_settings):
     response = AsyncMock()
     response.status = 200
-    response.json = AsyncMock(return_value={
+    response.read = AsyncMock(return_value=msgspec.json.encode({
         "tweets": [{
             "created_at": "2023-01-01",
             "id_str": "101",
@@ -321,7 +327,7 @@ async def test_search_tweets(mock_client_session, mock_settings):
             "conversation_id_str": "101",
             "in_reply_to_status_id_str": None
         }]
-    })
+    }))
     mock_client_session.post.return_value.__aenter__.return_value = response
 
     tweets = await search_tweets("test query")
@@ -330,6 +336,7 @@ async def test_search_tweets(mock_client_session, mock_settings):
     mock_client_session.post.assert_called_with(
         "https://api.tweetscout.io/v2/search-tweets",
         headers={"ApiKey": "test_api_key"},
+        timeout=ANY,
         json={"query": "test query"}
     )
 
@@ -338,7 +345,7 @@ async def test_search_tweets(mock_client_session, mock_settings):
 async def test_get_tweet_by_link(mock_client_session, mock_settings):
     response = AsyncMock()
     response.status = 200
-    response.json = AsyncMock(return_value={
+    response.read = AsyncMock(return_value=msgspec.json.encode({
         "created_at": "2023-01-01",
         "id_str": "101",
         "full_text": "Test tweet",
@@ -357,7 +364,7 @@ async def test_get_tweet_by_link(mock_client_session, mock_settings):
         "is_quote_status": False,
         "conversation_id_str": "101",
         "in_reply_to_status_id_str": None
-    })
+    }))
     mock_client_session.post.return_value.__aenter__.return_value = response
 
     tweet = await get_tweet_by_link("https://twitter.com/testuser/status/101")
@@ -365,6 +372,7 @@ async def test_get_tweet_by_link(mock_client_session, mock_settings):
     mock_client_session.post.assert_called_with(
         "https://api.tweetscout.io/v2/tweet-info",
         headers={"ApiKey": "test_api_key"},
+        timeout=ANY,
         json={"tweet_link": "https://twitter.com/testuser/status/101"}
     )
 
@@ -390,7 +398,7 @@ async def test_get_conversation_from_tweet(mock_client_session, mock_settings):
     )
     response = AsyncMock()
     response.status = 200
-    response.json = AsyncMock(return_value={
+    response.read = AsyncMock(return_value=msgspec.json.encode({
         "created_at": "2023-01-01",
         "id_str": "100",
         "full_text": "Original tweet",
@@ -409,7 +417,7 @@ async def test_get_conversation_from_tweet(mock_client_session, mock_settings):
         "is_quote_status": False,
         "conversation_id_str": "100",
         "in_reply_to_status_id_str": None
-    })
+    }))
     mock_client_session.post.return_value.__aenter__.return_value = response
 
     conversation = await get_conversation_from_tweet(tweet)
@@ -455,3 +463,133 @@ def test_create_conversation_string():
     result = create_conversation_string(tweets)
     expected = "testuser:\n    Original tweet\ntestuser:\n    Reply tweet"
     assert result == expected
+
+
+def test_tweet_struct_compat_helpers():
+    user = User(
+        id_str="123", name="Test User", screen_name="testuser",
+        description="Test", followers_count=100, friends_count=50,
+        statuses_count=200, created_at="2023-01-01"
+    )
+    tweet = Tweet(
+        created_at="2023-01-01", id_str="101", full_text="Test tweet", user=user,
+        retweet_count=5, favorite_count=10, is_quote_status=False,
+        conversation_id_str="101",
+    )
+    assert tweet.retweeted_status is None
+    assert tweet.in_reply_to_status_id_str is None
+    assert tweet.to_dict()["user"]["screen_name"] == "testuser"
+    assert tweet.replace(full_text="Edited").full_text == "Edited"
+    assert parse_tweet(tweet.to_dict()) == tweet
+
+
+@pytest.mark.asyncio
+async def test_fetch_user_tweets_decodes_nested_statuses(mock_client_session, mock_settings):
+    user = {
+        "id_str": "123", "name": "Test User", "screen_name": "testuser",
+        "description": "Test", "followers_count": 100, "friends_count": 50,
+        "statuses_count": 200, "created_at": "2023-01-01", "extra": "ignored",
+    }
+    quoted = {
+        "created_at": "2023-01-01", "id_str": "7", "full_text": "Quoted",
+        "user": user, "retweet_count": 1, "favorite_count": 2,
+    }
+    response = AsyncMock()
+    response.read = AsyncMock(return_value=msgspec.json.encode({
+        "tweets": [{
+            "created_at": "2023-01-01", "id_str": "101", "full_text": "Test tweet",
+            "user": user, "quoted_status": quoted, "retweet_count": 5,
+            "favorite_count": 10, "is_quote_status": True, "conversation_id_str": "101",
+        }]
+    }))
+    mock_client_session.post.return_value.__aenter__.return_value = response
+
+    tweets = await fetch_user_tweets("testuser")
+
+    assert isinstance(tweets[0].quoted_status, QuotedStatus)
+    assert tweets[0].quoted_status.user.screen_name == "testuser"
+    assert tweets[0].retweeted_status is None
+
+
+@pytest.mark.asyncio
+async def test_search_tweets_without_tweets_key(mock_client_session, mock_settings):
+    response = AsyncMock()
+    response.read = AsyncMock(return_value=b"{}")
+    mock_client_session.post.return_value.__aenter__.return_value = response
+
+    assert await search_tweets("nothing") == []
+
+
+def _chain_tweet(id_str, parent=None, conversation="1"):
+    return Tweet(
+        created_at="2023-01-01", id_str=id_str, full_text=f"tweet {id_str}",
+        user=User(
+            id_str="123", name="Test User", screen_name="testuser",
+            description="Test", followers_count=100, friends_count=50,
+            statuses_count=200, created_at="2023-01-01"
+        ),
+        retweet_count=0, favorite_count=0, is_quote_status=False,
+        conversation_id_str=conversation, in_reply_to_status_id_str=parent,
+    )
+
+
+@pytest.mark.asyncio
+async def test_conversation_resolver_prefetches_thread():
+    thread = [_chain_tweet("1"), _chain_tweet("2", "1"), _chain_tweet("3", "2")]
+    resolver = ConversationResolver()
+
+    with patch("tweetscout_utils.main.search_tweets", new=AsyncMock(return_value=thread)) as search, \
+            patch("tweetscout_utils.main.get_tweet_by_link", new=AsyncMock(return_value=thread[2])) as fetch:
+        chain = await resolver.resolve(_chain_tweet("4", "3"))
+
+    assert [t.id_str for t in chain] == ["1", "2", "3", "4"]
+    search.assert_awaited_once_with("conversation_id:1")
+    fetch.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_conversation_resolver_skips_prefetch_for_one_hop():
+    resolver = ConversationResolver()
+
+    with patch("tweetscout_utils.main.search_tweets", new=AsyncMock()) as search, \
+            patch("tweetscout_utils.main.get_tweet_by_link", new=AsyncMock(return_value=_chain_tweet("1"))):
+        chain = await resolver.resolve(_chain_tweet("2", "1"))
+
+    assert [t.id_str for t in chain] == ["1", "2"]
+    search.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_conversation_resolver_dedupes_and_caches_fetches():
+    import asyncio
+
+    async def slow_fetch(link):
+        await asyncio.sleep(0.01)
+        return _chain_tweet("1")
+
+    resolver = ConversationResolver(prefetch=False)
+    with patch("tweetscout_utils.main.get_tweet_by_link", side_effect=slow_fetch) as fetch:
+        chains = await asyncio.gather(
+            resolver.resolve(_chain_tweet("2", "1")),
+            resolver.resolve(_chain_tweet("3", "1")),
+        )
+        again = await resolver.resolve(_chain_tweet("5", "1"))
+
+    assert [[t.id_str for t in c] for c in chains] == [["1", "2"], ["1", "3"]]
+    assert [t.id_str for t in again] == ["1", "5"]
+    assert fetch.call_count == 1
+
+
+@pytest.mark.asyncio
+async def test_conversation_resolver_depth_cap_and_redis_tier():
+    redis = MagicMock()
+    redis.get_many = AsyncMock(return_value=[_chain_tweet("2", "1").to_dict()])
+    redis.set_many = AsyncMock()
+    resolver = ConversationResolver(max_depth=2, redis=redis, prefetch=False)
+
+    with patch("tweetscout_utils.main.get_tweet_by_link", new=AsyncMock()) as fetch:
+        chain = await resolver.resolve(_chain_tweet("3", "2"))
+
+    assert [t.id_str for t in chain] == ["2", "3"]
+    redis.get_many.assert_awaited_once_with(["tweetscout:tweet:2"])
+    fetch.assert_not_awaited()
@@ -9,6 +9,7 @@ import aiohttp
 from loguru import logger
 from redis_client.main import decode_redis, get_redis_db
 from requests_oauthlib import OAuth2Session
+from shared_clients.aiohttp_ import get_shared_session
 
 from twitter_ambassador_utils.config import cipher, get_hvac_client, get_settings
 
@@ -18,16 +19,17 @@ settings = get_settings()
 async def post_request(url: str, token: str, payload: dict):
     headers = {"Authorization": f"Bearer {token}", "Content-Type": "application/json"}
 
-    async with aiohttp.ClientSession() as session:
-        async with session.post(url, headers=headers, json=payload) as response:
-            if response.ok:
-                data = await response.json()
-                logger.info(f"Request successful: {data}")
-                return data
-            logger.error(
-                f"Request failed. Status: {response.status}, Response: {await response.text()}"
-            )
-            return await response.json()
+    async with get_shared_session("twitter").post(
+        url, headers=headers, json=payload
+    ) as response:
+        if response.ok:
+            data = await response.json()
+            logger.info(f"Request successful: {data}")
+            return data
+        logger.error(
+            f"Request failed. Status: {response.status}, Response: {await response.text()}"
+        )
+        return await response.json()
 
 
 async def create_post(
@@ -53,14 +55,15 @@ async def create_post(
     if commented_tweet_id:
         payload.update({"reply": {"in_reply_to_tweet_id": commented_tweet_id}})
 
-    async with aiohttp.ClientSession() as session:
-        async with session.post(url, json=payload, headers=headers) as response:
-            if response.status == 201:
-                result = await response.json()
-                logger.info(f"Tweet posted: {result}")
-                return result
-            logger.error(f"Twit not posted: {await response.text()}")
-            return None
+    async with get_shared_session("twitter").post(
+        url, json=payload, headers=headers
+    ) as response:
+        if response.status == 201:
+            result = await response.json()
+            logger.info(f"Tweet posted: {result}")
+            return result
+        logger.error(f"Twit not posted: {await response.text()}")
+        return None
 
 
 async def retweet(token: str, user_id: str, tweet_id: str):
@@ -186,13 +189,11 @@ class TwitterAuthClient:
     @classmethod
     async def get_me(cls, access_token: str) -> dict | None:
         logger.info("Get me twitter")
-        async with (
-            aiohttp.ClientSession(
-                headers={"Authorization": f"Bearer {access_token}"},
-                timeout=aiohttp.ClientTimeout(10),
-            ) as session,
-            session.get("https://api.twitter.com/2/users/me") as response,
-        ):
+        async with get_shared_session("twitter").get(
+            "https://api.twitter.com/2/users/me",
+            headers={"Authorization": f"Bearer {access_token}"},
+            timeout=aiohttp.ClientTimeout(10),
+        ) as response:
             data = await response.json()
             if response.status == 403 and "suspended" in data.get("detail", ""):
                 response.raise_for_status()
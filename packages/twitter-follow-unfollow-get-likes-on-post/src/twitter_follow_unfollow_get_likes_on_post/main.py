@@ -1,6 +1,5 @@
-import aiohttp
-
 from loguru import logger
+from shared_clients.aiohttp_ import get_shared_session
 
 
 async def get_likes_on_post(access_token: str, tweet_id: str):
@@ -8,12 +7,10 @@ async def get_likes_on_post(access_token: str, tweet_id: str):
     url = f"https://api.x.com/2/tweets/{tweet_id}/liking_users"
     headers = {"Authorization": f"Bearer {access_token}"}
 
-    async with aiohttp.ClientSession() as session:
-        response = await session.get(url, headers=headers)
-        async with response:
-            if response.status == 200:
-                result = await response.json()
-                logger.info(f'Notifications received: {result}')
-                return result
-            else:
-                logger.info(f'Notifications not received: {await response.text()}')
+    async with get_shared_session("twitter").get(url, headers=headers) as response:
+        if response.status == 200:
+            result = await response.json()
+            logger.info(f"Notifications received: {result}")
+            return result
+        else:
+            logger.info(f"Notifications not received: {await response.text()}")
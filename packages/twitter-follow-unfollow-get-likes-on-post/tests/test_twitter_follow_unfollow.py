@@ -17,8 +17,8 @@ async def test_get_likes_on_post_success(mock_logger):
     mock_response.__aenter__.return_value = mock_response
     mock_response.json.return_value = {"data": [{"id": "123", "name": "test_user"}]}
 
-    with patch("aiohttp.ClientSession") as mock_session:
-        mock_session.return_value.__aenter__.return_value.get = AsyncMock(return_value=mock_response)
+    with patch("twitter_follow_unfollow_get_likes_on_post.main.get_shared_session") as mock_session:
+        mock_session.return_value.get = MagicMock(return_value=mock_response)
 
         result = await get_likes_on_post(
             access_token="test_token",
@@ -26,7 +26,7 @@ async def test_get_likes_on_post_success(mock_logger):
         )
 
         assert result == {"data": [{"id": "123", "name": "test_user"}]}
-        mock_session.return_value.__aenter__.return_value.get.assert_awaited_once_with(
+        mock_session.return_value.get.assert_called_once_with(
             "https://api.x.com/2/tweets/tweet123/liking_users",
             headers={"Authorization": "Bearer test_token"}
         )
@@ -41,8 +41,8 @@ async def test_get_likes_on_post_failure(mock_logger):
     mock_response.__aenter__.return_value = mock_response
     mock_response.text.return_value = "Not Found"
 
-    with patch("aiohttp.ClientSession") as mock_session:
-        mock_session.return_value.__aenter__.return_value.get = AsyncMock(return_value=mock_response)
+    with patch("twitter_follow_unfollow_get_likes_on_post.main.get_shared_session") as mock_session:
+        mock_session.return_value.get = MagicMock(return_value=mock_response)
 
         result = await get_likes_on_post(
             access_token="test_token",
@@ -56,8 +56,8 @@ async def test_get_likes_on_post_failure(mock_logger):
 
 @pytest.mark.asyncio
 async def test_get_likes_on_post_network_error(mock_logger):
-    with patch("aiohttp.ClientSession") as mock_session:
-        mock_session.return_value.__aenter__.return_value.get = AsyncMock(
+    with patch("twitter_follow_unfollow_get_likes_on_post.main.get_shared_session") as mock_session:
+        mock_session.return_value.get = MagicMock(
             side_effect=aiohttp.ClientError("Network error")
         )
 
@@ -95,8 +95,8 @@ async def test_get_likes_on_post_json_error(mock_logger):
     mock_response.__aenter__.return_value = mock_response
     mock_response.json.side_effect = ValueError("Invalid JSON")
 
-    with patch("aiohttp.ClientSession") as mock_session:
-        mock_session.return_value.__aenter__.return_value.get = AsyncMock(return_value=mock_response)
+    with patch("twitter_follow_unfollow_get_likes_on_post.main.get_shared_session") as mock_session:
+        mock_session.return_value.get = MagicMock(return_value=mock_response)
 
         result = await get_likes_on_post(
             access_token="test_token",
@@ -109,8 +109,8 @@ async def test_get_likes_on_post_json_error(mock_logger):
 
 @pytest.mark.asyncio
 async def test_get_likes_on_post_timeout_error(mock_logger):
-    with patch("aiohttp.ClientSession") as mock_session:
-        mock_session.return_value.__aenter__.return_value.get = AsyncMock(
+    with patch("twitter_follow_unfollow_get_likes_on_post.main.get_shared_session") as mock_session:
+        mock_session.return_value.get = MagicMock(
             side_effect=asyncio.TimeoutError("Request timed out")
         )
 
@@ -130,8 +130,8 @@ async def test_get_likes_on_post_500_error(mock_logger):
     mock_response.__aenter__.return_value = mock_response
     mock_response.text.return_value = "Internal Server Error"
 
-    with patch("aiohttp.ClientSession") as mock_session:
-        mock_session.return_value.__aenter__.return_value.get = AsyncMock(return_value=mock_response)
+    with patch("twitter_follow_unfollow_get_likes_on_post.main.get_shared_session") as mock_session:
+        mock_session.return_value.get = MagicMock(return_value=mock_response)
 
         result = await get_likes_on_post(
             access_token="test_token",
@@ -1,4 +1,4 @@
-import aiohttp
+from shared_clients.aiohttp_ import get_shared_session
 
 
 async def follow(token: str, user_id: str, target_user_id: str):
@@ -12,12 +12,13 @@ async def follow(token: str, user_id: str, target_user_id: str):
     payload = {"target_user_id": target_user_id}
     headers = {"Authorization": f"Bearer {token}", "Content-Type": "application/json"}
 
-    async with aiohttp.ClientSession() as session:
-        async with session.post(url, headers=headers, json=payload) as response:
-            if response.ok:
-                data = await response.json()
-                print(f"Request successful: {data}")
-                return data
-            error_text = await response.text()
-            print(f"Request failed. Status: {response.status}, Response: {error_text}")
-            return {"error": error_text, "status": response.status}
+    async with get_shared_session("twitter").post(
+        url, headers=headers, json=payload
+    ) as response:
+        if response.ok:
+            data = await response.json()
+            print(f"Request successful: {data}")
+            return data
+        error_text = await response.text()
+        print(f"Request failed. Status: {response.status}, Response: {error_text}")
+        return {"error": error_text, "status": response.status}
@@ -1,4 +1,5 @@
 import pytest
+import pytest_asyncio
 from unittest.mock import AsyncMock, patch, MagicMock
 from fastapi import HTTPException
 from aiohttp import ClientSession
@@ -111,3 +112,176 @@ async def test_get_hyperliquid_manager():
             assert isinstance(manager, HyperLiquidManager)
             assert manager.base_url == "https://test.url"
             mock_session.assert_called_once()
+
+
+@pytest_asyncio.fixture
+async def l2book_server():
+    import json
+
+    from aiohttp import web
+    from aiohttp.test_utils import TestServer
+
+    received = []
+
+    async def handler(request):
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        async for msg in ws:
+            message = json.loads(msg.data)
+            received.append(message)
+            if message["method"] != "subscribe":
+                continue
+            coin = message["subscription"]["coin"]
+            await ws.send_json({"channel": "subscriptionResponse", "data": message})
+            await ws.send_json({
+                "channel": "l2Book",
+                "data": {
+                    "coin": coin,
+                    "time": 1,
+                    "levels": [
+                        [{"px": "100", "sz": "10", "n": 1}, {"px": "99", "sz": "5", "n": 2}],
+                        [{"px": "101", "sz": "8", "n": 1}, {"px": "110", "sz": "7", "n": 1}],
+                    ],
+                },
+            })
+        return ws
+
+    app = web.Application()
+    app.router.add_get("/ws", handler)
+    server = TestServer(app)
+    await server.start_server()
+    yield server, received
+    await server.close()
+
+
+@pytest.mark.asyncio
+async def test_get_pool_liquidity_from_stream(l2book_server, mock_session):
+    from hyperliquid_client.book import L2BookStream
+
+    server, received = l2book_server
+    async with L2BookStream(str(server.make_url("/ws"))) as stream:
+        manager = HyperLiquidManager(
+            session=mock_session, base_url="https://test.hyperliquid.url", stream=stream
+        )
+        result = await manager.get_pool_liquidity("BTC")
+        book = await stream.get_book("BTC")
+
+    assert result[result["type"] == "sum_liquidity"]["sz"].iloc[0] == 30
+    assert book.time == 1
+    liquidity = book.liquidity(depth_bps=[100])
+    assert liquidity.mid == 100.5
+    assert liquidity.depth[100] == (10.0, 8.0)
+    assert received == [
+        {"method": "subscribe", "subscription": {"type": "l2Book", "coin": "BTC"}}
+    ]
+    mock_session.request.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_stream_reconnects_after_malformed_frame(caplog):
+    import json
+
+    from aiohttp import web
+    from aiohttp.test_utils import TestServer
+    from hyperliquid_client.book import L2BookStream
+
+    connections = 0
+
+    async def handler(request):
+        nonlocal connections
+        connections += 1
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        async for msg in ws:
+            coin = json.loads(msg.data)["subscription"]["coin"]
+            if connections == 1:
+                await ws.send_json({"channel": "l2Book", "data": {"coin": coin}})
+                continue
+            await ws.send_json({
+                "channel": "l2Book",
+                "data": {"coin": coin, "time": 2, "levels": [
+                    [{"px": "100", "sz": "1", "n": 1}], [{"px": "101", "sz": "1", "n": 1}],
+                ]},
+            })
+        return ws
+
+    app = web.Application()
+    app.router.add_get("/ws", handler)
+    server = TestServer(app)
+    await server.start_server()
+    try:
+        async with L2BookStream(str(server.make_url("/ws")), reconnect_delay=0.01) as stream:
+            book = await stream.get_book("BTC", timeout=5)
+    finally:
+        await server.close()
+
+    assert book.time == 2
+    assert connections == 2
+    assert "reconnecting" in caplog.text
+
+
+@pytest.mark.asyncio
+async def test_stream_ping_tolerates_closed_socket():
+    from hyperliquid_client.book import L2BookStream
+
+    ws = MagicMock(closed=False)
+    ws.send_json = AsyncMock(side_effect=ConnectionResetError("closing transport"))
+    stream = L2BookStream("ws://unused", ping_interval=0)
+
+    await stream._ping(ws)
+
+    ws.send_json.assert_awaited_once()
+
+
+def test_aggregate_empty_book():
+    from hyperliquid_client.book import aggregate, parse_levels
+
+    liquidity = aggregate("BTC", parse_levels([]), parse_levels([]), depth_bps=[10])
+
+    assert liquidity.sum_liquidity == 0
+    assert liquidity.mid is None
+    assert liquidity.depth == {}
+
+
+@pytest.mark.asyncio
+async def test_get_liquidity_returns_typed_result(hyperliquid_manager):
+    test_data = {
+        "levels": [
+            [{"px": "100", "sz": "10"}, {"px": "99", "sz": "5"}],
+            [{"px": "101", "sz": "8"}, {"px": "102", "sz": "7"}]
+        ]
+    }
+
+    with patch.object(hyperliquid_manager, "_send_request", new_callable=AsyncMock) as mock_request:
+        mock_request.return_value = test_data
+        result = await hyperliquid_manager.get_liquidity("BTC", depth_bps=[50])
+
+    assert result.bids == 15
+    assert result.asks == 15
+    assert result.sum_liquidity == 30
+    assert result.mid == 100.5
+    assert result.depth[50] == (10.0, 8.0)
+
+
+@pytest.mark.asyncio
+async def test_get_liquidities_batch_matches_single(hyperliquid_manager):
+    books = {
+        "BTC": {"levels": [[{"px": "100", "sz": "10"}, {"px": "99", "sz": "5"}],
+                           [{"px": "101", "sz": "8"}]]},
+        "ETH": {"levels": [[{"px": "10", "sz": "1.5"}], []]},
+        "SOL": {"levels": [[], []]},
+    }
+
+    async def send_request(body, headers):
+        return books[body["coin"]]
+
+    with patch.object(hyperliquid_manager, "_send_request", side_effect=send_request):
+        batch = await hyperliquid_manager.get_liquidities(["BTC", "ETH", "SOL"], depth_bps=[100])
+        singles = {
+            coin: await hyperliquid_manager.get_liquidity(coin, depth_bps=[100])
+            for coin in books
+        }
+
+    assert batch == singles
+    assert batch["ETH"].mid is None
+    assert batch["SOL"].sum_liquidity == 0
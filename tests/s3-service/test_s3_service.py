@@ -3,6 +3,7 @@ from unittest.mock import patch, AsyncMock, MagicMock
 from botocore.exceptions import ClientError
 from fastapi import UploadFile
 import io
+import asyncio
 
 with patch("s3_service.config.Settings") as mock_settings:
     mock_settings.return_value = AsyncMock(
@@ -81,41 +82,138 @@ def test_init_bucket_name_too_long():
         S3Service(long_name)
 
 
+@pytest.fixture
+def mock_pool():
+    from s3_service.main import S3ClientPool
+
+    with patch.object(S3ClientPool, "_create") as mock_create:
+        mock_client = AsyncMock()
+        mock_create.return_value.__aenter__ = AsyncMock(return_value=mock_client)
+        mock_create.return_value.__aexit__ = AsyncMock()
+        yield S3ClientPool(), mock_create, mock_client
+
+
 @pytest.mark.asyncio
-async def test_context_manager_enter():
+async def test_context_manager_enter(mock_pool):
     """Тест входа в контекстный менеджер"""
     from s3_service.main import S3Service
 
-    with patch("s3_service.main.aioboto3") as mock_aioboto3:
-        mock_session = AsyncMock()
-        mock_client = AsyncMock()
-        mock_session.client.return_value.__aenter__ = AsyncMock(return_value=mock_client)
-        mock_aioboto3.Session.return_value = mock_session
+    pool, mock_create, mock_client = mock_pool
+    service = S3Service("test-bucket", pool=pool)
+
+    # Мокаем _ensure_bucket_exists
+    service._ensure_bucket_exists = AsyncMock()
 
-        service = S3Service("test-bucket")
+    result = await service.__aenter__()
 
-        # Мокаем _ensure_bucket_exists
+    assert result == service
+    assert service.s3_client == mock_client
+    service._ensure_bucket_exists.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_context_manager_exit_keeps_shared_client(mock_pool):
+    """Тест: выход из контекста не закрывает общий клиент"""
+    from s3_service.main import S3Service
+
+    pool, mock_create, mock_client = mock_pool
+    async with S3Service("test-bucket", pool=pool) as service:
         service._ensure_bucket_exists = AsyncMock()
 
-        result = await service.__aenter__()
+    assert service.s3_client is None
+    mock_create.return_value.__aexit__.assert_not_awaited()
 
-        assert result == service
-        assert service.s3_client == mock_client
-        service._ensure_bucket_exists.assert_awaited_once()
+    await pool.close()
+    mock_create.return_value.__aexit__.assert_awaited_once_with(None, None, None)
 
 
 @pytest.mark.asyncio
-async def test_context_manager_exit():
-    """Тест выхода из контекстного менеджера"""
+async def test_context_manager_exit_closes_own_client(mock_pool):
+    """Тест: с shared=False сервис закрывает свой клиент"""
     from s3_service.main import S3Service
 
-    service = S3Service("test-bucket")
-    mock_client = AsyncMock()
-    service.s3_client = mock_client
+    pool, mock_create, mock_client = mock_pool
+    service = S3Service("test-bucket", shared=False, pool=pool)
+    service._ensure_bucket_exists = AsyncMock()
 
+    await service.__aenter__()
     await service.__aexit__(None, None, None)
 
-    mock_client.__aexit__.assert_awaited_once_with(None, None, None)
+    mock_create.return_value.__aexit__.assert_awaited_once_with(None, None, None)
+    assert service.s3_client is None
+
+
+@pytest.mark.asyncio
+async def test_services_share_client_and_bucket_check(mock_pool):
+    """Тест: один клиент на endpoint и одна проверка bucket на процесс"""
+    from s3_service.main import S3Service
+
+    pool, mock_create, mock_client = mock_pool
+    services = [S3Service("test-bucket", pool=pool) for _ in range(3)]
+
+    await asyncio.gather(*(service.connect() for service in services))
+
+    assert all(service.s3_client is mock_client for service in services)
+    mock_create.assert_called_once()
+    mock_client.head_bucket.assert_awaited_once_with(Bucket="test-prefix-test-bucket")
+
+
+@pytest.mark.asyncio
+async def test_pool_close_detaches_services(mock_pool):
+    """Тест: после закрытия пула сервис берёт новый клиент при следующем вызове"""
+    from s3_service.main import S3Service
+
+    pool, mock_create, mock_client = mock_pool
+    service = await S3Service("test-bucket", pool=pool).connect()
+
+    await pool.close()
+    assert service.s3_client is None
+
+    await service.delete_file("test-key")
+
+    assert mock_create.call_count == 2
+    mock_client.delete_object.assert_awaited_once_with(
+        Bucket="test-prefix-test-bucket", Key="test-key"
+    )
+
+
+def test_pool_keeps_clients_per_event_loop(mock_pool):
+    """Тест: каждый event loop получает свой клиент"""
+    from s3_service.main import S3Service
+
+    pool, mock_create, mock_client = mock_pool
+    service = S3Service("test-bucket", pool=pool)
+
+    async def use():
+        await service.delete_file("test-key")
+        return pool._current()
+
+    first = asyncio.run(use())
+    second = asyncio.run(use())
+
+    assert first is not second
+    assert mock_create.call_count == 2
+    # bucket уже проверен, повторная проверка не нужна
+    mock_client.head_bucket.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_ensure_bucket_locks_per_bucket(mock_pool):
+    """Тест: проверки разных bucket не ждут друг друга"""
+    pool, _, _ = mock_pool
+    slow_started = asyncio.Event()
+    release = asyncio.Event()
+
+    async def slow_check():
+        slow_started.set()
+        await release.wait()
+
+    slow = asyncio.create_task(pool.ensure_bucket("e", "slow", slow_check))
+    await slow_started.wait()
+    await asyncio.wait_for(pool.ensure_bucket("e", "fast", AsyncMock()), 1)
+
+    release.set()
+    await slow
 
 
 @pytest.mark.asyncio
@@ -181,7 +279,7 @@ async def test_upload_file_success(s3_service, mock_upload_file):
         "test-key",
         ExtraArgs={"ACL": "public-read"}
     )
-    s3_service.__aexit__.assert_awaited_once_with(None, None, None)
+    s3_service.__aexit__.assert_not_awaited()
 
 
 @pytest.mark.asyncio
@@ -195,7 +293,7 @@ async def test_upload_file_error(s3_service, mock_upload_file):
     with pytest.raises(Exception, match="Uploading file error"):
         await s3_service.upload_file(mock_upload_file, "test-key")
 
-    s3_service.__aexit__.assert_awaited_once_with(None, None, None)
+    s3_service.__aexit__.assert_not_awaited()
 
 
 @pytest.mark.asyncio
@@ -210,7 +308,7 @@ async def test_delete_file_success(s3_service):
         Bucket="test-prefix-test-bucket",
         Key="test-key"
     )
-    s3_service.__aexit__.assert_awaited_once_with(None, None, None)
+    s3_service.__aexit__.assert_not_awaited()
 
 
 @pytest.mark.asyncio
@@ -224,7 +322,7 @@ async def test_delete_file_error(s3_service):
     with pytest.raises(Exception, match="Deleting file error"):
         await s3_service.delete_file("test-key")
 
-    s3_service.__aexit__.assert_awaited_once_with(None, None, None)
+    s3_service.__aexit__.assert_not_awaited()
 
 
 def test_get_file_url(s3_service):
@@ -250,7 +348,7 @@ async def test_upload_file_bytes_success(s3_service):
         ContentDisposition="inline",
         ACL="public-read"
     )
-    s3_service.__aexit__.assert_awaited_once_with(None, None, None)
+    s3_service.__aexit__.assert_not_awaited()
 
 
 @pytest.mark.asyncio
@@ -283,7 +381,7 @@ async def test_upload_file_bytes_error(s3_service):
     with pytest.raises(Exception, match="Uploading bytes error"):
         await s3_service.upload_file_bytes("test-key", b"test data")
 
-    s3_service.__aexit__.assert_awaited_once_with(None, None, None)
+    s3_service.__aexit__.assert_not_awaited()
 
 
 @pytest.mark.asyncio
@@ -305,7 +403,7 @@ async def test_list_files_success(s3_service):
         Bucket="test-prefix-test-bucket",
         Prefix="folder/"
     )
-    s3_service.__aexit__.assert_awaited_once_with(None, None, None)
+    s3_service.__aexit__.assert_not_awaited()
 
 
 @pytest.mark.asyncio
@@ -334,7 +432,7 @@ async def test_list_files_error(s3_service):
     with pytest.raises(Exception, match="Listing files error"):
         await s3_service.list_files()
 
-    s3_service.__aexit__.assert_awaited_once_with(None, None, None)
+    s3_service.__aexit__.assert_not_awaited()
 
 
 @pytest.mark.asyncio
@@ -352,7 +450,7 @@ async def test_get_file_bytes_success(s3_service):
         Bucket="test-prefix-test-bucket",
         Key="test-key"
     )
-    s3_service.__aexit__.assert_awaited_once_with(None, None, None)
+    s3_service.__aexit__.assert_not_awaited()
 
 
 @pytest.mark.asyncio
@@ -366,7 +464,7 @@ async def test_get_file_bytes_error(s3_service):
     with pytest.raises(Exception, match="Error getting file bytes"):
         await s3_service.get_file_bytes("test-key")
 
-    s3_service.__aexit__.assert_awaited_once_with(None, None, None)
+    s3_service.__aexit__.assert_not_awaited()
 
 
 @pytest.mark.asyncio
@@ -398,6 +496,47 @@ async def test_s3_service_dependency():
         mock_s3_service.return_value.__aexit__ = AsyncMock()
 
         result = await dependency_func()
+        again = await dependency_func()
 
         assert result == mock_service
-        mock_s3_service.assert_called_once_with("test-bucket")
\ No newline at end of file
+        assert again is result
+        mock_s3_service.assert_called_once_with("test-bucket")
+
+
+@pytest.fixture
+def moto_settings():
+    """Настройки, указывающие на локальный moto-сервер вместо S3"""
+    server_module = pytest.importorskip("moto.server")
+    server = server_module.ThreadedMotoServer(ip_address="127.0.0.1", port=0, verbose=False)
+    server.start()
+    host, port = server.get_host_and_port()
+    settings = MagicMock()
+    settings.infrastructure.s3_base_url = f"http://{host}:{port}"
+    settings.infrastructure.s3_bucket_prefix = "test-prefix"
+    settings.infrastructure.s3_access_key = "testing"
+    settings.infrastructure.s3_secret_key = "testing"
+    with patch("s3_service.main.settings", settings):
+        yield settings
+    server.stop()
+
+
+@pytest.mark.asyncio
+async def test_s3_service_against_moto(moto_settings):
+    """Тест: сервис переиспользуется для нескольких операций на moto"""
+    from s3_service.main import S3ClientPool, S3Service
+
+    pool = S3ClientPool()
+    try:
+        service = await S3Service("videos", pool=pool).connect()
+        other = await S3Service("videos", pool=pool).connect()
+        assert other.s3_client is service.s3_client
+
+        for i in range(3):
+            await service.upload_file_bytes(f"clip{i}.mp4", b"data%d" % i, "video/mp4")
+
+        assert await service.list_files("clip") == ["clip0.mp4", "clip1.mp4", "clip2.mp4"]
+        assert await other.get_file_bytes("clip1.mp4") == b"data1"
+        await service.delete_file("clip1.mp4")
+        assert await service.list_files() == ["clip0.mp4", "clip2.mp4"]
+    finally:
+        await pool.close()
@@ -1,9 +1,12 @@
 import pytest
 import aiohttp
 from aioresponses import aioresponses
+from yarl import URL
 from msgspec import json
 from typing import Any
+from unittest.mock import patch
 from shared_clients.aiohttp_.api import AiohttpAPI
+from shared_clients.aiohttp_.registry import SessionRegistry
 from shared_clients.aiohttp_.session import AiohttpSession, ResponseWrapper, APIError
 from shared_clients.tweetscout.api import TweetScoutAPI
 from shared_clients.tweetscout.session import TweetScoutSession
@@ -11,7 +14,8 @@ from shared_clients.tweetscout.dto import (
     TypesAccount, HandlerSearchTweetsReq, HandlerSearchTweetsRes, HandlerLookupRes,
     HandlerListTweetsRes, HandlerTweetInfoReq, HandlerTweetInfoResp, HandlerUserTweetsReq,
     HandlerUserTweetsRes, HandlerIDRes, HandlerHandleRes, HandlerHandleHistoriesResp,
-    HandlerFollowersStatsResp, HandlerScoreChangesResp, HandlerScoreResp, TypesFollower, HandlerListMember
+    HandlerFollowersStatsResp, HandlerScoreChangesResp, HandlerScoreResp, TypesFollower, HandlerListMember,
+    TypesListItem
 )
 from shared_clients.tweetscout.query import (
     QueryBuilder, Word, Phrase, Hashtag, FromUser, And, Negate, MinRetweets, build_query, Sequence, QueryNode
@@ -651,3 +655,414 @@ async def test_tweetscout_session_custom_session_provider():
             assert resp.status == 200
             assert resp.request_info.headers["Custom-Provider"] == "test"
             assert resp.request_info.headers["ApiKey"] == "test_key"
+
+
+# Тесты для shared_clients.aiohttp_.registry
+@pytest.mark.asyncio
+async def test_session_registry_reuses_session_per_name():
+    registry = SessionRegistry(limit_per_host=5)
+    registry.configure("slow", limit_per_host=1, timeout=aiohttp.ClientTimeout(total=5))
+    created, closed = [], []
+    registry.on_create(lambda name, session: created.append(name))
+
+    @registry.on_close
+    async def record_close(name, session):
+        closed.append(name)
+
+    default = registry.get_session()
+    assert registry.get_session() is default
+    assert default.connector.limit_per_host == 5
+    assert default.connector.use_dns_cache
+
+    slow = registry.get_session("slow")
+    assert slow is not default
+    assert slow.connector.limit_per_host == 1
+    assert slow.timeout.total == 5
+
+    await registry.close("slow")
+    assert slow.closed
+    assert not default.closed
+    assert registry.get_session("slow") is not slow
+
+    await registry.close()
+    assert default.closed
+    assert created == ["default", "slow", "slow"]
+    assert closed == ["slow", "default", "slow"]
+
+
+@pytest.mark.asyncio
+async def test_aiohttp_session_shared_is_not_closed_on_exit():
+    registry = SessionRegistry()
+    with patch("shared_clients.aiohttp_.session.session_registry", registry):
+        session = AiohttpSession(base_url="http://example.com/", shared="tweetscout")
+    with aioresponses() as m:
+        m.get("http://example.com/test", status=200, payload={"data": "test"})
+        async with session:
+            async with session.get("test") as resp:
+                assert await resp.json() == {"data": "test"}
+    shared = registry.get_session("tweetscout")
+    assert not shared.closed
+    async with session:
+        assert session._session_provider() is shared
+    await registry.close()
+
+
+# Тесты для shared_clients.aiohttp_.limiter
+@pytest.mark.asyncio
+async def test_rate_limiter_priority_and_fair_queuing():
+    import asyncio
+
+    from shared_clients.aiohttp_.limiter import BACKGROUND, INTERACTIVE, RateLimiter
+
+    limiter = RateLimiter(rate=200, burst=1)
+    order = []
+
+    async def call(agent, priority, n):
+        await limiter.acquire("search-tweets", priority=priority, agent=agent)
+        order.append((agent, n))
+
+    await limiter.acquire("search-tweets")  # drain the single token
+    tasks = [asyncio.create_task(call("crawler", BACKGROUND, n)) for n in range(3)]
+    tasks += [asyncio.create_task(call("a", INTERACTIVE, n)) for n in range(2)]
+    tasks += [asyncio.create_task(call("b", INTERACTIVE, n)) for n in range(2)]
+    await asyncio.gather(*tasks)
+
+    assert order[:4] == [("a", 0), ("b", 0), ("a", 1), ("b", 1)]
+    assert order[4:] == [("crawler", 0), ("crawler", 1), ("crawler", 2)]
+
+
+@pytest.mark.asyncio
+async def test_rate_limiter_buckets_per_endpoint_and_key():
+    import time
+
+    from shared_clients.aiohttp_.limiter import RateLimiter
+
+    limiter = RateLimiter(rate=1, limits={"GET /latest/dex/pairs": (1000, 5)})
+    started = time.monotonic()
+    for _ in range(5):
+        await limiter.acquire("/latest/dex/pairs/solana/abc")
+    await limiter.acquire("token-profiles", api_key="k1")
+    await limiter.acquire("token-profiles", api_key="k2")
+    assert time.monotonic() - started < 0.5
+    assert limiter.stats()["buckets"] == 3
+
+
+@pytest.mark.asyncio
+async def test_rate_limiter_set_rate_retunes_buckets_in_use():
+    from shared_clients.aiohttp_.limiter import RateLimiter
+
+    limiter = RateLimiter(rate=1, limits={"GET /pairs": (50, 5)})
+    slot = await limiter.acquire("info")
+    limiter.set_rate(4, 4)
+
+    bucket = slot._buckets[0]
+    assert (bucket.rate, bucket.capacity) == (4.0, 4.0)
+    # tokens already spent stay spent
+    assert bucket.tokens < 1
+    assert limiter.slot("/pairs/x")._buckets[0].rate == 50
+
+
+@pytest.mark.asyncio
+async def test_rate_limiter_honours_retry_after_and_headers():
+    import time
+
+    from shared_clients.aiohttp_.limiter import RateLimiter, parse_retry_after
+
+    assert parse_retry_after("2") == 2.0
+    assert parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT") == 0.0
+    assert parse_retry_after("soon") is None
+
+    limiter = RateLimiter(rate=100, burst=10)
+    slot = await limiter.acquire("search-tweets")
+    slot.feedback(429, {"Retry-After": "0.2"})
+    started = time.monotonic()
+    await limiter.acquire("search-tweets")
+    assert time.monotonic() - started >= 0.19
+
+    slot = await limiter.acquire("info")
+    slot.feedback(200, {"X-RateLimit-Remaining": "1", "X-RateLimit-Reset": "100"})
+    bucket = slot._buckets[0]
+    assert bucket.rate == pytest.approx(0.01)
+    slot.feedback(200, {"X-RateLimit-Remaining": "0", "X-RateLimit-Reset": "30"})
+    assert bucket.blocked_until > time.monotonic() + 29
+
+
+@pytest.mark.asyncio
+async def test_tweetscout_session_reports_to_limiter():
+    from shared_clients.aiohttp_.limiter import RateLimiter
+
+    limiter = RateLimiter(rate=100, key_rate=100)
+    with aioresponses() as m:
+        m.get("https://api.tweetscout.io/v2/test", status=200, payload={},
+              headers={"X-RateLimit-Remaining": "0", "X-RateLimit-Reset": "60"})
+        async with aiohttp.ClientSession() as client:
+            session = TweetScoutSession(
+                api_key="test_key", session_provider=lambda: client, limiter=limiter
+            )
+            async with session.get("test") as resp:
+                assert resp.status == 200
+
+    buckets = limiter._buckets
+    assert set(buckets) == {("test_key", "*"), ("test_key", None)}
+    assert all(b.blocked_until > 0 for b in buckets.values())
+
+
+# Тесты для shared_clients.tweetscout.pagination
+class _MemoryCheckpoints:
+    def __init__(self):
+        self.data = {}
+
+    async def get(self, key):
+        return self.data.get(key)
+
+    async def set(self, key, value):
+        if value is None:
+            self.data.pop(key, None)
+        else:
+            self.data[key] = value
+
+
+@pytest.mark.asyncio
+async def test_tweetscout_api_iter_list_tweets_follows_cursor():
+    with aioresponses() as m:
+        m.get(
+            "https://api.tweetscout.io/v2/list-tweets?list_id=1",
+            payload={"next_cursor": "c2", "tweets": [{"id_str": "30"}, {"id_str": "29"}]},
+        )
+        m.get(
+            "https://api.tweetscout.io/v2/list-tweets?list_id=1&cursor=c2",
+            payload={"next_cursor": None, "tweets": [{"id_str": "28"}]},
+        )
+        api = TweetScoutAPI(TweetScoutSession(api_key="test_key"))
+        ids = [t.id_str async for t in api.iter_list_tweets("1", prefetch=2)]
+    assert ids == ["30", "29", "28"]
+
+
+@pytest.mark.asyncio
+async def test_tweetscout_api_iter_search_tweets_stops_at_since_id_and_time():
+    from datetime import datetime, timezone
+
+    with aioresponses() as m:
+        m.post(
+            "https://api.tweetscout.io/v2/search-tweets",
+            payload={"next_cursor": "c2", "tweets": [
+                {"id_str": "30", "created_at": "Wed Oct 10 20:19:24 +0000 2018"},
+                {"id_str": "20", "created_at": "Tue Oct 09 20:19:24 +0000 2018"},
+            ]},
+            repeat=True,
+        )
+        api = TweetScoutAPI(TweetScoutSession(api_key="test_key"))
+        by_id = [t.id_str async for t in api.iter_search_tweets("q", since_id="25")]
+        by_time = [
+            t.id_str async for t in api.iter_search_tweets(
+                "q", since=datetime(2018, 10, 10, tzinfo=timezone.utc)
+            )
+        ]
+    assert by_id == ["30"]
+    assert by_time == ["30"]
+
+
+@pytest.mark.asyncio
+async def test_paginate_resumes_from_checkpoint():
+    from shared_clients.tweetscout.pagination import paginate
+
+    pages = {
+        None: HandlerListTweetsRes(next_cursor="b", tweets=[TypesListItem(id_str="3")]),
+        "b": HandlerListTweetsRes(next_cursor="c", tweets=[TypesListItem(id_str="2")]),
+        "c": HandlerListTweetsRes(next_cursor=None, tweets=[TypesListItem(id_str="1")]),
+    }
+    calls = []
+
+    async def fetch(cursor):
+        calls.append(cursor)
+        return pages[cursor]
+
+    store = _MemoryCheckpoints()
+    crawl = paginate(fetch, checkpoint=store, checkpoint_key="crawl", prefetch=1)
+    assert (await crawl.__anext__()).id_str == "3"
+    assert (await crawl.__anext__()).id_str == "2"
+    await crawl.aclose()
+    assert store.data == {"crawl": {"cursor": "b"}}
+
+    calls.clear()
+    resumed = [t.id_str async for t in paginate(fetch, checkpoint=store, checkpoint_key="crawl")]
+    assert resumed == ["2", "1"]
+    assert calls == ["b", "c"]
+    assert store.data == {}
+
+
+# Тесты для shared_clients.aiohttp_.singleflight
+@pytest.mark.asyncio
+async def test_single_flight_collapses_concurrent_calls():
+    import asyncio
+
+    from shared_clients.aiohttp_.singleflight import SingleFlight, freeze
+
+    flight = SingleFlight()
+    runs = []
+
+    async def work(value):
+        runs.append(value)
+        await asyncio.sleep(0.01)
+        return value
+
+    results = await asyncio.gather(
+        *(flight.do("a", lambda: work("a")) for _ in range(5)),
+        flight.do("b", lambda: work("b")),
+    )
+    assert results == ["a"] * 5 + ["b"]
+    assert runs == ["a", "b"]
+    assert flight.stats() == {"calls": 6, "executed": 2, "collapsed": 4, "in_flight": 0}
+    assert await flight.do("a", lambda: work("again")) == "again"
+    assert freeze({"b": [1, 2], "a": 1}) == freeze({"a": 1, "b": [1, 2]})
+
+
+@pytest.mark.asyncio
+async def test_tweetscout_api_coalesces_identical_gets():
+    import asyncio
+
+    with aioresponses() as m:
+        m.get("https://api.tweetscout.io/v2/info/elon", payload={"id": "1"})
+        m.get("https://api.tweetscout.io/v2/score/elon", payload={"score": 5})
+        api = TweetScoutAPI(TweetScoutSession(api_key="test_key"))
+        infos = await asyncio.gather(*(api.info("elon") for _ in range(3)))
+        score = await api.score("elon")
+
+    assert infos[0] is infos[1] is infos[2]
+    assert infos[0].id == "1"
+    assert score.score == 5
+    assert api._session.single_flight.stats()["collapsed"] == 2
+
+
+# Тесты для shared_clients.aiohttp_.cache
+@pytest.mark.asyncio
+async def test_response_cache_serves_fresh_entries_and_revalidates():
+    from shared_clients.aiohttp_.cache import ResponseCache
+
+    cache = ResponseCache(ttl=60, ttls={"/coins/list": 0})
+    url = "https://api.example.com/coins/list"
+    with aioresponses() as m:
+        m.get(url, body=b"[1]", headers={"ETag": '"v1"'})
+        m.get(url, status=304)
+        m.get("https://api.example.com/price?id=1", body=b"42")
+        async with aiohttp.ClientSession() as session:
+            assert await cache.get(session, url) == b"[1]"
+            assert await cache.get(session, url) == b"[1]"  # ttl 0: 304 reuses body
+            assert await cache.get(session, "https://api.example.com/price", {"id": 1}) == b"42"
+            assert await cache.get(session, "https://api.example.com/price", {"id": 1}) == b"42"
+        revalidation = m.requests[("GET", URL(url))][1]
+    assert revalidation.kwargs["headers"]["If-None-Match"] == '"v1"'
+    assert cache.stats() == {"hits": 1, "misses": 3, "revalidated": 1, "entries": 2, "bytes": 5}
+    assert cache.peek("https://api.example.com/price", {"id": 1}) == b"42"
+
+
+@pytest.mark.asyncio
+async def test_response_cache_size_bound_and_disk_tier(tmp_path):
+    from shared_clients.aiohttp_.cache import DiskCacheBackend, ResponseCache
+
+    backend = DiskCacheBackend(tmp_path)
+    cache = ResponseCache(max_entries=1, backend=backend)
+    with aioresponses() as m:
+        m.get("https://api.example.com/a", body=b"a")
+        m.get("https://api.example.com/b", body=b"b")
+        async with aiohttp.ClientSession() as session:
+            await cache.get(session, "https://api.example.com/a")
+            await cache.get(session, "https://api.example.com/b")
+            assert cache.stats()["entries"] == 1
+            # evicted from memory, still served by the disk tier without a request
+            assert await cache.get(session, "https://api.example.com/a") == b"a"
+            restarted = ResponseCache(backend=DiskCacheBackend(tmp_path))
+            assert await restarted.get(session, "https://api.example.com/b") == b"b"
+    assert len(list(tmp_path.iterdir())) == 2
+
+
+@pytest.mark.asyncio
+async def test_token_enrichment_pipeline_merges_sources_and_batches():
+    import asyncio
+
+    from shared_clients.token_enrichment import TokenEnrichmentPipeline
+
+    class Dextools:
+        async def get_pool_by_address(self, chain, address):
+            await asyncio.sleep(0.01)
+            return {"address": address}
+
+    class DexScreener:
+        batches = []
+
+        async def get_tokens_data_by_addresses(self, chain, addresses):
+            self.batches.append(list(addresses))
+            return [{"baseToken": {"address": a.upper()}, "pairAddress": f"pair-{a}"} for a in addresses]
+
+    class RugCheck:
+        async def get_token_report(self, address):
+            if address == "bad":
+                raise RuntimeError("boom")
+            return {"mint": address}
+
+    dexscreener = DexScreener()
+    pipeline = TokenEnrichmentPipeline(Dextools(), dexscreener, RugCheck(), concurrency=2)
+
+    records = [r async for r in pipeline.run(["a", "b", "bad", "a"])]
+
+    assert sorted(r.address for r in records) == ["a", "b", "bad"]
+    by_address = {r.address: r for r in records}
+    assert by_address["a"].pool == {"address": "a"}
+    assert by_address["a"].pairs[0]["pairAddress"] == "pair-a"
+    assert by_address["b"].report == {"mint": "b"}
+    assert "rugcheck" in by_address["bad"].errors
+    assert by_address["bad"].pool == {"address": "bad"}
+    # concurrency=2: the first two tokens share one DexScreener request
+    assert dexscreener.batches[0] == ["a", "b"]
+
+
+@pytest.mark.asyncio
+async def test_token_enrichment_pipeline_streams_records():
+    import asyncio
+
+    from shared_clients.token_enrichment import TokenEnrichmentPipeline
+
+    class RugCheck:
+        async def get_token_report(self, address):
+            await asyncio.sleep(0.05 if address == "slow" else 0)
+            return {"mint": address}
+
+    async def addresses():
+        yield "slow"
+        yield ("solana", "fast")
+
+    pipeline = TokenEnrichmentPipeline(rugcheck=RugCheck())
+    order = [r.address async for r in pipeline.run(addresses())]
+
+    assert order == ["fast", "slow"]
+
+
+def test_token_enrichment_dedupe_is_bounded_by_ttl_and_size():
+    from shared_clients.token_enrichment import _RecentTokens
+
+    recent = _RecentTokens(ttl=10, max_size=2)
+    with patch("shared_clients.token_enrichment.time.monotonic", return_value=0):
+        assert recent.add(("solana", "a"))
+        assert not recent.add(("solana", "a"))
+        assert recent.add(("solana", "b"))
+        # full: the oldest token is forgotten to make room
+        assert recent.add(("solana", "c"))
+        assert recent.add(("solana", "a"))
+    with patch("shared_clients.token_enrichment.time.monotonic", return_value=10):
+        # expired tokens are enriched again
+        assert recent.add(("solana", "c"))
+    assert len(recent._seen) == 1
+
+
+@pytest.mark.asyncio
+async def test_token_enrichment_pipeline_without_dedupe():
+    from shared_clients.token_enrichment import TokenEnrichmentPipeline
+
+    class RugCheck:
+        async def get_token_report(self, address):
+            return {"mint": address}
+
+    pipeline = TokenEnrichmentPipeline(rugcheck=RugCheck(), dedupe=False)
+    records = [r async for r in pipeline.run(["a", "a"])]
+
+    assert [r.address for r in records] == ["a", "a"]